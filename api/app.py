@@ -1,20 +1,29 @@
 import uvicorn
 import logging
-from fastapi import Depends, FastAPI, HTTPException, status
+from fastapi import BackgroundTasks, Depends, FastAPI, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 from datetime import timedelta
 from typing import List
 
-from .models import Base, engine, get_db, User
+from .models import engine, async_engine, get_db, SessionLocal, User
 from .config import settings
+from .migrations import run_migrations
+from .partitions import ensure_partitioned
+from .pool import prewarm_pool, prewarm_async_pool
+from .pagination import NEXT_CURSOR_HEADER
+from .stream import change_broker
+from .retention import retention_job
+from .rollups import rollup_job
+from .compression import CompressionMiddleware
 from .auth import (
     Token, authenticate_user, create_access_token, 
-    initialize_admin_user, update_last_login
+    initialize_admin_user, update_last_login, password_executor
 )
 
-from .routes import auth, clients, topics, subscriptions, messages, events
+from .routes import auth, clients, topics, subscriptions, messages, events, stats, stream, metrics, graph
 
 # Configure logging
 logging.basicConfig(
@@ -29,15 +38,17 @@ logger = logging.getLogger(__name__)
 # Create tables in database
 def setup_database():
     try:
-        # Create all tables
-        Base.metadata.create_all(bind=engine)
-        logger.info("Database tables created successfully")
+        # Create tables and indexes through the versioned migrations
+        applied = run_migrations(engine)
+        logger.info(f"Database schema up to date ({applied} migrations applied)")
+        if settings.message_partition_interval:
+            ensure_partitioned(engine, settings.message_partition_interval, settings.message_partitions_ahead)
         
         # Initialize the first admin user if needed
-        db = next(get_db())
-        if initialize_admin_user(db):
-            logger.info("Admin user initialized with default credentials")
-            logger.warning("Please change the default admin password immediately")
+        with SessionLocal() as db:
+            if initialize_admin_user(db):
+                logger.info("Admin user initialized with default credentials")
+                logger.warning("Please change the default admin password immediately")
         
     except Exception as e:
         logger.error(f"Database setup error: {e}")
@@ -50,6 +61,50 @@ app = FastAPI(
     version=settings.api_version
 )
 
+# Open the pool's connections before the first request needs them
+@app.on_event("startup")
+async def warm_connection_pool():
+    if settings.db_pool_prewarm:
+        try:
+            if async_engine is not None:
+                opened = await prewarm_async_pool(async_engine, settings.db_pool_size)
+            else:
+                opened = await run_in_threadpool(prewarm_pool, engine, settings.db_pool_size)
+            logger.info(f"Connection pool pre-warmed with {opened} connections")
+        except Exception as e:
+            logger.warning(f"Could not pre-warm connection pool: {e}")
+
+@app.on_event("shutdown")
+def stop_password_executor():
+    password_executor.shutdown()
+
+# One LISTEN connection feeds every /stream subscriber
+@app.on_event("startup")
+async def start_change_broker():
+    change_broker.start()
+
+@app.on_event("shutdown")
+async def stop_change_broker():
+    await change_broker.stop()
+
+# Purge expired log rows in the background
+@app.on_event("startup")
+async def start_retention_job():
+    retention_job.start()
+
+@app.on_event("shutdown")
+async def stop_retention_job():
+    await retention_job.stop()
+
+# Keep the traffic rollups behind /metrics up to date
+@app.on_event("startup")
+async def start_rollup_job():
+    rollup_job.start()
+
+@app.on_event("shutdown")
+async def stop_rollup_job():
+    await rollup_job.stop()
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -57,15 +112,24 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Allow all methods
     allow_headers=["*"],  # Allow all headers
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag"],  # Let browsers read keyset cursors and validators
+)
+
+# Compress large JSON pages for clients that accept it
+app.add_middleware(
+    CompressionMiddleware,
+    min_size=settings.compression_min_size,
+    thread_size=settings.compression_thread_size,
 )
 
 # Login endpoint (outside of auth router for simplicity)
 @app.post("/token", response_model=Token)
 async def login_for_access_token(
+    background_tasks: BackgroundTasks,
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -73,8 +137,8 @@ async def login_for_access_token(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Update last login time
-    update_last_login(db, user)
+    # Update last login time once the response is out
+    background_tasks.add_task(update_last_login, user.id, user.username)
     
     access_token_expires = timedelta(minutes=settings.jwt_access_token_expire_minutes)
     access_token = create_access_token(
@@ -89,6 +153,10 @@ app.include_router(topics.router)
 app.include_router(subscriptions.router)
 app.include_router(messages.router)
 app.include_router(events.router)
+app.include_router(stats.router)
+app.include_router(stream.router)
+app.include_router(metrics.router)
+app.include_router(graph.router, tags=["graphql"])
 
 # Root endpoint
 @app.get("/")
@@ -105,7 +173,10 @@ def read_root():
             "/topics - Topic management",
             "/subscriptions - Subscription management",
             "/messages - Message logs",
-            "/events - Connection events"
+            "/events - Connection events",
+            "/stats - Dashboard statistics",
+            "/stream - Live changes (Server-Sent Events)",
+            "/graphql - GraphQL queries over all tables"
         ]
     }
 
@@ -122,5 +193,7 @@ if __name__ == "__main__":
         "app:app",
         host=settings.api_host,
         port=settings.api_port,
-        reload=True
+        reload=True,
+        # Open /stream connections never finish on their own
+        timeout_graceful_shutdown=5
     ) 
\ No newline at end of file
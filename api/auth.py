@@ -1,5 +1,11 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Optional
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
@@ -7,7 +13,10 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from pydantic import BaseModel
 from .config import settings, DEFAULT_ADMIN_USERNAME, DEFAULT_ADMIN_PASSWORD
-from .models import User, get_db
+from .models import User, get_db, open_session
+from .executor import BoundedExecutor, ExecutorSaturated
+
+logger = logging.getLogger(__name__)
 
 # Schemas
 class Token(BaseModel):
@@ -38,6 +47,63 @@ class UserInDB(BaseModel):
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# bcrypt takes hundreds of milliseconds per call on a Pi, so async callers
+# hand it to this executor instead of running it on the event loop
+password_executor = BoundedExecutor("bcrypt", settings.auth_hash_workers, settings.auth_hash_queue)
+
+# Resolved user cache
+class UserCache:
+    """Bounded TTL cache of users keyed on the token subject.
+
+    Entries are User instances loaded by request sessions, which never expire
+    on commit, so their attributes stay readable once detached. The TTL bounds
+    how long a change made outside this process can go unnoticed. No route
+    changes is_active, so a user deactivated in the database keeps
+    authenticating for up to AUTH_CACHE_TTL seconds; set it to 0 to check
+    every request against the database.
+    """
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, username: str) -> Optional[User]:
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at <= time.monotonic():
+                del self._entries[username]
+                return None
+            self._entries.move_to_end(username)
+            return user
+
+    def put(self, username: str, user: User):
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[username] = (time.monotonic() + self.ttl, user)
+            self._entries.move_to_end(username)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, username: str):
+        with self._lock:
+            self._entries.pop(username, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+user_cache = UserCache(settings.auth_cache_ttl, settings.auth_cache_size)
+
 # Functions
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -45,14 +111,27 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
-def get_user(db: Session, username: str):
-    return db.query(User).filter(User.username == username).first()
+async def run_password_hashing(fn, *args):
+    try:
+        return await password_executor.run(fn, *args)
+    except ExecutorSaturated:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many concurrent logins, try again shortly",
+            headers={"Retry-After": "1"},
+        )
+
+async def get_user(db: AsyncSession, username: str):
+    return await db.scalar(select(User).where(User.username == username))
 
-def authenticate_user(db: Session, username: str, password: str):
-    user = get_user(db, username)
+async def authenticate_user(db: AsyncSession, username: str, password: str):
+    user = await get_user(db, username)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    # End the read transaction so the pooled connection is not held while the
+    # check waits for a bcrypt worker
+    await db.commit()
+    if not await run_password_hashing(verify_password, password, user.hashed_password):
         return False
     return user
 
@@ -66,7 +145,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -80,9 +159,12 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         token_data = TokenData(username=username)
     except JWTError:
         raise credentials_exception
-    user = get_user(db, username=token_data.username)
+    user = user_cache.get(token_data.username)
     if user is None:
-        raise credentials_exception
+        user = await get_user(db, username=token_data.username)
+        if user is None:
+            raise credentials_exception
+        user_cache.put(token_data.username, user)
     return user
 
 async def get_current_active_user(current_user: User = Depends(get_current_user)):
@@ -91,8 +173,9 @@ async def get_current_active_user(current_user: User = Depends(get_current_user)
     return current_user
 
 # Initialize admin user if it doesn't exist
+# Runs once at startup on a plain sync Session
 def initialize_admin_user(db: Session):
-    admin = get_user(db, DEFAULT_ADMIN_USERNAME)
+    admin = db.query(User).filter(User.username == DEFAULT_ADMIN_USERNAME).first()
     if not admin:
         admin_user = User(
             username=DEFAULT_ADMIN_USERNAME,
@@ -106,12 +189,23 @@ def initialize_admin_user(db: Session):
     return False
 
 # User management
-def update_user_password(db: Session, user: User, new_password: str):
-    user.hashed_password = get_password_hash(new_password)
-    db.commit()
+# The user passed in may be a cached instance from an earlier session, so it
+# is reloaded into this one before being modified
+async def update_user_password(db: AsyncSession, user: User, new_password: str):
+    hashed_password = await run_password_hashing(get_password_hash, new_password)
+    user = await db.get(User, user.id)
+    user.hashed_password = hashed_password
+    await db.commit()
+    user_cache.invalidate(user.username)
     return user
 
-def update_last_login(db: Session, user: User):
-    user.last_login = datetime.utcnow()
-    db.commit()
-    return user 
\ No newline at end of file
+# Runs as a background task after the login response is sent, on its own session
+async def update_last_login(user_id: int, username: str):
+    try:
+        async with open_session() as db:
+            await db.execute(update(User).where(User.id == user_id).values(last_login=datetime.utcnow()))
+            await db.commit()
+        user_cache.invalidate(username)
+    except Exception as e:
+        logger.warning(f"Could not record last login for {username}: {e}")
+ 
\ No newline at end of file
@@ -0,0 +1,28 @@
+from typing import Dict, List, Sequence
+from fastapi import Depends, HTTPException, Query
+
+# Most keys one batch request may resolve; callers split longer lists
+MAX_BATCH_IDS = 500
+
+def batch_keys(
+    ids: List[str] = Query([], description=f"Comma-separated keys (or the parameter repeated), at most {MAX_BATCH_IDS}")
+) -> List[str]:
+    """The distinct keys of a batch lookup, in the order they were asked for"""
+    keys = list(dict.fromkeys(key.strip() for value in ids for key in value.split(",") if key.strip()))
+    if not keys:
+        raise HTTPException(status_code=400, detail="No ids given")
+    if len(keys) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_IDS} ids per request")
+    return keys
+
+def batch_ids(keys: List[str] = Depends(batch_keys)) -> List[int]:
+    """batch_keys() for integer primary keys"""
+    try:
+        return [int(key) for key in keys]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be integers")
+
+def in_request_order(rows: Sequence, keys: Sequence, field: str) -> List:
+    """Sort rows found by a batch lookup into the order of ``keys``; keys with no row are left out"""
+    position: Dict = {key: index for index, key in enumerate(keys)}
+    return sorted(rows, key=lambda row: position[getattr(row, field)])
@@ -0,0 +1,34 @@
+from fastapi import HTTPException, Request, Response, status
+from .stream import change_broker
+
+# Log rows are never updated once written, so clients may keep them for good
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses weak comparison, so W/ prefixes are ignored
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag.removeprefix("W/") in {tag.removeprefix("W/") for tag in candidates}
+
+def conditional(*resources: str):
+    """Dependency answering GETs with 304 Not Modified while ``resources`` are unchanged.
+
+    The ETag is the change broker's version vector for the tables the route
+    reads, so validating it costs no query. It is taken before the route runs,
+    so a change landing mid-request can only make the tag older than the body,
+    which costs the client one extra refetch but never hides a change.
+    """
+    async def check_not_modified(request: Request, response: Response):
+        tag = change_broker.version_tag(resources)
+        if tag is None:
+            return
+        etag = f'W/"{tag}"'
+        if _matches(request.headers.get("if-none-match", ""), etag):
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+        # Cacheable, but always revalidated
+        response.headers["Cache-Control"] = "private, no-cache"
+    return check_not_modified
+
+async def immutable(response: Response):
+    """Dependency marking the response as never changing"""
+    response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
@@ -0,0 +1,108 @@
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Generic, List, Optional, Tuple, TypeVar
+from fastapi import HTTPException
+from pydantic import BaseModel
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+T = TypeVar("T")
+
+# Tokens are "<xid>-<seq>" of the last change_log entry a reader has seen
+TOKEN_PATTERN = re.compile(r"^(\d+)-(\d+)$")
+
+class ChangeEntry(BaseModel, Generic[T]):
+    op: str  # 'upsert', 'delete' (a tombstone), 'reset' after a truncate or 'expire'
+    id: Optional[int] = None
+    row: Optional[T] = None
+    # For 'expire': every message published before this is gone
+    expired_before: Optional[datetime] = None
+
+class ChangeFeed(BaseModel, Generic[T]):
+    changes: List[ChangeEntry[T]]
+    next: str
+    has_more: bool = False
+
+def encode_token(xid: int, seq: int) -> str:
+    return f"{xid}-{seq}"
+
+def decode_token(token: str) -> Tuple[int, int]:
+    match = TOKEN_PATTERN.match(token)
+    if match is None:
+        raise HTTPException(status_code=400, detail="Invalid change token")
+    return int(match.group(1)), int(match.group(2))
+
+@dataclass
+class ChangeWindow:
+    """Collapsed changes to one table after a token, oldest first, as (row id, op, expired_before)"""
+    entries: List[Tuple[Optional[int], str, Optional[datetime]]]
+    next_token: str
+    has_more: bool
+
+    @property
+    def upserted_ids(self) -> List[int]:
+        return [row_id for row_id, op, _ in self.entries if op == "upsert"]
+
+    def feed(self, rows_by_id: Dict[int, object]) -> Dict:
+        """Pair upserts with the rows' current state and build the response body"""
+        changes = []
+        for row_id, op, expired_before in self.entries:
+            row = rows_by_id.get(row_id) if op == "upsert" else None
+            if op == "upsert" and row is None:
+                # Deleted by a transaction past this window; its tombstone follows later too
+                op = "delete"
+            changes.append({"op": op, "id": row_id, "row": row, "expired_before": expired_before})
+        return {"changes": changes, "next": self.next_token, "has_more": self.has_more}
+
+async def read_changes(db: AsyncSession, table_name: str, since: Optional[str], limit: int) -> ChangeWindow:
+    """Read the changes to ``table_name`` recorded after ``since``.
+
+    Only transactions older than the current snapshot's xmin are read, as all
+    of them have finished and no later write can sort before them, so every
+    change is returned exactly once in (xid, seq) order. Without ``since``
+    the window is empty and its token marks the present: take the token,
+    load the full list, then follow the feed. A token from before the
+    retention horizon is answered with 410 Gone.
+    """
+    if since is None:
+        xmin = await db.scalar(text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text"))
+        return ChangeWindow([], encode_token(int(xmin), 0), False)
+
+    xid, seq = decode_token(since)
+    position = {"xid": str(xid), "seq": seq}
+    expired = await db.scalar(text(
+        "SELECT 1 FROM change_log_horizon WHERE table_name = :table_name "
+        "AND (xid, seq) > (CAST(CAST(:xid AS text) AS xid8), :seq)"
+    ), {"table_name": table_name, **position})
+    if expired:
+        # Retention pruned changes this token has not seen
+        raise HTTPException(status_code=410, detail="Change token expired; reload and start over")
+
+    rows = (await db.execute(text(
+        "SELECT xid::text AS xid, seq, op, row_id, expired_before FROM change_log "
+        "WHERE table_name = :table_name "
+        "AND (xid, seq) > (CAST(CAST(:xid AS text) AS xid8), :seq) "
+        "AND xid < pg_snapshot_xmin(pg_current_snapshot()) "
+        "ORDER BY xid, seq LIMIT :limit"
+    ), {"table_name": table_name, **position, "limit": limit + 1})).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    # Keep only the latest change per row, ordered by when it happened
+    latest: Dict[object, Tuple[Optional[int], str, Optional[datetime]]] = {}
+    for row in rows:
+        if row.op == "truncate":
+            latest.clear()
+            key, entry = None, (None, "reset", None)
+        elif row.op == "expire":
+            # Applies to the rows as they stood at its place in the feed, so none is merged away
+            key, entry = ("expire", row.seq), (None, "expire", row.expired_before)
+        else:
+            key, entry = row.row_id, (row.row_id, "delete" if row.op == "delete" else "upsert", None)
+        latest.pop(key, None)
+        latest[key] = entry
+
+    next_token = encode_token(int(rows[-1].xid), rows[-1].seq) if rows else since
+    return ChangeWindow(list(latest.values()), next_token, has_more)
@@ -0,0 +1,220 @@
+import threading
+import time
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .config import settings
+
+# zstd and brotli are optional; without them only gzip is offered
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Content types worth compressing; event streams are flushed per event instead
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/plain", "text/html", "text/csv")
+
+class _BrotliCompressor:
+    """brotli.Compressor with the compress/flush interface of the others"""
+
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=settings.compression_brotli_level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.finish()
+
+def _gzip():
+    return zlib.compressobj(settings.compression_gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+def _zstd():
+    return zstandard.ZstdCompressor(level=settings.compression_zstd_level).compressobj()
+
+def available_encodings() -> Dict[str, Callable]:
+    """Compressor factories, in order of preference when a client accepts several equally"""
+    encodings = {}
+    if zstandard is not None:
+        encodings["zstd"] = _zstd
+    if brotli is not None:
+        encodings["br"] = _BrotliCompressor
+    encodings["gzip"] = _gzip
+    return encodings
+
+def negotiate(accept_encoding: str, encodings: List[str]) -> Optional[str]:
+    """Pick the coding with the highest q-value in Accept-Encoding, or None for identity"""
+    weights = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+    wildcard = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for encoding in encodings:
+        q = weights.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+def _compress(compressor, body: bytes, last: bool) -> Tuple[bytes, float]:
+    # thread_time counts only this thread's CPU, wherever it runs
+    start = time.thread_time()
+    data = compressor.compress(body)
+    if last:
+        data += compressor.flush()
+    return data, time.thread_time() - start
+
+# Stats key shared by every request that matched no route
+UNMATCHED_ROUTE = "<unmatched>"
+
+class CompressionStats:
+    """Per-route counters of bytes saved and CPU spent compressing"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: Dict[str, Dict] = {}
+
+    def observe(self, route: str, encoding: Optional[str], size: int, compressed_size: int, cpu_seconds: float):
+        with self._lock:
+            stats = self._routes.setdefault(route, {
+                "responses": 0, "compressed": 0, "bytes_in": 0, "bytes_out": 0,
+                "cpu_ms": 0.0, "encodings": {},
+            })
+            stats["responses"] += 1
+            stats["bytes_in"] += size
+            stats["bytes_out"] += compressed_size
+            if encoding is not None:
+                stats["compressed"] += 1
+                stats["cpu_ms"] += cpu_seconds * 1000
+                stats["encodings"][encoding] = stats["encodings"].get(encoding, 0) + 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            routes = {route: dict(stats, encodings=dict(stats["encodings"])) for route, stats in self._routes.items()}
+        for stats in routes.values():
+            stats["bytes_saved"] = stats["bytes_in"] - stats["bytes_out"]
+            stats["ratio"] = round(stats["bytes_out"] / stats["bytes_in"], 3) if stats["bytes_in"] else 1.0
+            stats["cpu_ms"] = round(stats["cpu_ms"], 3)
+        return routes
+
+compression_stats = CompressionStats()
+
+class CompressionMiddleware:
+    """Compress response bodies with the best coding the client accepts.
+
+    Complete bodies of at least ``min_size`` bytes with a compressible
+    content type are compressed in one go; streamed bodies of those types
+    (exports) are compressed chunk by chunk as they are sent. Anything above
+    ``thread_size`` bytes is compressed in the threadpool so a large page
+    does not stall the event loop. Every eligible response is counted in
+    ``compression_stats`` under its route's path template.
+    """
+
+    def __init__(self, app: ASGIApp, min_size: int, thread_size: int):
+        self.app = app
+        self.min_size = min_size
+        self.thread_size = thread_size
+        self.encodings = available_encodings()
+
+    async def _run(self, compressor, body: bytes, last: bool) -> Tuple[bytes, float]:
+        if len(body) > self.thread_size:
+            return await run_in_threadpool(_compress, compressor, body, last)
+        return _compress(compressor, body, last)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), list(self.encodings))
+        start_message: Optional[Message] = None
+        passthrough = False
+        # Running totals for a streamed body
+        compressor = None
+        size = compressed_size = 0
+        cpu_total = 0.0
+
+        def route_path() -> str:
+            route = scope.get("route")
+            # Raw paths of unmatched requests would let any client add stats keys without bound
+            return route.path if route is not None else UNMATCHED_ROUTE
+
+        async def send_compressed(message: Message):
+            nonlocal start_message, passthrough, compressor, size, compressed_size, cpu_total
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                if "content-encoding" in headers or not content_type.startswith(COMPRESSIBLE_TYPES):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start_message = message
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is not None:
+                # Later chunks of a streamed body
+                data, cpu_seconds = await self._run(compressor, body, not more_body)
+                size += len(body)
+                compressed_size += len(data)
+                cpu_total += cpu_seconds
+                if not more_body:
+                    compression_stats.observe(route_path(), encoding, size, compressed_size, cpu_total)
+                await send({"type": "http.response.body", "body": data, "more_body": more_body})
+                return
+
+            headers = MutableHeaders(raw=start_message["headers"])
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                # First chunk of a streamed body: its length is unknown, so compress every stream
+                if encoding is None:
+                    passthrough = True
+                    compression_stats.observe(route_path(), None, 0, 0, 0.0)
+                    await send(start_message)
+                    await send(message)
+                    return
+                compressor = self.encodings[encoding]()
+                del headers["Content-Length"]
+                headers["Content-Encoding"] = encoding
+                await send(start_message)
+                await send_compressed(message)
+                return
+
+            used = None
+            compressed, cpu_seconds = body, 0.0
+            if encoding is not None and len(body) >= self.min_size:
+                compressed, cpu_seconds = await self._run(self.encodings[encoding](), body, True)
+                if len(compressed) < len(body):
+                    used = encoding
+                else:
+                    compressed = body
+            compression_stats.observe(route_path(), used, len(body), len(compressed), cpu_seconds)
+
+            if used is not None:
+                headers["Content-Encoding"] = used
+                headers["Content-Length"] = str(len(compressed))
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_compressed)
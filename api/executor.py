@@ -0,0 +1,78 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict
+from .pool import WaitHistogram
+
+class ExecutorSaturated(RuntimeError):
+    """Raised when a BoundedExecutor's queue is already full"""
+
+class BoundedExecutor:
+    """Small dedicated thread pool for CPU-heavy calls made from async code.
+
+    At most ``workers`` calls run at once and at most ``max_queue`` wait for a
+    worker; anything beyond that is rejected immediately instead of piling up.
+    Queue depth and the time calls spent waiting are kept for /stats.
+    """
+
+    def __init__(self, name: str, workers: int, max_queue: int):
+        self.name = name
+        self.workers = workers
+        self.max_queue = max_queue
+        self.wait_histogram = WaitHistogram()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._max_queued = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+
+    async def run(self, fn: Callable, *args):
+        with self._lock:
+            if self._queued >= self.max_queue:
+                self._rejected += 1
+                raise ExecutorSaturated(f"{self.name} queue is full ({self.max_queue} waiting)")
+            self._queued += 1
+            self._max_queued = max(self._max_queued, self._queued)
+        submitted = time.perf_counter()
+
+        def call():
+            self.wait_histogram.observe((time.perf_counter() - submitted) * 1000)
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+
+        future = self._executor.submit(call)
+        future.add_done_callback(self._release_cancelled)
+        return await asyncio.wrap_future(future)
+
+    def _release_cancelled(self, future: Future):
+        # A call cancelled while still queued never reaches call()
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            status = {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "running": self._running,
+                "queued": self._queued,
+                "max_queued": self._max_queued,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+        status["wait"] = self.wait_histogram.snapshot()
+        return status
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,133 @@
+import csv
+import io
+import logging
+from datetime import datetime
+from typing import AsyncIterator, Dict, List
+from fastapi import HTTPException, status
+from fastapi.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+from pydantic_core import to_json
+from .config import settings
+from .models import open_session
+
+logger = logging.getLogger(__name__)
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+class ExportSlots:
+    """Caps concurrent exports, as each holds a pooled connection until it ends"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+        self.rows = 0
+
+    @property
+    def full(self) -> bool:
+        return self.active >= self.limit
+
+    def reserve(self) -> "ExportSlot":
+        """Take a slot; callers check ``full`` first"""
+        self.active += 1
+        return ExportSlot(self)
+
+    def snapshot(self) -> Dict:
+        return {
+            "active": self.active,
+            "limit": self.limit,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rows": self.rows,
+        }
+
+class ExportSlot:
+    """One reserved export slot; release() may be called more than once"""
+
+    def __init__(self, slots: ExportSlots):
+        self.slots = slots
+        self.held = True
+
+    def release(self):
+        if self.held:
+            self.held = False
+            self.slots.active -= 1
+
+export_slots = ExportSlots(settings.export_max_concurrent)
+
+class ExportResponse(StreamingResponse):
+    """StreamingResponse that closes its body iterator and frees its slot however the response ends"""
+
+    def __init__(self, content, slot: ExportSlot, **kwargs):
+        super().__init__(content, **kwargs)
+        self.slot = slot
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            # A client that goes away leaves the generator suspended at a yield;
+            # close it now so the cursor's connection returns to the pool
+            # instead of waiting for garbage collection
+            await self.body_iterator.aclose()
+            # A body that never started has no finally of its own to run
+            self.slot.release()
+
+def _encode_ndjson(rows) -> bytes:
+    return b"".join(to_json(row._asdict()) + b"\n" for row in rows)
+
+def _encode_csv(rows) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([value.isoformat() if isinstance(value, datetime) else value for value in row])
+    return buffer.getvalue().encode()
+
+async def _export_rows(statement, fields: List[str], fmt: str, slot: ExportSlot) -> AsyncIterator[bytes]:
+    try:
+        async with open_session() as db:
+            result = await db.stream(statement.execution_options(yield_per=settings.export_batch_size))
+            if fmt == "csv":
+                yield (",".join(fields) + "\r\n").encode()
+            encode = _encode_csv if fmt == "csv" else _encode_ndjson
+            while True:
+                rows = await result.fetchmany(settings.export_batch_size)
+                if not rows:
+                    break
+                export_slots.rows += len(rows)
+                yield encode(rows)
+            await result.close()
+        export_slots.completed += 1
+    except Exception as e:
+        # The status line is long gone; aborting the body is all that is left
+        export_slots.failed += 1
+        logger.warning(f"Export failed mid-stream: {e}")
+        raise
+    finally:
+        slot.release()
+
+def export_response(statement, fields: List[str], fmt: str, name: str) -> ExportResponse:
+    """Stream the rows of ``statement`` as NDJSON or CSV with constant memory.
+
+    Rows are read through a server-side cursor ``export_batch_size`` at a
+    time on a session of the export's own, since the body outlives the
+    request's session. ``statement`` must select columns named ``fields``.
+    """
+    if export_slots.full:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many exports running",
+            headers={"Retry-After": "30"},
+        )
+    # Reserved now, not when the body starts, so simultaneous requests all see it
+    slot = export_slots.reserve()
+    return ExportResponse(
+        _export_rows(statement, fields, fmt, slot),
+        slot,
+        media_type=EXPORT_MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'},
+    )
@@ -0,0 +1,226 @@
+import base64
+import binascii
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+from fastapi import HTTPException, Query, Request, Response
+from sqlalchemy import and_, or_, select, tuple_, union_all
+from .pagination import NEXT_CURSOR_HEADER
+
+# Operator sets for Field.ops. "in" is only offered on unique columns, where
+# the matches are few enough to sort; an in-list on any other column would
+# have to read and sort every match to return them in order
+EQUALITY_OPS = frozenset({"eq"})
+LOOKUP_OPS = frozenset({"eq", "in"})
+RANGE_OPS = frozenset({"gt", "gte", "lt", "lte"})
+TEXT_OPS = frozenset({"eq", "in", "prefix"})
+
+def escape_like(text: str) -> str:
+    """``text`` with the LIKE wildcards and escape character escaped"""
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+@dataclass
+class Field:
+    """A column a list route filters or sorts on, and the filter operators it takes"""
+    column: Any
+    ops: FrozenSet[str]
+    sortable: bool = False
+    unique: bool = False
+
+    def parse(self, name: str, raw: str):
+        python_type = self.column.type.python_type
+        try:
+            if python_type is bool:
+                if raw.lower() not in ("true", "false", "1", "0"):
+                    raise ValueError(raw)
+                return raw.lower() in ("true", "1")
+            if python_type is datetime:
+                return datetime.fromisoformat(raw)
+            return python_type(raw)
+        except ValueError:
+            raise HTTPException(status_code=400, detail=f"Invalid value for {name}: {raw!r}")
+
+@dataclass
+class ListSpec:
+    """Filters, sorts and indexes of one list route.
+
+    ``indexes`` lists the leading columns (by field name) of the btree
+    indexes on the table; every index is taken to end in ``id``, which breaks
+    sort ties. A request is only run when one index serves it: its equality
+    filters match the index's leading columns, in any order, the sort key
+    comes next, and range and prefix filters are on the sort key alone. The
+    database then reads one contiguous slice of the index in order instead
+    of scanning and sorting the table. Equality on a unique field matches so
+    few rows that it is always served, whatever the sort.
+    """
+    fields: Dict[str, Field]
+    indexes: List[Tuple[str, ...]]
+    default_sort: str
+
+    def servable(self, equalities: FrozenSet[str], ranges: FrozenSet[str], sort: str) -> bool:
+        if any(self.fields[name].unique for name in equalities):
+            return True
+        for index in self.indexes + [()]:
+            columns = index if index[-1:] == ("id",) else index + ("id",)
+            if frozenset(columns[:len(equalities)]) != equalities:
+                continue
+            rest = columns[len(equalities):]
+            if rest and rest[0] == sort and ranges <= {sort}:
+                return True
+        return False
+
+@dataclass
+class ListQuery:
+    """One request's filters, sort and keyset position, compiled onto a select"""
+    spec: ListSpec
+    sort: str
+    descending: bool
+    after: Optional[str]
+    filters: List[Tuple[str, str, Any]] = field(default_factory=list)
+
+    def filter(self, name: str, op: str, value) -> "ListQuery":
+        """Add a filter on behalf of one of the route's own parameters"""
+        if value is not None:
+            self.filters.append((name, op, value))
+        return self
+
+    def _check(self):
+        equalities = frozenset(name for name, op, _ in self.filters if op in LOOKUP_OPS)
+        ranges = frozenset(name for name, op, _ in self.filters if op not in LOOKUP_OPS)
+        if not self.spec.servable(equalities, ranges, self.sort):
+            filtered = ", ".join(sorted(equalities | ranges)) or "nothing"
+            raise HTTPException(
+                status_code=400,
+                detail=f"No index serves sorting by {self.sort} while filtering on {filtered}",
+            )
+
+    def _condition(self, name: str, op: str, value):
+        column = self.spec.fields[name].column
+        if op == "eq":
+            return column == value
+        if op == "in":
+            return column.in_(value)
+        if op == "gt":
+            return column > value
+        if op == "gte":
+            return column >= value
+        if op == "lt":
+            return column < value
+        if op == "lte":
+            return column <= value
+        # The lower bound lets the index seek straight to the first match
+        return and_(column >= value, column.like(f"{escape_like(value)}%"))
+
+    def apply(self, query, skip: int, limit: int):
+        """Filter, order and page ``query`` in one statement; the keyset cursor overrides ``skip``"""
+        self._check()
+        for name, op, value in self.filters:
+            query = query.where(self._condition(name, op, value))
+        sort_field = self.spec.fields[self.sort]
+        sort_column = sort_field.column
+        id_column = self.spec.fields["id"].column
+        # id breaks ties, which a unique sort key has none of
+        keys = [sort_column] if sort_field.unique else [sort_column, id_column]
+        # NULLs go where the btree indexes keep them: first descending, last ascending
+        order = [key.desc().nulls_first() if self.descending else key.asc().nulls_last() for key in keys]
+        filtered, query = query, query.order_by(*order)
+        if self.after:
+            position = decode_position(self.after, [sort_field, self.spec.fields["id"]][:len(keys)])
+            if len(keys) == 1:
+                query = query.where(sort_column < position[0] if self.descending else sort_column > position[0])
+            elif position[0] is None:
+                if self.descending:
+                    # The rest of the NULL rows, then every non-NULL row
+                    query = query.where(or_(and_(sort_column.is_(None), id_column < position[1]), sort_column.is_not(None)))
+                else:
+                    query = query.where(sort_column.is_(None), id_column > position[1])
+            elif self.descending:
+                # The plain bound is implied by the row comparison but, unlike it, prunes partitions
+                query = query.where(sort_column <= position[0], tuple_(*keys) < tuple_(*position))
+            else:
+                query = query.where(sort_column >= position[0], tuple_(*keys) > tuple_(*position))
+                if sort_column.nullable:
+                    # The seek leaves out the trailing NULLs to stay on the index, so a
+                    # second seek reads their head and the page runs on into them
+                    nulls = filtered.where(sort_column.is_(None)).order_by(*order).limit(limit)
+                    page = union_all(query.limit(limit), nulls).subquery()
+                    return select(page).order_by(
+                        page.corresponding_column(sort_column).asc().nulls_last(),
+                        page.corresponding_column(id_column).asc(),
+                    ).limit(limit)
+        else:
+            query = query.offset(skip)
+        return query.limit(limit)
+
+    def set_next_cursor(self, response: Response, rows, limit: int) -> Optional[str]:
+        """Set the next-page cursor header when the page came back full"""
+        if len(rows) < limit:
+            return None
+        last = rows[-1]
+        position = [getattr(last, self.sort)]
+        if not self.spec.fields[self.sort].unique:
+            position.append(last.id)
+        # A unique key is the whole position, so a NULL one cannot be resumed after
+        elif position[0] is None:
+            return None
+        cursor = encode_position(position)
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+        return cursor
+
+def encode_position(values: List) -> str:
+    raw = json.dumps([value.isoformat() if isinstance(value, datetime) else value for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_position(cursor: str, fields: List[Field]) -> List:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        if not isinstance(values, list) or len(values) != len(fields):
+            raise ValueError(cursor)
+        # Only the sort key of a two-key position may be NULL
+        return [
+            None if value is None and index == 0 and len(fields) == 2 else spec_field.parse("after", str(value))
+            for index, (spec_field, value) in enumerate(zip(fields, values))
+        ]
+    except (ValueError, UnicodeDecodeError, binascii.Error, HTTPException):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def list_query(spec: ListSpec):
+    """Dependency parsing a list route's filter, sort and cursor parameters.
+
+    Filters are given as ``field=value`` for equality or ``field__op=value``
+    with op one of in (comma-separated values), gt, gte, lt, lte or prefix.
+    ``sort`` names a sortable field, with a leading '-' for descending.
+    Parameters that name no field are left to the route.
+    """
+    sortable = ", ".join(name for name, spec_field in spec.fields.items() if spec_field.sortable)
+
+    def dependency(
+        request: Request,
+        sort: str = Query(spec.default_sort, description=f"One of {sortable}; prefix with '-' for descending"),
+        after: Optional[str] = Query(None, description="Keyset cursor from X-Next-Cursor; overrides skip"),
+    ) -> ListQuery:
+        name = sort.removeprefix("-")
+        if name not in spec.fields or not spec.fields[name].sortable:
+            raise HTTPException(status_code=400, detail=f"Cannot sort by {name}; sortable fields: {sortable}")
+        query = ListQuery(spec, name, sort.startswith("-"), after)
+        for param, raw in request.query_params.multi_items():
+            name, _, op = param.partition("__")
+            op = op or "eq"
+            if name not in spec.fields:
+                if "__" in param:
+                    raise HTTPException(status_code=400, detail=f"Unknown filter field {name}")
+                continue
+            if op not in spec.fields[name].ops:
+                raise HTTPException(status_code=400, detail=f"Filter {op} is not supported on {name}")
+            if op == "in":
+                value = [spec.fields[name].parse(param, item) for item in raw.split(",") if item]
+            elif op == "prefix":
+                value = raw
+            else:
+                value = spec.fields[name].parse(param, raw)
+            query.filter(name, op, value)
+        return query
+
+    return dependency
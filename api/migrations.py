@@ -0,0 +1,413 @@
+import logging
+from dataclasses import dataclass
+from typing import Callable, List
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from .models import Base
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary key for pg_advisory_lock so that only one API process migrates at a time
+MIGRATION_LOCK_KEY = 7_310_422
+
+@dataclass
+class Migration:
+    """A single schema change identified by a monotonically increasing version.
+
+    Transactional migrations run inside one transaction. Non-transactional ones
+    run on an autocommit connection, which is required for statements such as
+    CREATE INDEX CONCURRENTLY; they must therefore be idempotent.
+    """
+    version: int
+    description: str
+    apply: Callable[[Connection], None]
+    transactional: bool = True
+
+def create_index_concurrently(conn: Connection, name: str, ddl: str):
+    """Build an index without blocking writes to the table.
+
+    An interrupted concurrent build leaves an INVALID index behind that
+    IF NOT EXISTS would silently keep, so drop it first and rebuild.
+    """
+    invalid = conn.execute(text(
+        "SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+        "WHERE c.relname = :name AND NOT i.indisvalid"
+    ), {"name": name}).first()
+    if invalid:
+        logger.warning(f"Dropping invalid index {name} left by an interrupted build")
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+    conn.execute(text(ddl))
+
+def create_log_index_concurrently(conn: Connection, table: str, name: str, definition: str):
+    """create_index_concurrently() that also works once ``table`` is partitioned.
+
+    A partitioned table cannot be indexed concurrently, so each partition is
+    indexed on its own and then attached to an index created on the parent
+    only, which becomes valid once every partition has one. Partitions
+    created later get the index from the parent.
+    """
+    relkind = conn.execute(text("SELECT relkind FROM pg_class WHERE oid = CAST(:table AS regclass)"), {"table": table}).scalar()
+    if relkind != "p":
+        create_index_concurrently(conn, name, f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} {definition}")
+        return
+    conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON ONLY {table} {definition}"))
+    partitions = conn.execute(text(
+        "SELECT CAST(inhrelid AS regclass)::text FROM pg_inherits WHERE inhparent = CAST(:table AS regclass)"
+    ), {"table": table}).scalars().all()
+    for partition in partitions:
+        child = f"{name}_{partition[len(table) + 1:]}" if partition.startswith(f"{table}_") else f"{name}_{partition}"
+        create_index_concurrently(conn, child, f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {child} ON {partition} {definition}")
+        attached = conn.execute(text(
+            "SELECT 1 FROM pg_inherits WHERE inhrelid = CAST(:child AS regclass)"
+        ), {"child": child}).first()
+        if not attached:
+            conn.execute(text(f"ALTER INDEX {name} ATTACH PARTITION {child}"))
+
+# Migrations
+def _create_base_tables(conn: Connection):
+    Base.metadata.create_all(bind=conn)
+
+def _create_log_access_indexes(conn: Connection):
+    # Composite indexes matching the routers' filter + newest-first keyset order
+    create_index_concurrently(conn, "ix_message_logs_published_at_id",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_message_logs_published_at_id "
+        "ON message_logs (published_at DESC, id DESC)")
+    create_index_concurrently(conn, "ix_message_logs_topic_published_at",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_message_logs_topic_published_at "
+        "ON message_logs (topic_id, published_at DESC, id DESC)")
+    create_index_concurrently(conn, "ix_message_logs_publisher_published_at",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_message_logs_publisher_published_at "
+        "ON message_logs (publisher_client_id, published_at DESC, id DESC)")
+    create_index_concurrently(conn, "ix_connection_events_client_timestamp",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_connection_events_client_timestamp "
+        "ON connection_events (client_id, timestamp DESC)")
+
+def _create_log_brin_indexes(conn: Connection):
+    # The log tables are append-only, so physical order follows time and a
+    # BRIN index serves time-range scans at a tiny fraction of a btree's size
+    create_index_concurrently(conn, "brin_message_logs_published_at",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS brin_message_logs_published_at "
+        "ON message_logs USING brin (published_at)")
+    create_index_concurrently(conn, "brin_connection_events_timestamp",
+        "CREATE INDEX CONCURRENTLY IF NOT EXISTS brin_connection_events_timestamp "
+        "ON connection_events USING brin (timestamp)")
+
+# Large append-only tables whose row counts are kept in table_counters
+COUNTED_TABLES = ("message_logs", "connection_events")
+
+# Rows each table's count is spread over; a table's count is their sum
+COUNTER_SLOTS = 16
+
+def _create_row_counters(conn: Connection):
+    # Statement-level triggers with transition tables touch the counter row
+    # once per INSERT/DELETE statement rather than once per row
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS table_counters ("
+        "table_name TEXT PRIMARY KEY, "
+        "row_count BIGINT NOT NULL DEFAULT 0)"
+    ))
+    conn.execute(text("""
+        CREATE OR REPLACE FUNCTION tinymq_count_rows() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                UPDATE table_counters SET row_count = row_count + (SELECT count(*) FROM new_rows)
+                WHERE table_name = TG_TABLE_NAME;
+            ELSIF TG_OP = 'DELETE' THEN
+                UPDATE table_counters SET row_count = row_count - (SELECT count(*) FROM old_rows)
+                WHERE table_name = TG_TABLE_NAME;
+            ELSIF TG_OP = 'TRUNCATE' THEN
+                UPDATE table_counters SET row_count = 0 WHERE table_name = TG_TABLE_NAME;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """))
+    for table in COUNTED_TABLES:
+        # CREATE TRIGGER locks out writers until this transaction commits, so
+        # the initial count below cannot miss or double-count a row
+        create_count_triggers(conn, table)
+        conn.execute(text(
+            f"INSERT INTO table_counters (table_name, row_count) SELECT '{table}', count(*) FROM {table} "
+            f"ON CONFLICT (table_name) DO UPDATE SET row_count = EXCLUDED.row_count"
+        ))
+
+def _shard_row_counters(conn: Connection):
+    # A single counter row made every insert into a counted table wait for
+    # the previous inserting transaction to commit. Each backend now adds to
+    # the slot picked by its pid, so concurrent writers on different
+    # connections touch different rows. The existing counts stay in slot 0
+    conn.execute(text("ALTER TABLE table_counters ADD COLUMN IF NOT EXISTS slot SMALLINT NOT NULL DEFAULT 0"))
+    conn.execute(text("ALTER TABLE table_counters DROP CONSTRAINT IF EXISTS table_counters_pkey"))
+    conn.execute(text("ALTER TABLE table_counters ADD PRIMARY KEY (table_name, slot)"))
+    for table in COUNTED_TABLES:
+        conn.execute(text(
+            "INSERT INTO table_counters (table_name, slot, row_count) "
+            "SELECT :table, slot, 0 FROM generate_series(0, :slots - 1) AS slot ON CONFLICT DO NOTHING"
+        ), {"table": table, "slots": COUNTER_SLOTS})
+    conn.execute(text(f"""
+        CREATE OR REPLACE FUNCTION tinymq_count_rows() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                UPDATE table_counters SET row_count = row_count + (SELECT count(*) FROM new_rows)
+                WHERE table_name = TG_TABLE_NAME AND slot = pg_backend_pid() % {COUNTER_SLOTS};
+            ELSIF TG_OP = 'DELETE' THEN
+                UPDATE table_counters SET row_count = row_count - (SELECT count(*) FROM old_rows)
+                WHERE table_name = TG_TABLE_NAME AND slot = pg_backend_pid() % {COUNTER_SLOTS};
+            ELSIF TG_OP = 'TRUNCATE' THEN
+                UPDATE table_counters SET row_count = 0 WHERE table_name = TG_TABLE_NAME;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """))
+
+def create_count_triggers(conn: Connection, table: str):
+    conn.execute(text(f"DROP TRIGGER IF EXISTS {table}_count_insert ON {table}"))
+    conn.execute(text(
+        f"CREATE TRIGGER {table}_count_insert AFTER INSERT ON {table} "
+        f"REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT EXECUTE FUNCTION tinymq_count_rows()"
+    ))
+    conn.execute(text(f"DROP TRIGGER IF EXISTS {table}_count_delete ON {table}"))
+    conn.execute(text(
+        f"CREATE TRIGGER {table}_count_delete AFTER DELETE ON {table} "
+        f"REFERENCING OLD TABLE AS old_rows FOR EACH STATEMENT EXECUTE FUNCTION tinymq_count_rows()"
+    ))
+    conn.execute(text(f"DROP TRIGGER IF EXISTS {table}_count_truncate ON {table}"))
+    conn.execute(text(
+        f"CREATE TRIGGER {table}_count_truncate AFTER TRUNCATE ON {table} "
+        f"FOR EACH STATEMENT EXECUTE FUNCTION tinymq_count_rows()"
+    ))
+
+# Tables whose row changes are published on CHANGE_CHANNEL for /stream
+NOTIFY_TABLES = ("clients", "topics", "subscriptions", "message_logs", "connection_events")
+CHANGE_CHANNEL = "tinymq_changes"
+
+# Set (SET LOCAL) by bulk purges, which announce their deletes with one
+# summary notification instead of one per row
+BULK_PURGE_SETTING = "tinymq.bulk_purge"
+
+def _create_notify_function(conn: Connection):
+    # NOTIFY is delivered at commit and dropped for rolled back transactions,
+    # so listeners only ever see committed rows. Row triggers on a partitioned
+    # table fire on its partitions, so the table to report is passed in
+    conn.execute(text(f"""
+        CREATE OR REPLACE FUNCTION tinymq_notify_change() RETURNS trigger AS $$
+        DECLARE
+            source_table text := CASE WHEN TG_NARGS > 0 THEN TG_ARGV[0] ELSE TG_TABLE_NAME END;
+            row_data jsonb;
+            payload text;
+        BEGIN
+            IF current_setting('{BULK_PURGE_SETTING}', true) = 'on' THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP = 'DELETE' THEN
+                row_data := to_jsonb(OLD);
+            ELSE
+                row_data := to_jsonb(NEW);
+            END IF;
+            payload := jsonb_build_object('table', source_table, 'op', lower(TG_OP), 'row', row_data)::text;
+            -- NOTIFY payloads are limited to 8000 bytes; drop the largest column if needed
+            IF octet_length(payload) > 7900 THEN
+                payload := jsonb_build_object('table', source_table, 'op', lower(TG_OP),
+                    'row', row_data - 'payload_preview', 'truncated', true)::text;
+            END IF;
+            PERFORM pg_notify('{CHANGE_CHANNEL}', payload);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """))
+
+def create_notify_trigger(conn: Connection, table: str):
+    conn.execute(text(f"DROP TRIGGER IF EXISTS {table}_notify_change ON {table}"))
+    conn.execute(text(
+        f"CREATE TRIGGER {table}_notify_change AFTER INSERT OR UPDATE OR DELETE ON {table} "
+        f"FOR EACH ROW EXECUTE FUNCTION tinymq_notify_change('{table}')"
+    ))
+
+def _create_change_notify_triggers(conn: Connection):
+    _create_notify_function(conn)
+    for table in NOTIFY_TABLES:
+        create_notify_trigger(conn, table)
+
+# Tables whose changes are recorded in change_log for the /changes feeds
+CHANGE_LOG_TABLES = NOTIFY_TABLES
+
+def _create_change_log(conn: Connection):
+    # Entries carry the writing transaction's id so that readers can stop at
+    # the oldest transaction still in flight; seq alone is assigned before
+    # commit and would let a slow transaction slip behind a reader's token
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS change_log ("
+        "seq BIGSERIAL PRIMARY KEY, "
+        "xid xid8 NOT NULL DEFAULT pg_current_xact_id(), "
+        "table_name TEXT NOT NULL, "
+        "op TEXT NOT NULL, "
+        "row_id BIGINT, "
+        "changed_at TIMESTAMP NOT NULL DEFAULT now())"
+    ))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_change_log_table_xid_seq ON change_log (table_name, xid, seq)"
+    ))
+    conn.execute(text("""
+        CREATE OR REPLACE FUNCTION tinymq_log_changes() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                INSERT INTO change_log (table_name, op, row_id) SELECT TG_TABLE_NAME, 'delete', id FROM old_rows;
+            ELSIF TG_OP = 'TRUNCATE' THEN
+                INSERT INTO change_log (table_name, op) VALUES (TG_TABLE_NAME, 'truncate');
+            ELSE
+                INSERT INTO change_log (table_name, op, row_id) SELECT TG_TABLE_NAME, lower(TG_OP), id FROM new_rows;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """))
+    for table in CHANGE_LOG_TABLES:
+        create_change_log_triggers(conn, table)
+
+def create_change_log_triggers(conn: Connection, table: str):
+    # Transition tables allow only one event per trigger, hence one trigger each
+    for event, transition in (("insert", "NEW TABLE AS new_rows"), ("update", "NEW TABLE AS new_rows"),
+                              ("delete", "OLD TABLE AS old_rows")):
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {table}_log_{event} ON {table}"))
+        conn.execute(text(
+            f"CREATE TRIGGER {table}_log_{event} AFTER {event.upper()} ON {table} "
+            f"REFERENCING {transition} FOR EACH STATEMENT EXECUTE FUNCTION tinymq_log_changes()"
+        ))
+    conn.execute(text(f"DROP TRIGGER IF EXISTS {table}_log_truncate ON {table}"))
+    conn.execute(text(
+        f"CREATE TRIGGER {table}_log_truncate AFTER TRUNCATE ON {table} "
+        f"FOR EACH STATEMENT EXECUTE FUNCTION tinymq_log_changes()"
+    ))
+
+def _create_change_log_horizon(conn: Connection):
+    # Per table, the position of the newest change_log entry pruned by
+    # retention; tokens older than it may have missed changes and are refused
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS change_log_horizon ("
+        "table_name TEXT PRIMARY KEY, "
+        "xid xid8 NOT NULL, "
+        "seq BIGINT NOT NULL)"
+    ))
+
+def _add_change_log_expiry(conn: Connection):
+    # Dropping a message partition writes one 'expire' entry instead of a
+    # tombstone per row: every row published before expired_before is gone
+    conn.execute(text("ALTER TABLE change_log ADD COLUMN IF NOT EXISTS expired_before TIMESTAMP"))
+
+def _create_message_rollups(conn: Connection):
+    # Per-bucket message statistics by topic and publisher; widths are '1m',
+    # '1h' and '1d'. Averages are total_size / message_count
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS message_rollups ("
+        "width TEXT NOT NULL, "
+        "bucket TIMESTAMP NOT NULL, "
+        "topic_id INTEGER NOT NULL, "
+        "publisher_client_id TEXT NOT NULL, "
+        "message_count BIGINT NOT NULL, "
+        "total_size BIGINT NOT NULL, "
+        "min_size INTEGER, "
+        "max_size INTEGER, "
+        "PRIMARY KEY (width, topic_id, bucket, publisher_client_id))"
+    ))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_message_rollups_publisher "
+        "ON message_rollups (width, publisher_client_id, bucket)"
+    ))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_message_rollups_bucket ON message_rollups (width, bucket)"
+    ))
+    # The change_log position up to which messages have been rolled up
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS rollup_progress ("
+        "name TEXT PRIMARY KEY, "
+        "token TEXT NOT NULL)"
+    ))
+
+def _create_payload_trigram_index(conn: Connection):
+    # pg_trgm ships with PostgreSQL's contrib modules and is trusted, so the
+    # database owner may install it. Without it /messages/search answers 503
+    available = conn.execute(text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")).first()
+    if not available:
+        logger.warning("pg_trgm is not available on the database server; message search is disabled")
+        return
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    # The GIN index serves ILIKE '%...%' on the previews
+    create_log_index_concurrently(conn, "message_logs", "ix_message_logs_payload_preview_trgm",
+                                  "USING gin (payload_preview gin_trgm_ops)")
+
+def _create_list_indexes(conn: Connection):
+    # One index per filter the list routes accept, each ending in the sort
+    # key and then id, so api.listing can page through any of them in order
+    for table, name, columns in (
+        ("clients", "ix_clients_active_id", "active, id"),
+        ("topics", "ix_topics_owner_client_id_id", "owner_client_id, id"),
+        ("subscriptions", "ix_subscriptions_active_id", "active, id"),
+        ("subscriptions", "ix_subscriptions_client_id_id", "client_id, id"),
+        ("subscriptions", "ix_subscriptions_topic_id_id", "topic_id, id"),
+        ("connection_events", "ix_connection_events_timestamp_id", "timestamp DESC, id DESC"),
+        ("connection_events", "ix_connection_events_type_timestamp", "event_type, timestamp DESC, id DESC"),
+        ("connection_events", "ix_connection_events_client_timestamp_id", "client_id, timestamp DESC, id DESC"),
+    ):
+        create_index_concurrently(conn, name, f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns})")
+    # Superseded by the index above, which also covers the id tie-break
+    conn.execute(text("DROP INDEX CONCURRENTLY IF EXISTS ix_connection_events_client_timestamp"))
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Create base tables", _create_base_tables),
+    Migration(2, "Composite indexes for message and event access paths", _create_log_access_indexes, transactional=False),
+    Migration(3, "BRIN indexes on append-only timestamp columns", _create_log_brin_indexes, transactional=False),
+    Migration(4, "Trigger-maintained row counters for the log tables", _create_row_counters),
+    Migration(5, "NOTIFY triggers for the live change stream", _create_change_notify_triggers),
+    Migration(6, "Change log behind the incremental /changes feeds", _create_change_log),
+    Migration(7, "Pruning horizon of the change log", _create_change_log_horizon),
+    Migration(8, "NOTIFY triggers name their table, which may be partitioned", _create_change_notify_triggers),
+    Migration(9, "Rollups of message traffic per topic and publisher", _create_message_rollups),
+    Migration(10, "Trigram index on message payload previews", _create_payload_trigram_index, transactional=False),
+    Migration(11, "Indexes behind the filters and sorts of the list routes", _create_list_indexes, transactional=False),
+    Migration(12, "NOTIFY triggers stay quiet during bulk purges", _create_notify_function),
+    Migration(13, "Range expiry entries in the change log", _add_change_log_expiry),
+    Migration(14, "Row counters spread over slot rows", _shard_row_counters),
+]
+
+# Runner
+def _ensure_version_table(conn: Connection):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, "
+        "description TEXT NOT NULL, "
+        "applied_at TIMESTAMP NOT NULL DEFAULT now())"
+    ))
+
+def _record(conn: Connection, migration: Migration):
+    conn.execute(
+        text("INSERT INTO schema_migrations (version, description) VALUES (:version, :description)"),
+        {"version": migration.version, "description": migration.description}
+    )
+
+def get_schema_version(engine: Engine) -> int:
+    """Return the highest applied migration version, or 0 for a fresh database"""
+    with engine.begin() as conn:
+        _ensure_version_table(conn)
+        return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")).scalar()
+
+def run_migrations(engine: Engine) -> int:
+    """Apply all pending migrations in version order and return how many ran"""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as lock_conn:
+        lock_conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        try:
+            current = get_schema_version(engine)
+            pending = [m for m in sorted(MIGRATIONS, key=lambda m: m.version) if m.version > current]
+            for migration in pending:
+                logger.info(f"Applying migration {migration.version}: {migration.description}")
+                if migration.transactional:
+                    with engine.begin() as conn:
+                        migration.apply(conn)
+                        _record(conn, migration)
+                else:
+                    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                        migration.apply(conn)
+                        _record(conn, migration)
+            return len(pending)
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
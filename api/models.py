@@ -1,15 +1,42 @@
 from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, create_engine, Text
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, relationship
 from sqlalchemy.dialects.postgresql import JSONB
+from starlette.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
 import datetime
-from .config import DATABASE_URL
+from .config import DATABASE_URL, ASYNC_DATABASE_URL, settings
+from .pool import InstrumentedQueuePool, InstrumentedAsyncQueuePool
+
+POOL_OPTIONS = dict(
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_timeout=settings.db_pool_timeout,
+    pool_recycle=settings.db_pool_recycle,
+    pool_pre_ping=settings.db_pool_pre_ping
+)
 
 # Create SQLAlchemy engine and session factory
-engine = create_engine(DATABASE_URL)
+# The sync engine always exists: migrations and startup tasks run on it
+engine = create_engine(DATABASE_URL, poolclass=InstrumentedQueuePool, **POOL_OPTIONS)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Sessions handed to request handlers never expire on commit, because a
+# lazy refresh during response serialization would do I/O outside the
+# session's await points
+RequestSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
+
+# Async engine used by request handlers when DB_ASYNC is enabled
+async_engine = None
+AsyncSessionLocal = None
+if settings.db_async:
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, poolclass=InstrumentedAsyncQueuePool, **POOL_OPTIONS)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 # Base class for ORM models
+# Secondary indexes on the log tables are built by api/migrations.py so that
+# they can be created concurrently on a live database
 Base = declarative_base()
 
 # Admin user table for API authentication
@@ -142,10 +169,88 @@ class TopicAdmin(Base):
     topic = relationship("Topic", back_populates="topic_admins")
     admin_client = relationship("Client", back_populates="topic_admins")
 
+class ThreadedResult:
+    """Awaitable facade over a sync Result read through a server-side cursor"""
+
+    def __init__(self, result):
+        self.sync_result = result
+
+    async def fetchmany(self, size=None):
+        return await run_in_threadpool(self.sync_result.fetchmany, size)
+
+    async def close(self):
+        await run_in_threadpool(self.sync_result.close)
+
+class ThreadedSession:
+    """Awaitable facade over a sync Session for when DB_ASYNC is disabled.
+
+    It mirrors the subset of the AsyncSession API used by the routers and runs
+    every database call in Starlette's threadpool, so the same async route
+    code works in both database modes.
+    """
+
+    def __init__(self, session: Session):
+        self.sync_session = session
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    async def execute(self, statement, params=None, **kwargs):
+        return await run_in_threadpool(self.sync_session.execute, statement, params, **kwargs)
+
+    async def scalar(self, statement, params=None, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalar, statement, params, **kwargs)
+
+    async def scalars(self, statement, params=None, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalars, statement, params, **kwargs)
+
+    async def get(self, entity, ident, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kwargs)
+
+    async def stream(self, statement, params=None, **kwargs):
+        # Like AsyncSession.stream, rows come from a server-side cursor
+        statement = statement.execution_options(stream_results=True)
+        return ThreadedResult(await run_in_threadpool(self.sync_session.execute, statement, params, **kwargs))
+
+    async def delete(self, instance):
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def flush(self):
+        await run_in_threadpool(self.sync_session.flush)
+
+    async def commit(self):
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def refresh(self, instance, attribute_names=None):
+        await run_in_threadpool(self.sync_session.refresh, instance, attribute_names)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+    async def close(self):
+        await run_in_threadpool(self.sync_session.close)
+
+# Request-mode session outside of dependency injection, e.g. for background tasks
+@asynccontextmanager
+async def open_session():
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+    else:
+        db = ThreadedSession(RequestSessionLocal())
+        try:
+            yield db
+        finally:
+            await db.close()
+
 # Function to get a database session
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with open_session() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
+
+def get_request_engine():
+    """The engine whose pool serves request handlers in the current mode"""
+    return async_engine.sync_engine if async_engine is not None else engine
\ No newline at end of file
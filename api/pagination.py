@@ -0,0 +1,80 @@
+import base64
+import binascii
+from datetime import datetime
+from typing import Optional, Tuple
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, or_, tuple_
+
+# Header used to hand the opaque keyset cursor back to the caller. Keeping it
+# out of the body lets list routes keep returning a plain JSON array.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(timestamp: Optional[datetime], row_id: int) -> str:
+    """Encode a (timestamp, id) position into an opaque cursor token; a NULL timestamp is left empty"""
+    raw = f"{timestamp.isoformat() if timestamp is not None else ''}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    """Decode a cursor token produced by encode_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        timestamp, row_id = raw.split("|", 1)
+        return (datetime.fromisoformat(timestamp) if timestamp else None), int(row_id)
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def encode_score_cursor(score: float, row_id: int) -> str:
+    """Encode a (relevance score, id) position; repr() round-trips the float exactly"""
+    raw = f"{score!r}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_score_cursor(cursor: str) -> Tuple[float, int]:
+    """Decode a cursor token produced by encode_score_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        score, row_id = raw.split("|", 1)
+        return float(score), int(row_id)
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def paginate(query, timestamp_column, id_column, skip: int, limit: int, after: Optional[str] = None):
+    """Order a query newest first and apply offset or keyset pagination.
+
+    When ``after`` is given the page starts strictly below that (timestamp, id)
+    position, so the database can seek straight to it through the index
+    instead of scanning and discarding ``skip`` rows. The plain timestamp
+    bound is implied by the row comparison but, unlike it, lets the planner
+    skip partitions of a partitioned table.
+
+    Rows without a timestamp come first, as they do in the (timestamp DESC,
+    id DESC) indexes, and a cursor may point into them.
+    """
+    query = query.order_by(timestamp_column.desc().nulls_first(), id_column.desc())
+    if after:
+        timestamp, row_id = decode_cursor(after)
+        if timestamp is None:
+            # The rest of the NULL rows, then every timestamped row
+            query = query.filter(or_(
+                and_(timestamp_column.is_(None), id_column < row_id),
+                timestamp_column.is_not(None),
+            ))
+        else:
+            # Excludes the NULL rows, which all came before
+            query = query.filter(
+                timestamp_column <= timestamp,
+                tuple_(timestamp_column, id_column) < tuple_(timestamp, row_id),
+            )
+    else:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+def set_next_cursor(response: Response, rows, limit: int, timestamp_attr: str, id_attr: str = "id"):
+    """Set the next-page cursor header when the page came back full"""
+    if len(rows) < limit:
+        return None
+    last = rows[-1]
+    cursor = encode_cursor(getattr(last, timestamp_attr), getattr(last, id_attr))
+    response.headers[NEXT_CURSOR_HEADER] = cursor
+    return cursor
@@ -0,0 +1,263 @@
+import json
+import logging
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+from .migrations import (
+    CHANGE_CHANNEL, MIGRATION_LOCK_KEY,
+    create_change_log_triggers, create_count_triggers, create_notify_trigger,
+)
+
+logger = logging.getLogger(__name__)
+
+PARTITIONED_TABLE = "message_logs"
+PARTITION_KEY = "published_at"
+
+# Rows with no published_at, or one no range partition covers yet
+DEFAULT_PARTITION = "message_logs_default"
+
+# The table as it was before partitioning, kept as the partition for all
+# rows older than the first interval
+LEGACY_PARTITION = "message_logs_legacy"
+
+INTERVAL_DAYS = {"day": 1, "week": 7}
+
+# Secondary indexes of migrations 2 and 3, declared on the parent so that every
+# partition gets them; the legacy partition's existing ones are attached as-is
+PARTITIONED_INDEXES = {
+    "ix_message_logs_published_at_id": "(published_at DESC, id DESC)",
+    "ix_message_logs_topic_published_at": "(topic_id, published_at DESC, id DESC)",
+    "ix_message_logs_publisher_published_at": "(publisher_client_id, published_at DESC, id DESC)",
+    "brin_message_logs_published_at": "USING brin (published_at)",
+}
+
+# Migration 10's index, declared only where pg_trgm is installed, as it is there
+TRIGRAM_INDEX = ("ix_message_logs_payload_preview_trgm", "USING gin (payload_preview gin_trgm_ops)")
+
+# Lock waits are capped so that DDL queued behind a long query does not in
+# turn block every insert queued behind it; the next run simply retries
+MAINTENANCE_LOCK_TIMEOUT = "5s"
+
+BOUND_PATTERN = re.compile(r"FROM \((MINVALUE|'[^']*')\) TO \((MAXVALUE|'[^']*')\)")
+
+@dataclass
+class Partition:
+    name: str
+    lower: Optional[datetime]  # None for MINVALUE
+    upper: Optional[datetime]  # None for MAXVALUE
+
+def interval_start(moment: datetime, interval: str) -> datetime:
+    """Start of the day, or the week from Monday, that ``moment`` falls in"""
+    day = datetime(moment.year, moment.month, moment.day)
+    if interval == "week":
+        return day - timedelta(days=day.weekday())
+    return day
+
+def next_boundary(moment: datetime, interval: str) -> datetime:
+    return interval_start(moment, interval) + timedelta(days=INTERVAL_DAYS[interval])
+
+def _literal(moment: datetime) -> str:
+    # Partition bounds cannot be bind parameters
+    return f"'{moment.isoformat(sep=' ')}'"
+
+def _parse_bound(value: str) -> Optional[datetime]:
+    if value in ("MINVALUE", "MAXVALUE"):
+        return None
+    return datetime.fromisoformat(value.strip("'"))
+
+def is_partitioned(conn: Connection) -> bool:
+    return conn.execute(text(
+        "SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(:table)"
+    ), {"table": PARTITIONED_TABLE}).scalar() or False
+
+def range_partitions(conn: Connection) -> List[Partition]:
+    """Range partitions of message_logs, oldest first; the default partition is left out"""
+    rows = conn.execute(text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) AS bound "
+        "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = CAST(:table AS regclass)"
+    ), {"table": PARTITIONED_TABLE}).all()
+    partitions = []
+    for row in rows:
+        match = BOUND_PATTERN.search(row.bound)
+        if match is not None:
+            partitions.append(Partition(row.relname, _parse_bound(match.group(1)), _parse_bound(match.group(2))))
+    return sorted(partitions, key=lambda p: p.lower or datetime.min)
+
+def create_partition(conn: Connection, lower: datetime, upper: datetime) -> str:
+    """Create the partition for [lower, upper) and return its name"""
+    name = f"{PARTITIONED_TABLE}_p{lower:%Y%m%d}"
+    bounds = f"FROM ({_literal(lower)}) TO ({_literal(upper)})"
+    stray = conn.execute(text(
+        f"SELECT 1 FROM {DEFAULT_PARTITION} WHERE {PARTITION_KEY} >= :lower AND {PARTITION_KEY} < :upper LIMIT 1"
+    ), {"lower": lower, "upper": upper}).first()
+    if stray is None:
+        conn.execute(text(f"CREATE TABLE {name} PARTITION OF {PARTITIONED_TABLE} (PRIMARY KEY (id)) FOR VALUES {bounds}"))
+        return name
+
+    # Rows landed in the default partition while nothing covered this range
+    # (no maintenance ran for longer than the partitions made ahead). A range
+    # partition cannot be created over them, so move them across with the
+    # default partition detached, which also keeps its row triggers quiet
+    logger.warning(f"Moving rows from {DEFAULT_PARTITION} into new partition {name}")
+    conn.execute(text(f"ALTER TABLE {PARTITIONED_TABLE} DETACH PARTITION {DEFAULT_PARTITION}"))
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {PARTITIONED_TABLE} INCLUDING DEFAULTS, PRIMARY KEY (id))"))
+    conn.execute(text(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+        f"WHERE {PARTITION_KEY} >= :lower AND {PARTITION_KEY} < :upper RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ), {"lower": lower, "upper": upper})
+    conn.execute(text(f"ALTER TABLE {PARTITIONED_TABLE} ATTACH PARTITION {name} FOR VALUES {bounds}"))
+    conn.execute(text(f"ALTER TABLE {PARTITIONED_TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+    return name
+
+def create_future_partitions(conn: Connection, interval: str, ahead: int) -> List[str]:
+    """Create partitions up to and including ``ahead`` intervals past the current one"""
+    partitions = range_partitions(conn)
+    upper = max((p.upper for p in partitions if p.upper is not None), default=None)
+    now = datetime.utcnow()
+    if upper is None:
+        upper = interval_start(now, interval)
+    target = interval_start(now, interval) + timedelta(days=INTERVAL_DAYS[interval] * (ahead + 1))
+    created = []
+    while upper < target:
+        # Ranges continue from the last bound, so changing the interval only
+        # takes effect once the next aligned boundary is reached
+        boundary = next_boundary(upper, interval)
+        created.append(create_partition(conn, upper, boundary))
+        upper = boundary
+    return created
+
+def expire_partitions(conn: Connection, cutoff: datetime, detach: bool) -> List[str]:
+    """Remove every range partition whose rows are all older than ``cutoff``.
+
+    Dropping a partition bypasses the parent's triggers, so what they would
+    have done for a DELETE is done here, at a cost that does not grow with
+    the partition: one change_log 'expire' entry stands for all its rows,
+    the row counter is decreased by the planner's estimate of them and one
+    notification tells listeners the messages changed.
+    """
+    expired = []
+    for partition in range_partitions(conn):
+        if partition.upper is None or partition.upper > cutoff:
+            continue
+        # Taken before the DETACH, which leaves the statistics behind with the table
+        estimate = conn.execute(text(
+            "SELECT GREATEST(reltuples, 0)::bigint FROM pg_class WHERE oid = CAST(:partition AS regclass)"
+        ), {"partition": partition.name}).scalar()
+        conn.execute(text(
+            "INSERT INTO change_log (table_name, op, expired_before) VALUES (:table_name, 'expire', :upper)"
+        ), {"table_name": PARTITIONED_TABLE, "upper": partition.upper})
+        # Any slot will do, as only the sum is read
+        conn.execute(text(
+            "UPDATE table_counters SET row_count = row_count - :estimate WHERE table_name = :table_name AND slot = 0"
+        ), {"table_name": PARTITIONED_TABLE, "estimate": estimate})
+        conn.execute(text(f"ALTER TABLE {PARTITIONED_TABLE} DETACH PARTITION {partition.name}"))
+        if not detach:
+            conn.execute(text(f"DROP TABLE {partition.name}"))
+        expired.append(partition.name)
+    if expired:
+        conn.execute(text("SELECT pg_notify(:channel, :payload)"), {
+            "channel": CHANGE_CHANNEL,
+            "payload": json.dumps({"table": PARTITIONED_TABLE, "op": "expire", "row": {}}),
+        })
+    return expired
+
+def _convert(conn: Connection, interval: str):
+    """Turn message_logs into a partitioned table in place.
+
+    The existing table becomes the partition for everything before the next
+    interval boundary, so no rows are copied: the cost is one scan to check
+    the partition bound. Triggers are moved to the parent, and its indexes
+    adopt the old table's equivalent ones.
+    """
+    conn.execute(text(f"LOCK TABLE {PARTITIONED_TABLE} IN ACCESS EXCLUSIVE MODE"))
+    triggers = conn.execute(text(
+        "SELECT tgname FROM pg_trigger WHERE tgrelid = CAST(:table AS regclass) AND NOT tgisinternal"
+    ), {"table": PARTITIONED_TABLE}).scalars().all()
+    for trigger in triggers:
+        conn.execute(text(f"DROP TRIGGER {trigger} ON {PARTITIONED_TABLE}"))
+    foreign_keys = conn.execute(text(
+        "SELECT conname, pg_get_constraintdef(oid) AS definition FROM pg_constraint "
+        "WHERE conrelid = CAST(:table AS regclass) AND contype = 'f'"
+    ), {"table": PARTITIONED_TABLE}).all()
+    sequence = conn.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": PARTITIONED_TABLE}).scalar()
+
+    conn.execute(text(f"ALTER TABLE {PARTITIONED_TABLE} RENAME TO {LEGACY_PARTITION}"))
+    indexes = conn.execute(text(
+        "SELECT indexname FROM pg_indexes WHERE schemaname = current_schema() AND tablename = :table"
+    ), {"table": LEGACY_PARTITION}).scalars().all()
+    for index in indexes:
+        conn.execute(text(f"ALTER INDEX {index} RENAME TO {index.replace(PARTITIONED_TABLE, LEGACY_PARTITION, 1)}"))
+
+    # A primary key on a partitioned table must include the partition key,
+    # which may be NULL here; each partition keys on id instead, and ids stay
+    # unique across them as they all come from the one sequence
+    conn.execute(text(
+        f"CREATE TABLE {PARTITIONED_TABLE} (LIKE {LEGACY_PARTITION} INCLUDING DEFAULTS) "
+        f"PARTITION BY RANGE ({PARTITION_KEY})"
+    ))
+    if sequence is not None:
+        conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {PARTITIONED_TABLE}.id"))
+    for foreign_key in foreign_keys:
+        conn.execute(text(f"ALTER TABLE {PARTITIONED_TABLE} ADD CONSTRAINT {foreign_key.conname} {foreign_key.definition}"))
+    for index, definition in PARTITIONED_INDEXES.items():
+        conn.execute(text(f"CREATE INDEX {index} ON {PARTITIONED_TABLE} {definition}"))
+    if conn.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).first():
+        index, definition = TRIGRAM_INDEX
+        conn.execute(text(f"CREATE INDEX {index} ON {PARTITIONED_TABLE} {definition}"))
+    conn.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {PARTITIONED_TABLE} (PRIMARY KEY (id)) DEFAULT"))
+
+    # Range partitions do not take NULL keys
+    conn.execute(text(
+        f"WITH moved AS (DELETE FROM {LEGACY_PARTITION} WHERE {PARTITION_KEY} IS NULL RETURNING *) "
+        f"INSERT INTO {DEFAULT_PARTITION} SELECT * FROM moved"
+    ))
+    newest = conn.execute(text(f"SELECT max({PARTITION_KEY}) FROM {LEGACY_PARTITION}")).scalar()
+    cutover = next_boundary(max(newest or datetime.min, datetime.utcnow()), interval)
+    conn.execute(text(
+        f"ALTER TABLE {PARTITIONED_TABLE} ATTACH PARTITION {LEGACY_PARTITION} "
+        f"FOR VALUES FROM (MINVALUE) TO ({_literal(cutover)})"
+    ))
+
+    create_count_triggers(conn, PARTITIONED_TABLE)
+    create_notify_trigger(conn, PARTITIONED_TABLE)
+    create_change_log_triggers(conn, PARTITIONED_TABLE)
+    logger.info(f"Partitioned {PARTITIONED_TABLE} by {interval}; rows before {cutover} stay in {LEGACY_PARTITION}")
+
+def ensure_partitioned(engine: Engine, interval: str, ahead: int):
+    """Partition message_logs if it is not yet, and create the upcoming partitions"""
+    if interval not in INTERVAL_DAYS:
+        raise ValueError(f"MESSAGE_PARTITION_INTERVAL must be one of {', '.join(INTERVAL_DAYS)}, not {interval!r}")
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as lock_conn:
+        # Serialized with migrations, which may also be rebuilding the table
+        lock_conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        try:
+            with engine.begin() as conn:
+                if not is_partitioned(conn):
+                    _convert(conn, interval)
+                create_future_partitions(conn, interval, ahead)
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY})
+
+@dataclass
+class PartitionScheme:
+    """How the retention job maintains the partitions of message_logs"""
+    interval: str
+    ahead: int
+    max_age_days: float  # 0 keeps partitions forever
+    detach: bool
+
+    def maintain(self, conn: Connection) -> Dict[str, List[str]]:
+        """Create upcoming partitions and remove expired ones; returns their names"""
+        if not is_partitioned(conn):
+            return {"created": [], "expired": []}
+        conn.execute(text(f"SET LOCAL lock_timeout = '{MAINTENANCE_LOCK_TIMEOUT}'"))
+        created = create_future_partitions(conn, self.interval, self.ahead)
+        expired = []
+        if self.max_age_days > 0:
+            expired = expire_partitions(conn, datetime.utcnow() - timedelta(days=self.max_age_days), self.detach)
+        return {"created": created, "expired": expired}
@@ -0,0 +1,120 @@
+import bisect
+import threading
+import time
+from typing import Dict, List
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Upper bounds (in milliseconds) of the checkout wait-time histogram buckets
+WAIT_BUCKETS_MS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+class WaitHistogram:
+    """Thread-safe histogram of how long callers waited for a pooled connection"""
+
+    def __init__(self, buckets_ms: List[float] = WAIT_BUCKETS_MS):
+        self.buckets_ms = list(buckets_ms)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counts = [0] * (len(self.buckets_ms) + 1)
+            self._total_ms = 0.0
+            self._max_ms = 0.0
+            self._timeouts = 0
+
+    def observe(self, wait_ms: float):
+        index = bisect.bisect_left(self.buckets_ms, wait_ms)
+        with self._lock:
+            self._counts[index] += 1
+            self._total_ms += wait_ms
+            self._max_ms = max(self._max_ms, wait_ms)
+
+    def observe_timeout(self):
+        with self._lock:
+            self._timeouts += 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counts = list(self._counts)
+            total_ms, max_ms, timeouts = self._total_ms, self._max_ms, self._timeouts
+        count = sum(counts)
+        labels = [f"le_{bound}ms" for bound in self.buckets_ms] + ["inf"]
+        return {
+            "count": count,
+            "timeouts": timeouts,
+            "avg_ms": round(total_ms / count, 3) if count else 0.0,
+            "max_ms": round(max_ms, 3),
+            "buckets": dict(zip(labels, counts)),
+        }
+
+class WaitTimingMixin:
+    """Pool mixin that records how long each checkout waited for a connection.
+
+    Concrete pools declare their own ``wait_histogram`` so the sync and async
+    engines are reported separately.
+    """
+    wait_histogram: WaitHistogram
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.wait_histogram.observe_timeout()
+            raise
+        self.wait_histogram.observe((time.perf_counter() - start) * 1000)
+        return connection
+
+class InstrumentedQueuePool(WaitTimingMixin, QueuePool):
+    """QueuePool for the sync engine with checkout wait timing"""
+    wait_histogram = WaitHistogram()
+
+class InstrumentedAsyncQueuePool(WaitTimingMixin, AsyncAdaptedQueuePool):
+    """asyncio-adapted QueuePool for the async engine with checkout wait timing"""
+    wait_histogram = WaitHistogram()
+
+def prewarm_pool(engine: Engine, count: int) -> int:
+    """Open ``count`` connections up front and return them to the pool idle"""
+    connections = []
+    try:
+        for _ in range(count):
+            connections.append(engine.connect())
+    finally:
+        for connection in connections:
+            connection.close()
+    return len(connections)
+
+async def prewarm_async_pool(engine: AsyncEngine, count: int) -> int:
+    """Async counterpart of prewarm_pool for the asyncpg engine"""
+    connections = []
+    try:
+        for _ in range(count):
+            connections.append(await engine.connect())
+    finally:
+        for connection in connections:
+            await connection.close()
+    return len(connections)
+
+def pool_status(engine: Engine) -> Dict:
+    """Current occupancy of the engine's pool plus the checkout wait histogram"""
+    pool = engine.pool
+    size = pool.size()
+    # QueuePool.overflow() counts connections beyond pool_size and is negative
+    # while fewer than pool_size connections have been opened
+    overflow = pool.overflow()
+    status = {
+        "pool_size": size,
+        "max_overflow": pool._max_overflow,
+        "timeout": pool.timeout(),
+        "recycle": pool._recycle,
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(overflow, 0),
+        "opened": size + overflow,
+    }
+    if isinstance(pool, WaitTimingMixin):
+        status["wait"] = pool.wait_histogram.snapshot()
+    return status
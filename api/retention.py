@@ -0,0 +1,269 @@
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from .config import settings
+from .migrations import BULK_PURGE_SETTING, CHANGE_CHANNEL, NOTIFY_TABLES
+from .models import open_session
+from .partitions import PartitionScheme
+from .pool import WaitHistogram
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary key for pg_try_advisory_xact_lock so that only one API process purges at a time
+RETENTION_LOCK_KEY = 7_310_423
+
+# Seconds after startup before the first run, to stay clear of pool pre-warming
+FIRST_RUN_DELAY = 60
+
+# Upper bounds (in milliseconds) of the batch duration histogram buckets
+BATCH_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+@dataclass
+class RetentionPolicy:
+    """Rows of ``table`` whose ``time_column`` is older than ``days`` are purged"""
+    table: str
+    time_column: str
+    key_column: str
+    days: float
+
+    def batch_sql(self) -> str:
+        # The tables are append-only, so walking the key from the oldest end
+        # reaches the expired rows first and each batch is an index range scan.
+        # The time condition is repeated on the DELETE so that a partitioned
+        # table only probes its expired partitions. The broker stamps rows in UTC
+        return (
+            f"WITH pruned AS ("
+            f"DELETE FROM {self.table} "
+            f"WHERE {self.time_column} < (now() AT TIME ZONE 'UTC') - make_interval(secs => :max_age) "
+            f"AND {self.key_column} IN ("
+            f"SELECT {self.key_column} FROM {self.table} "
+            f"WHERE {self.time_column} < (now() AT TIME ZONE 'UTC') - make_interval(secs => :max_age) "
+            f"ORDER BY {self.key_column} LIMIT :batch_size) "
+            f"RETURNING 1) "
+            f"SELECT count(*) FROM pruned"
+        )
+
+class ChangeLogPolicy(RetentionPolicy):
+    """change_log purging, which also advances the per-table horizons /changes tokens are checked against"""
+
+    def batch_sql(self) -> str:
+        # changed_at is stamped by the database in its own time zone
+        return (
+            "WITH pruned AS ("
+            "DELETE FROM change_log WHERE seq IN ("
+            "SELECT seq FROM change_log "
+            "WHERE changed_at < LOCALTIMESTAMP - make_interval(secs => :max_age) "
+            "ORDER BY seq LIMIT :batch_size) "
+            "RETURNING table_name, xid, seq), "
+            "newest AS (SELECT DISTINCT ON (table_name) table_name, xid, seq FROM pruned "
+            "ORDER BY table_name, xid DESC, seq DESC), "
+            "horizon AS ("
+            "INSERT INTO change_log_horizon (table_name, xid, seq) SELECT table_name, xid, seq FROM newest "
+            "ON CONFLICT (table_name) DO UPDATE SET xid = EXCLUDED.xid, seq = EXCLUDED.seq "
+            "WHERE (change_log_horizon.xid, change_log_horizon.seq) < (EXCLUDED.xid, EXCLUDED.seq)) "
+            "SELECT count(*) FROM pruned"
+        )
+
+def configured_policies() -> List[RetentionPolicy]:
+    policies = [
+        RetentionPolicy("message_logs", "published_at", "id", settings.retention_messages_days),
+        RetentionPolicy("connection_events", "timestamp", "id", settings.retention_events_days),
+        ChangeLogPolicy("change_log", "changed_at", "seq", settings.retention_change_log_days),
+    ]
+    return [policy for policy in policies if policy.days > 0]
+
+def configured_partitions() -> Optional[PartitionScheme]:
+    if not settings.message_partition_interval:
+        return None
+    return PartitionScheme(
+        settings.message_partition_interval,
+        settings.message_partitions_ahead,
+        settings.retention_messages_days,
+        settings.message_partition_detach,
+    )
+
+class TableStats:
+    def __init__(self):
+        self.purged = 0
+        self.last_run_purged = 0
+        self.batches = 0
+        self.batch_histogram = WaitHistogram(BATCH_BUCKETS_MS)
+
+class RetentionJob:
+    """Background task purging expired log rows in small batches.
+
+    Each batch deletes at most ``batch_size`` rows in its own short
+    transaction and the job pauses ``batch_pause`` seconds between batches,
+    so row locks are held briefly and the broker's inserts never queue
+    behind a long delete. When message_logs is partitioned, each run first
+    creates the upcoming partitions and drops expired ones whole; the batches
+    then only clear what is left in partially expired partitions.
+    """
+
+    def __init__(self, policies: List[RetentionPolicy], interval: float, batch_size: int, batch_pause: float,
+                 partitions: Optional[PartitionScheme] = None):
+        self.policies = policies
+        self.partitions = partitions
+        self.interval = interval
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.running = False
+        self.runs = 0
+        self.last_run_at: Optional[datetime] = None
+        self.last_run_seconds: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._stats = {policy.table: TableStats() for policy in policies}
+        self.partitions_created: List[str] = []
+        self.partitions_expired: List[str] = []
+        self._task = None
+
+    def start(self):
+        if self._task is None and (self.policies or self.partitions):
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run_forever(self):
+        await asyncio.sleep(FIRST_RUN_DELAY)
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = str(e)
+                logger.warning(f"Retention run failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self) -> Dict[str, int]:
+        """Purge every table down to its policy and return the rows deleted per table"""
+        self.running = True
+        started = time.perf_counter()
+        purged = {}
+        try:
+            if self.partitions is not None and not await self._maintain_partitions():
+                logger.info("Another process holds the retention lock; skipping this run")
+                return {}
+            for policy in self.policies:
+                purged[policy.table] = await self._purge(policy)
+                if purged[policy.table] is None:
+                    logger.info("Another process holds the retention lock; skipping this run")
+                    return {}
+            self.last_error = None
+        finally:
+            self.running = False
+            self.runs += 1
+            self.last_run_at = datetime.utcnow()
+            self.last_run_seconds = round(time.perf_counter() - started, 3)
+        if any(purged.values()):
+            logger.info(f"Retention purged {purged}")
+        return purged
+
+    async def _maintain_partitions(self) -> bool:
+        """Create and expire partitions; False if another process holds the lock"""
+        async with open_session() as db:
+            if not await db.scalar(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": RETENTION_LOCK_KEY}):
+                return False
+            changes = await db.run_sync(lambda session: self.partitions.maintain(session.connection()))
+            await db.commit()
+        self.partitions_created.extend(changes["created"])
+        self.partitions_expired.extend(changes["expired"])
+        if changes["created"] or changes["expired"]:
+            logger.info(f"Partitions created {changes['created']}, expired {changes['expired']}")
+        return True
+
+    async def _purge(self, policy: RetentionPolicy) -> Optional[int]:
+        """Delete expired rows batch by batch; None if another process is purging"""
+        stats = self._stats[policy.table]
+        stats.last_run_purged = 0
+        sql = text(policy.batch_sql())
+        params = {"max_age": policy.days * 86400, "batch_size": self.batch_size}
+        # A row NOTIFY per expired row would flood /stream subscribers with
+        # rows nobody is viewing; each batch announces itself once instead
+        notify = policy.table in NOTIFY_TABLES
+        while True:
+            batch_started = time.perf_counter()
+            async with open_session() as db:
+                if not await db.scalar(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": RETENTION_LOCK_KEY}):
+                    return None
+                if notify:
+                    await db.execute(text(f"SET LOCAL {BULK_PURGE_SETTING} = on"))
+                deleted = await db.scalar(sql, params)
+                if notify and deleted:
+                    await db.execute(text("SELECT pg_notify(:channel, :payload)"), {
+                        "channel": CHANGE_CHANNEL,
+                        "payload": json.dumps({"table": policy.table, "op": "expire", "row": {"purged": deleted}}),
+                    })
+                await db.commit()
+            stats.batch_histogram.observe((time.perf_counter() - batch_started) * 1000)
+            stats.batches += 1
+            stats.purged += deleted
+            stats.last_run_purged += deleted
+            if deleted < self.batch_size:
+                return stats.last_run_purged
+            await asyncio.sleep(self.batch_pause)
+
+    def snapshot(self) -> Dict:
+        return {
+            "running": self.running,
+            "runs": self.runs,
+            "last_run_at": self.last_run_at,
+            "last_run_seconds": self.last_run_seconds,
+            "last_error": self.last_error,
+            "interval": self.interval,
+            "batch_size": self.batch_size,
+            "policies": {
+                policy.table: {
+                    "days": policy.days,
+                    "purged": self._stats[policy.table].purged,
+                    "last_run_purged": self._stats[policy.table].last_run_purged,
+                    "batches": self._stats[policy.table].batches,
+                    "batch_ms": self._stats[policy.table].batch_histogram.snapshot(),
+                }
+                for policy in self.policies
+            },
+            "partitions": None if self.partitions is None else {
+                "interval": self.partitions.interval,
+                "ahead": self.partitions.ahead,
+                "detach": self.partitions.detach,
+                "created": self.partitions_created[-10:],
+                "expired": self.partitions_expired[-10:],
+            },
+        }
+
+retention_job = RetentionJob(
+    configured_policies(),
+    settings.retention_interval,
+    settings.retention_batch_size,
+    settings.retention_batch_pause,
+    configured_partitions(),
+)
+
+async def table_sizes(db: AsyncSession, tables: Iterable[str]) -> Dict[str, Dict]:
+    """On-disk size and live/dead tuple estimates of ``tables``, summed over their partitions"""
+    rows = (await db.execute(text(
+        "SELECT t.relname, CAST(sum(pg_total_relation_size(tree.relid)) AS bigint) AS total_bytes, "
+        "CAST(sum(s.n_live_tup) AS bigint) AS live_rows, CAST(sum(s.n_dead_tup) AS bigint) AS dead_rows, "
+        "max(s.last_autovacuum) AS last_autovacuum, count(*) FILTER (WHERE tree.isleaf) AS partitions "
+        "FROM pg_class t CROSS JOIN LATERAL ("
+        # pg_partition_tree() lists nothing for a table that is not partitioned
+        "SELECT t.oid AS relid, t.relkind <> 'p' AS isleaf UNION SELECT relid, isleaf FROM pg_partition_tree(t.oid)"
+        ") tree "
+        "LEFT JOIN pg_stat_user_tables s ON s.relid = tree.relid "
+        "WHERE t.relname = ANY(:tables) AND t.relnamespace = CAST(current_schema() AS regnamespace) "
+        "GROUP BY t.relname"
+    ), {"tables": list(tables)})).all()
+    return {row.relname: {key: value for key, value in row._asdict().items() if key != "relname"} for row in rows}
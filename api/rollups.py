@@ -0,0 +1,247 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from .changes import read_changes
+from .config import settings
+from .models import MessageLog, open_session
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary key for pg_try_advisory_xact_lock so that only one API process rolls up at a time
+ROLLUP_LOCK_KEY = 7_310_424
+
+# Seconds after startup before the first run, to stay clear of pool pre-warming
+FIRST_RUN_DELAY = 15
+
+# Bucket widths and their date_trunc units, finest first. Minutes are built
+# from message_logs and every other width from the one before it
+ROLLUP_WIDTHS = {"1m": "minute", "1h": "hour", "1d": "day"}
+WIDTH_STEPS = {"1m": timedelta(minutes=1), "1h": timedelta(hours=1), "1d": timedelta(days=1)}
+
+# rollup_progress row holding this job's change_log token
+PROGRESS_NAME = "message_logs"
+
+def truncate(moment: datetime, width: str) -> datetime:
+    """Start of the ``width`` bucket that ``moment`` falls in"""
+    if width == "1m":
+        return moment.replace(second=0, microsecond=0)
+    if width == "1h":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+def ceil(moment: datetime, width: str) -> datetime:
+    start = truncate(moment, width)
+    return start if start == moment else start + WIDTH_STEPS[width]
+
+def cover(ranges: List[Tuple[datetime, datetime]], width: str) -> List[Tuple[datetime, datetime]]:
+    """The runs of ``width`` buckets covering ``ranges``, with overlapping runs merged"""
+    merged: List[Tuple[datetime, datetime]] = []
+    for start, end in sorted((truncate(start, width), ceil(end, width)) for start, end in ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+COLUMNS = "width, bucket, topic_id, publisher_client_id, message_count, total_size, min_size, max_size"
+
+def _rebuild_sql(width: str) -> str:
+    unit = ROLLUP_WIDTHS[width]
+    if width == "1m":
+        return (
+            f"INSERT INTO message_rollups ({COLUMNS}) "
+            f"SELECT '{width}', date_trunc('{unit}', published_at), topic_id, publisher_client_id, "
+            f"count(*), sum(payload_size), min(payload_size), max(payload_size) "
+            f"FROM message_logs WHERE published_at >= :start AND published_at < :end "
+            f"GROUP BY 2, 3, 4"
+        )
+    source = list(ROLLUP_WIDTHS)[list(ROLLUP_WIDTHS).index(width) - 1]
+    return (
+        f"INSERT INTO message_rollups ({COLUMNS}) "
+        f"SELECT '{width}', date_trunc('{unit}', bucket), topic_id, publisher_client_id, "
+        f"sum(message_count), sum(total_size), min(min_size), max(max_size) "
+        f"FROM message_rollups WHERE width = '{source}' AND bucket >= :start AND bucket < :end "
+        f"GROUP BY 2, 3, 4"
+    )
+
+class RollupJob:
+    """Background task keeping message_rollups in step with message_logs.
+
+    It follows the message_logs change feed and, for every minute that
+    gained messages, rebuilds that minute from the raw rows and then the
+    enclosing hour and day from the finer rollups. Rebuilding rather than
+    adding makes a run safe to repeat, so late messages land in their own
+    (old) bucket and a backfill may overlap the feed. Minute rollups are
+    pruned along with the raw messages they are built from; hours and days
+    are kept for good. A new database, or a token the change log no longer
+    reaches, is backfilled a day at a time.
+    """
+
+    def __init__(self, interval: float, batch_size: int, retention_days: float):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.retention_days = retention_days
+        self.runs = 0
+        self.folded = 0
+        self.backfills = 0
+        self.last_run_at: Optional[datetime] = None
+        self.last_run_seconds: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run_forever(self):
+        await asyncio.sleep(FIRST_RUN_DELAY)
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.last_error = str(e)
+                logger.warning(f"Rollup run failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def _floor(self) -> Optional[datetime]:
+        # Minutes and hours before this may have lost raw rows to retention,
+        # so rebuilding them would undercount; their rollups are only filled
+        # in where missing, never replaced
+        if self.retention_days <= 0:
+            return None
+        return ceil(datetime.utcnow() - timedelta(days=self.retention_days), "1h")
+
+    async def _lock(self, db: AsyncSession) -> bool:
+        return await db.scalar(text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": ROLLUP_LOCK_KEY})
+
+    async def _rebuild(self, db: AsyncSession, minutes: List[Tuple[datetime, datetime]]):
+        """Rebuild every bucket of every width that overlaps ``minutes``"""
+        floor = self._floor()
+        for width in ROLLUP_WIDTHS:
+            for start, end in cover(minutes, width):
+                if floor is not None and width != "1d" and start < floor:
+                    await db.execute(text(_rebuild_sql(width) + " ON CONFLICT DO NOTHING"),
+                                     {"start": start, "end": min(end, floor)})
+                    start = floor
+                if start >= end:
+                    continue
+                params = {"start": start, "end": end}
+                await db.execute(text(
+                    "DELETE FROM message_rollups WHERE width = :width AND bucket >= :start AND bucket < :end"
+                ), {"width": width, **params})
+                await db.execute(text(_rebuild_sql(width)), params)
+
+    async def _save_token(self, db: AsyncSession, token: str):
+        await db.execute(text(
+            "INSERT INTO rollup_progress (name, token) VALUES (:name, :token) "
+            "ON CONFLICT (name) DO UPDATE SET token = EXCLUDED.token"
+        ), {"name": PROGRESS_NAME, "token": token})
+
+    async def _backfill(self) -> bool:
+        """Rebuild the rollups of every stored message; False if another process holds the lock"""
+        async with open_session() as db:
+            if not await self._lock(db):
+                return False
+            # Taken first, so messages written while backfilling are folded in again afterwards
+            token = (await read_changes(db, PROGRESS_NAME, None, 0)).next_token
+            first, last = (await db.execute(
+                select(func.min(MessageLog.published_at), func.max(MessageLog.published_at))
+            )).one()
+        if first is not None:
+            day = truncate(first, "1d")
+            while day <= last:
+                async with open_session() as db:
+                    if not await self._lock(db):
+                        return False
+                    await self._rebuild(db, [(day, day + WIDTH_STEPS["1d"])])
+                    await db.commit()
+                day += WIDTH_STEPS["1d"]
+        async with open_session() as db:
+            await self._save_token(db, token)
+            await db.commit()
+        self.backfills += 1
+        logger.info(f"Rollups backfilled from {first} to {last}")
+        return True
+
+    async def run_once(self) -> Optional[int]:
+        """Fold new messages into the rollups; returns how many, or None if another process is at it"""
+        started = time.perf_counter()
+        folded = 0
+        try:
+            while True:
+                async with open_session() as db:
+                    if not await self._lock(db):
+                        return None
+                    token = await db.scalar(text(
+                        "SELECT token FROM rollup_progress WHERE name = :name"
+                    ), {"name": PROGRESS_NAME})
+                    window = None
+                    if token is not None:
+                        try:
+                            window = await read_changes(db, PROGRESS_NAME, token, self.batch_size)
+                        except HTTPException as e:
+                            if e.status_code != 410:
+                                raise
+                            logger.warning("Rollup position fell behind the change log; backfilling")
+                    if window is not None:
+                        # Deletes are retention or cleanup; the rollups keep that history
+                        if window.upserted_ids:
+                            minutes = (await db.scalars(
+                                select(func.date_trunc("minute", MessageLog.published_at))
+                                .where(MessageLog.id.in_(window.upserted_ids)).distinct()
+                            )).all()
+                            step = WIDTH_STEPS["1m"]
+                            await self._rebuild(db, [(minute, minute + step) for minute in minutes if minute is not None])
+                            folded += len(window.upserted_ids)
+                        await self._save_token(db, window.next_token)
+                        await db.commit()
+                if window is None:
+                    if not await self._backfill():
+                        return None
+                    continue
+                if not window.has_more:
+                    break
+            floor = self._floor()
+            if floor is not None:
+                async with open_session() as db:
+                    await db.execute(text(
+                        "DELETE FROM message_rollups WHERE width = '1m' AND bucket < :floor"
+                    ), {"floor": floor})
+                    await db.commit()
+            self.last_error = None
+        finally:
+            self.runs += 1
+            self.folded += folded
+            self.last_run_at = datetime.utcnow()
+            self.last_run_seconds = round(time.perf_counter() - started, 3)
+        return folded
+
+    def snapshot(self) -> Dict:
+        return {
+            "runs": self.runs,
+            "last_run_at": self.last_run_at,
+            "last_run_seconds": self.last_run_seconds,
+            "last_error": self.last_error,
+            "interval": self.interval,
+            "batch_size": self.batch_size,
+            "folded": self.folded,
+            "backfills": self.backfills,
+        }
+
+rollup_job = RollupJob(settings.rollup_interval, settings.rollup_batch_size, settings.retention_messages_days)
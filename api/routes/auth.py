@@ -1,6 +1,6 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 from ..models import get_db, User
 from ..auth import (
@@ -17,10 +17,11 @@ router = APIRouter(
 
 @router.post("/token", response_model=Token)
 async def login_for_access_token(
+    background_tasks: BackgroundTasks,
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -28,8 +29,8 @@ async def login_for_access_token(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Update last login time
-    update_last_login(db, user)
+    # Update last login time once the response is out
+    background_tasks.add_task(update_last_login, user.id, user.username)
     
     access_token_expires = timedelta(minutes=settings.jwt_access_token_expire_minutes)
     access_token = create_access_token(
@@ -45,7 +46,7 @@ async def read_users_me(current_user: User = Depends(get_current_active_user)):
 async def update_password(
     user_update: UserUpdate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    user = update_user_password(db, current_user, user_update.password)
+    user = await update_user_password(db, current_user, user_update.password)
     return user 
\ No newline at end of file
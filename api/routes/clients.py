@@ -1,7 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from ..models import get_db, Client, User, Subscription, MessageLog, ConnectionEvent
+from ..caching import conditional
+from ..serialization import columns_for, rows_response
+from ..changes import ChangeFeed, read_changes
+from ..batch import batch_keys, in_request_order
+from ..listing import Field, ListQuery, ListSpec, EQUALITY_OPS, LOOKUP_OPS, TEXT_OPS, list_query
 from ..auth import get_current_active_user
 from pydantic import BaseModel
 from datetime import datetime
@@ -63,91 +69,142 @@ class ConnectionEventResponse(BaseModel):
     class Config:
         from_attributes = True
 
+CLIENT_COLUMNS = columns_for(ClientResponse, Client)
+# The table calls it subscribed_at
+SUBSCRIPTION_COLUMNS = columns_for(SubscriptionResponse, Subscription, created_at=Subscription.subscribed_at)
+EVENT_COLUMNS = columns_for(ConnectionEventResponse, ConnectionEvent)
+
+CLIENT_LIST = ListSpec(
+    fields={
+        "id": Field(Client.id, LOOKUP_OPS, sortable=True, unique=True),
+        "client_id": Field(Client.client_id, TEXT_OPS, sortable=True, unique=True),
+        "active": Field(Client.active, EQUALITY_OPS),
+    },
+    indexes=[("client_id",), ("active",)],
+    default_sort="id",
+)
+
 # Routes
-@router.get("/", response_model=List[ClientResponse])
-def get_clients(
+@router.get("/", response_model=List[ClientResponse], dependencies=[Depends(conditional("clients"))])
+async def get_clients(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db),
+    listing: ListQuery = Depends(list_query(CLIENT_LIST)),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Clients, filtered on id, client_id (eq, in, prefix) or active and sorted by id or client_id"""
+    clients = (await db.execute(listing.apply(select(*CLIENT_COLUMNS), skip, limit))).all()
+    listing.set_next_cursor(response, clients, limit)
+    return rows_response(clients, response)
+
+# Any string can be a client ID, so routes on the collection sit under "-",
+# which no /{client_id}/... route ends in, instead of beside /{client_id}
+@router.get("/-/changes", response_model=ChangeFeed[ClientResponse])
+async def get_client_changes(
+    since: Optional[str] = Query(None, description="Token from the previous response's next; omit to get a starting token"),
+    limit: int = Query(500, ge=1, le=5000),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    window = await read_changes(db, "clients", since, limit)
+    clients = (await db.scalars(select(Client).where(Client.id.in_(window.upserted_ids)))).all() if window.upserted_ids else []
+    return window.feed({client.id: client for client in clients})
+
+@router.get("/-/batch", response_model=List[ClientResponse], dependencies=[Depends(conditional("clients"))])
+async def get_clients_batch(
+    response: Response,
+    client_ids: List[str] = Depends(batch_keys),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    clients = db.query(Client).offset(skip).limit(limit).all()
-    return clients
+    """Several clients by client ID in one query, in the order asked for; unknown IDs are left out"""
+    clients = (await db.execute(select(*CLIENT_COLUMNS).where(Client.client_id.in_(client_ids)))).all()
+    return rows_response(in_request_order(clients, client_ids, "client_id"), response)
 
-@router.get("/{client_id}", response_model=ClientResponse)
-def get_client(
+@router.get("/{client_id}", response_model=ClientResponse, dependencies=[Depends(conditional("clients"))])
+async def get_client(
     client_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    client = db.query(Client).filter(Client.client_id == client_id).first()
+    client = await db.scalar(select(Client).where(Client.client_id == client_id))
     if client is None:
         raise HTTPException(status_code=404, detail="Client not found")
     return client
 
 @router.patch("/{client_id}", response_model=ClientResponse)
-def update_client(
+async def update_client(
     client_id: str,
     client_update: ClientUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    client = db.query(Client).filter(Client.client_id == client_id).first()
+    client = await db.scalar(select(Client).where(Client.client_id == client_id))
     if client is None:
         raise HTTPException(status_code=404, detail="Client not found")
     
     # Update the active status
     client.active = client_update.active
-    db.commit()
-    db.refresh(client)
+    await db.commit()
+    await db.refresh(client)
     
     return client
 
 @router.delete("/{client_id}", status_code=204)
-def delete_client(
+async def delete_client(
     client_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    client = db.query(Client).filter(Client.client_id == client_id).first()
+    client = await db.scalar(select(Client).where(Client.client_id == client_id))
     if client is None:
         raise HTTPException(status_code=404, detail="Client not found")
     
     # Delete client (this will cascade to related records due to FK constraints)
-    db.delete(client)
-    db.commit()
+    await db.delete(client)
+    await db.commit()
     
     return None
 
-@router.get("/{client_id}/subscriptions", response_model=List[SubscriptionResponse])
-def get_subscriptions_by_client(
+@router.get("/{client_id}/subscriptions", response_model=List[SubscriptionResponse], dependencies=[Depends(conditional("subscriptions"))])
+async def get_subscriptions_by_client(
     client_id: str,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    subscriptions = db.query(Subscription).filter(Subscription.client_id == client_id).offset(skip).limit(limit).all()
-    return subscriptions
+    subscriptions = (await db.execute(
+        select(*SUBSCRIPTION_COLUMNS).where(Subscription.client_id == client_id).offset(skip).limit(limit)
+    )).all()
+    return rows_response(subscriptions, response)
 
-@router.get("/{client_id}/messages", response_model=List[MessageLogResponse])
-def get_messages_by_client(
+@router.get("/{client_id}/messages", response_model=List[MessageLogResponse], dependencies=[Depends(conditional("messages"))])
+async def get_messages_by_client(
     client_id: str,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    messages = db.query(MessageLog).filter(MessageLog.client_id == client_id).offset(skip).limit(limit).all()
+    messages = (await db.scalars(
+        select(MessageLog).where(MessageLog.client_id == client_id).offset(skip).limit(limit)
+    )).all()
     return messages
 
-@router.get("/{client_id}/events", response_model=List[ConnectionEventResponse])
-def get_events_by_client(
+@router.get("/{client_id}/events", response_model=List[ConnectionEventResponse], dependencies=[Depends(conditional("events"))])
+async def get_events_by_client(
     client_id: str,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    events = db.query(ConnectionEvent).filter(ConnectionEvent.client_id == client_id).offset(skip).limit(limit).all()
-    return events
\ No newline at end of file
+    events = (await db.execute(
+        select(*EVENT_COLUMNS).where(ConnectionEvent.client_id == client_id).offset(skip).limit(limit)
+    )).all()
+    return rows_response(events, response)
\ No newline at end of file
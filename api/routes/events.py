@@ -1,7 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from ..models import get_db, ConnectionEvent, User, Client
+from ..caching import conditional, immutable
+from ..serialization import columns_for, rows_response
+from ..export import export_response
+from ..changes import ChangeFeed, read_changes
+from ..listing import Field, ListQuery, ListSpec, EQUALITY_OPS, LOOKUP_OPS, RANGE_OPS, list_query
 from ..auth import get_current_active_user
 from pydantic import BaseModel
 from datetime import datetime
@@ -38,30 +44,76 @@ class ClientResponse(BaseModel):
     class Config:
         from_attributes = True
 
+EVENT_COLUMNS = columns_for(ConnectionEventResponse, ConnectionEvent)
+
+EVENT_LIST = ListSpec(
+    fields={
+        "id": Field(ConnectionEvent.id, LOOKUP_OPS, sortable=True, unique=True),
+        "client_id": Field(ConnectionEvent.client_id, EQUALITY_OPS),
+        "event_type": Field(ConnectionEvent.event_type, EQUALITY_OPS),
+        "timestamp": Field(ConnectionEvent.timestamp, RANGE_OPS, sortable=True),
+    },
+    indexes=[("timestamp",), ("client_id", "timestamp"), ("event_type", "timestamp")],
+    default_sort="-timestamp",
+)
+
 # Routes
-@router.get("/", response_model=List[ConnectionEventResponse])
-def get_events(
+@router.get("/", response_model=List[ConnectionEventResponse], dependencies=[Depends(conditional("events"))])
+async def get_events(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    event_type: Optional[str] = None,
-    db: Session = Depends(get_db),
+    listing: ListQuery = Depends(list_query(EVENT_LIST)),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    query = db.query(ConnectionEvent).order_by(ConnectionEvent.timestamp.desc())
-    
-    if event_type:
-        query = query.filter(ConnectionEvent.event_type == event_type)
-    
-    events = query.offset(skip).limit(limit).all()
-    return events
+    """Connection events, filtered on id, client_id, event_type or a timestamp range and sorted by timestamp or id"""
+    events = (await db.execute(listing.apply(select(*EVENT_COLUMNS), skip, limit))).all()
+    listing.set_next_cursor(response, events, limit)
+    return rows_response(events, response)
 
-@router.get("/{event_id}", response_model=ConnectionEventResponse)
-def get_event(
+@router.get("/changes", response_model=ChangeFeed[ConnectionEventResponse])
+async def get_event_changes(
+    since: Optional[str] = Query(None, description="Token from the previous response's next; omit to get a starting token"),
+    limit: int = Query(500, ge=1, le=5000),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    window = await read_changes(db, "connection_events", since, limit)
+    events = (await db.scalars(select(ConnectionEvent).where(ConnectionEvent.id.in_(window.upserted_ids)))).all() if window.upserted_ids else []
+    return window.feed({event.id: event for event in events})
+
+@router.get("/export")
+async def export_events(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    start: Optional[datetime] = Query(None, description="Only events at or after this time"),
+    end: Optional[datetime] = Query(None, description="Only events before this time"),
+    client_id: Optional[str] = Query(None),
+    event_type: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    query = select(*EVENT_COLUMNS).order_by(ConnectionEvent.timestamp, ConnectionEvent.id)
+    if start is not None:
+        query = query.where(ConnectionEvent.timestamp >= start)
+    if end is not None:
+        query = query.where(ConnectionEvent.timestamp < end)
+    if client_id is not None:
+        query = query.where(ConnectionEvent.client_id == client_id)
+    if event_type is not None:
+        query = query.where(ConnectionEvent.event_type == event_type)
+
+    # The export reads on a session of its own
+    await db.close()
+    return export_response(query, list(ConnectionEventResponse.model_fields), format, "events")
+
+@router.get("/{event_id}", response_model=ConnectionEventResponse, dependencies=[Depends(immutable)])
+async def get_event(
     event_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    event = db.query(ConnectionEvent).filter(ConnectionEvent.id == event_id).first()
+    event = await db.scalar(select(ConnectionEvent).where(ConnectionEvent.id == event_id))
     
     if event is None:
         raise HTTPException(status_code=404, detail="Connection event not found")
@@ -69,71 +121,74 @@ def get_event(
     return event
 
 @router.delete("/{event_id}", status_code=204)
-def delete_event(
+async def delete_event(
     event_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    event = db.query(ConnectionEvent).filter(ConnectionEvent.id == event_id).first()
+    event = await db.scalar(select(ConnectionEvent).where(ConnectionEvent.id == event_id))
     if event is None:
         raise HTTPException(status_code=404, detail="Connection event not found")
     
-    db.delete(event)
-    db.commit()
+    await db.delete(event)
+    await db.commit()
     
     return None
 
-@router.get("/by-client/{client_id}", response_model=List[ConnectionEventResponse])
-def get_events_by_client(
+@router.get("/by-client/{client_id}", response_model=List[ConnectionEventResponse], dependencies=[Depends(conditional("clients", "events"))])
+async def get_events_by_client(
     client_id: str,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     event_type: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     # Check if client exists
-    client = db.query(Client).filter(Client.client_id == client_id).first()
+    client = await db.scalar(select(Client).where(Client.client_id == client_id))
     if client is None:
         raise HTTPException(status_code=404, detail="Client not found")
     
     # Get events for client
-    query = db.query(ConnectionEvent).filter(
+    query = select(*EVENT_COLUMNS).where(
         ConnectionEvent.client_id == client_id
     ).order_by(ConnectionEvent.timestamp.desc())
     
     if event_type:
-        query = query.filter(ConnectionEvent.event_type == event_type)
+        query = query.where(ConnectionEvent.event_type == event_type)
         
-    events = query.offset(skip).limit(limit).all()
-    
-    return events
+    events = (await db.execute(query.offset(skip).limit(limit))).all()
+    return rows_response(events, response)
 
-@router.get("/{event_id}/client", response_model=ClientResponse)
-def get_client_by_event(
+@router.get("/{event_id}/client", response_model=ClientResponse, dependencies=[Depends(conditional("events", "clients"))])
+async def get_client_by_event(
     event_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    event = db.query(ConnectionEvent).filter(ConnectionEvent.id == event_id).first()
+    event = await db.scalar(select(ConnectionEvent).where(ConnectionEvent.id == event_id))
     if event is None:
         raise HTTPException(status_code=404, detail="Event not found")
     
-    client = db.query(Client).filter(Client.client_id == event.client_id).first()
+    client = await db.scalar(select(Client).where(Client.client_id == event.client_id))
     if client is None:
         raise HTTPException(status_code=404, detail="Client not found")
     
     return client
 
-@router.get("/{client_id}/all-events", response_model=List[ConnectionEventResponse])
-def get_all_events_by_client(
+@router.get("/{client_id}/all-events", response_model=List[ConnectionEventResponse], dependencies=[Depends(conditional("clients", "events"))])
+async def get_all_events_by_client(
     client_id: str,
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    client = db.query(Client).filter(Client.client_id == client_id).first()
+    client = await db.scalar(select(Client).where(Client.client_id == client_id))
     if client is None:
         raise HTTPException(status_code=404, detail="Client not found")
     
-    events = db.query(ConnectionEvent).filter(ConnectionEvent.client_id == client_id).order_by(ConnectionEvent.timestamp.desc()).all()
-    return events
\ No newline at end of file
+    events = (await db.execute(
+        select(*EVENT_COLUMNS).where(ConnectionEvent.client_id == client_id).order_by(ConnectionEvent.timestamp.desc())
+    )).all()
+    return rows_response(events, response)
\ No newline at end of file
@@ -0,0 +1,454 @@
+import asyncio
+from collections import defaultdict
+from datetime import datetime
+from typing import Callable, Generic, List, Optional, Set, TypeVar
+import strawberry
+from fastapi import Depends, HTTPException
+from graphql import FieldNode, FragmentSpreadNode, GraphQLError, InlineFragmentNode, IntValueNode, ValidationRule, get_named_type
+from sqlalchemy import column, select, true, values
+from sqlalchemy.orm import aliased
+from strawberry.dataloader import DataLoader
+from strawberry.extensions import AddValidationRules, QueryDepthLimiter
+from strawberry.fastapi import BaseContext, GraphQLRouter
+from strawberry.types import Info
+from ..models import (
+    get_db, AdminRequest, AdminSensorConfig, Client, ConnectionEvent, MessageLog, Subscription, Topic, TopicAdmin, User
+)
+from ..auth import get_current_active_user
+from ..config import settings
+from ..pagination import decode_cursor, encode_cursor, paginate
+from .messages import published_between
+
+T = TypeVar("T")
+
+# Page sizes: lists and connections default to DEFAULT_PAGE items and take at most MAX_PAGE, as on the REST routes
+DEFAULT_PAGE = 100
+MAX_PAGE = 1000
+
+# Arguments that multiply the cost of everything selected below a field
+PAGE_ARGUMENTS = ("first", "limit")
+
+def page_size(size: int) -> int:
+    if not 1 <= size <= MAX_PAGE:
+        raise ValueError(f"Page size must be between 1 and {MAX_PAGE}")
+    return size
+
+def checked_cursor(after: Optional[str]) -> Optional[str]:
+    if after is not None:
+        try:
+            decode_cursor(after)
+        except HTTPException as e:
+            raise ValueError(e.detail)
+    return after
+
+class GraphContext(BaseContext):
+    """Per-request session and DataLoaders.
+
+    Every relation has a loader, so however many parents a query reaches,
+    each relation costs one query per nesting level. One-to-many relations
+    are read with a LATERAL join that pages every parent's children in that
+    single query.
+    """
+
+    def __init__(self, db, user: User):
+        super().__init__()
+        self.db = db
+        self.user = user
+        # Loaders of one level run concurrently, but a session runs one statement at a time
+        self._lock = asyncio.Lock()
+        self.client = self._by_key(Client.client_id)
+        self.topic = self._by_key(Topic.id)
+        self.subscription = self._by_key(Subscription.id)
+        self.message = self._by_key(MessageLog.id)
+        self.event = self._by_key(ConnectionEvent.id)
+        self.topics_by_owner = self._children(Topic.owner_client_id, Topic.id)
+        self.subscriptions_by_client = self._children(Subscription.client_id, Subscription.id)
+        self.subscriptions_by_topic = self._children(Subscription.topic_id, Subscription.id)
+        self.admin_requests_by_client = self._children(AdminRequest.requester_client_id, AdminRequest.id)
+        self.admin_requests_by_topic = self._children(AdminRequest.topic_id, AdminRequest.id)
+        self.admins_by_topic = self._children(TopicAdmin.topic_id, TopicAdmin.admin_client_id)
+        self.sensor_configs_by_topic = self._children(AdminSensorConfig.topic_id, AdminSensorConfig.sensor_name)
+        self.messages_by_client = self._pages(MessageLog.publisher_client_id, MessageLog.published_at)
+        self.messages_by_topic = self._pages(MessageLog.topic_id, MessageLog.published_at)
+        self.events_by_client = self._pages(ConnectionEvent.client_id, ConnectionEvent.timestamp)
+
+    async def all(self, statement) -> List:
+        async with self._lock:
+            return (await self.db.execute(statement)).all()
+
+    async def scalars(self, statement) -> List:
+        async with self._lock:
+            return (await self.db.scalars(statement)).all()
+
+    def _by_key(self, key_column) -> DataLoader:
+        async def load(keys):
+            rows = await self.scalars(select(key_column.class_).where(key_column.in_(keys)))
+            by_key = {getattr(row, key_column.key): row for row in rows}
+            return [by_key.get(key) for key in keys]
+        return DataLoader(load)
+
+    async def _lateral(self, parent_column, keys: List, page: Callable, order: Callable) -> List[List]:
+        """Children of each (parent, *page arguments) key, one query per distinct page arguments.
+
+        ``page(query, *arguments)`` orders and limits the children of one
+        parent; ``order(alias)`` repeats that order on the outer query.
+        """
+        model = parent_column.class_
+        parents_by_arguments = defaultdict(list)
+        for key in keys:
+            parents_by_arguments[key[1:]].append(key[0])
+        found = defaultdict(list)
+        for arguments, parents in parents_by_arguments.items():
+            parent = values(column("key", parent_column.type), name="parent").data(
+                [(key,) for key in dict.fromkeys(parents)]
+            )
+            children = page(select(model).where(parent_column == parent.c.key), *arguments).lateral()
+            child = aliased(model, children)
+            rows = await self.all(
+                select(parent.c.key, child).select_from(parent).join(children, true()).order_by(parent.c.key, *order(child))
+            )
+            for key, row in rows:
+                found[(key, *arguments)].append(row)
+        return [found[key] for key in keys]
+
+    def _children(self, parent_column, order_column) -> DataLoader:
+        """Loader of up to ``limit`` children per (parent, limit) key"""
+        async def load(keys):
+            return await self._lateral(
+                parent_column, keys,
+                lambda query, limit: query.order_by(order_column).limit(limit),
+                lambda child: [getattr(child, order_column.key)],
+            )
+        return DataLoader(load)
+
+    def _pages(self, parent_column, time_column) -> DataLoader:
+        """Loader of newest-first connections per (parent, first, after) key"""
+        id_column = parent_column.class_.id
+        async def load(keys):
+            pages = await self._lateral(
+                parent_column, keys,
+                lambda query, first, after: paginate(query, time_column, id_column, 0, first + 1, after),
+                lambda child: [getattr(child, time_column.key).desc().nulls_first(), child.id.desc()],
+            )
+            return [connection(rows, first, time_column.key) for rows, (_, first, _) in zip(pages, keys)]
+        return DataLoader(load)
+
+async def get_context(db=Depends(get_db), user: User = Depends(get_current_active_user)) -> GraphContext:
+    return GraphContext(db, user)
+
+# Cursor connections over the newest-first log tables
+@strawberry.type
+class PageInfo:
+    has_next_page: bool
+    end_cursor: Optional[str]
+
+@strawberry.type
+class Edge(Generic[T]):
+    cursor: str
+    node: T
+
+@strawberry.type
+class Connection(Generic[T]):
+    edges: List[Edge[T]]
+    page_info: PageInfo
+
+def connection(rows: List, first: int, time_attr: str) -> Connection:
+    """Connection over a page fetched with one row more than ``first``"""
+    edges = []
+    for row in rows[:first]:
+        edges.append(Edge(cursor=encode_cursor(getattr(row, time_attr), row.id), node=row))
+    return Connection(
+        edges=edges,
+        page_info=PageInfo(has_next_page=len(rows) > first, end_cursor=edges[-1].cursor if edges else None),
+    )
+
+# Object types; resolvers receive the ORM rows as self
+@strawberry.type(name="Client")
+class ClientType:
+    id: int
+    client_id: str
+    last_connected: Optional[datetime]
+    last_ip: Optional[str]
+    last_port: Optional[int]
+    connection_count: Optional[int]
+    active: Optional[bool]
+
+    @strawberry.field
+    async def topics(self, info: Info, limit: int = DEFAULT_PAGE) -> List["TopicType"]:
+        return await info.context.topics_by_owner.load((self.client_id, page_size(limit)))
+
+    @strawberry.field
+    async def subscriptions(self, info: Info, limit: int = DEFAULT_PAGE) -> List["SubscriptionType"]:
+        return await info.context.subscriptions_by_client.load((self.client_id, page_size(limit)))
+
+    @strawberry.field
+    async def messages(self, info: Info, first: int = DEFAULT_PAGE, after: Optional[str] = None) -> Connection["MessageType"]:
+        return await info.context.messages_by_client.load((self.client_id, page_size(first), checked_cursor(after)))
+
+    @strawberry.field
+    async def events(self, info: Info, first: int = DEFAULT_PAGE, after: Optional[str] = None) -> Connection["EventType"]:
+        return await info.context.events_by_client.load((self.client_id, page_size(first), checked_cursor(after)))
+
+    @strawberry.field
+    async def admin_requests(self, info: Info, limit: int = DEFAULT_PAGE) -> List["AdminRequestType"]:
+        return await info.context.admin_requests_by_client.load((self.client_id, page_size(limit)))
+
+@strawberry.type(name="Topic")
+class TopicType:
+    id: int
+    name: str
+    owner_client_id: Optional[str]
+    created_at: Optional[datetime]
+    publish: Optional[bool]
+
+    @strawberry.field
+    async def owner(self, info: Info) -> Optional[ClientType]:
+        return await info.context.client.load(self.owner_client_id)
+
+    @strawberry.field
+    async def subscriptions(self, info: Info, limit: int = DEFAULT_PAGE) -> List["SubscriptionType"]:
+        return await info.context.subscriptions_by_topic.load((self.id, page_size(limit)))
+
+    @strawberry.field
+    async def messages(self, info: Info, first: int = DEFAULT_PAGE, after: Optional[str] = None) -> Connection["MessageType"]:
+        return await info.context.messages_by_topic.load((self.id, page_size(first), checked_cursor(after)))
+
+    @strawberry.field
+    async def admins(self, info: Info, limit: int = DEFAULT_PAGE) -> List["TopicAdminType"]:
+        return await info.context.admins_by_topic.load((self.id, page_size(limit)))
+
+    @strawberry.field
+    async def admin_requests(self, info: Info, limit: int = DEFAULT_PAGE) -> List["AdminRequestType"]:
+        return await info.context.admin_requests_by_topic.load((self.id, page_size(limit)))
+
+    @strawberry.field
+    async def sensor_configs(self, info: Info, limit: int = DEFAULT_PAGE) -> List["SensorConfigType"]:
+        return await info.context.sensor_configs_by_topic.load((self.id, page_size(limit)))
+
+@strawberry.type(name="Subscription")
+class SubscriptionType:
+    id: int
+    client_id: str
+    topic_id: int
+    subscribed_at: Optional[datetime]
+    active: Optional[bool]
+
+    @strawberry.field
+    async def client(self, info: Info) -> Optional[ClientType]:
+        return await info.context.client.load(self.client_id)
+
+    @strawberry.field
+    async def topic(self, info: Info) -> Optional[TopicType]:
+        return await info.context.topic.load(self.topic_id)
+
+@strawberry.type(name="Message")
+class MessageType:
+    id: int
+    publisher_client_id: str
+    topic_id: int
+    payload_size: int
+    payload_preview: Optional[str]
+    published_at: Optional[datetime]
+
+    @strawberry.field
+    async def publisher(self, info: Info) -> Optional[ClientType]:
+        return await info.context.client.load(self.publisher_client_id)
+
+    @strawberry.field
+    async def topic(self, info: Info) -> Optional[TopicType]:
+        return await info.context.topic.load(self.topic_id)
+
+@strawberry.type(name="ConnectionEvent")
+class EventType:
+    id: int
+    client_id: str
+    event_type: str
+    ip_address: Optional[str]
+    port: Optional[int]
+    timestamp: Optional[datetime]
+
+    @strawberry.field
+    async def client(self, info: Info) -> Optional[ClientType]:
+        return await info.context.client.load(self.client_id)
+
+@strawberry.type(name="AdminRequest")
+class AdminRequestType:
+    id: int
+    topic_id: int
+    requester_client_id: str
+    status: Optional[str]
+    request_timestamp: Optional[datetime]
+    response_timestamp: Optional[datetime]
+
+    @strawberry.field
+    async def topic(self, info: Info) -> Optional[TopicType]:
+        return await info.context.topic.load(self.topic_id)
+
+    @strawberry.field
+    async def requester(self, info: Info) -> Optional[ClientType]:
+        return await info.context.client.load(self.requester_client_id)
+
+@strawberry.type(name="TopicAdmin")
+class TopicAdminType:
+    topic_id: int
+    admin_client_id: str
+    granted_at: Optional[datetime]
+
+    @strawberry.field
+    async def topic(self, info: Info) -> Optional[TopicType]:
+        return await info.context.topic.load(self.topic_id)
+
+    @strawberry.field
+    async def admin_client(self, info: Info) -> Optional[ClientType]:
+        return await info.context.client.load(self.admin_client_id)
+
+@strawberry.type(name="SensorConfig")
+class SensorConfigType:
+    topic_id: int
+    sensor_name: str
+    active: Optional[bool]
+    set_by: Optional[str]
+    updated_at: Optional[datetime]
+    activable: Optional[bool]
+
+    @strawberry.field
+    async def topic(self, info: Info) -> Optional[TopicType]:
+        return await info.context.topic.load(self.topic_id)
+
+    @strawberry.field
+    async def set_by_client(self, info: Info) -> Optional[ClientType]:
+        return await info.context.client.load(self.set_by)
+
+@strawberry.type
+class Query:
+    @strawberry.field
+    async def client(self, info: Info, client_id: str) -> Optional[ClientType]:
+        return await info.context.client.load(client_id)
+
+    @strawberry.field
+    async def clients(self, info: Info, limit: int = DEFAULT_PAGE, offset: int = 0) -> List[ClientType]:
+        return await info.context.scalars(select(Client).order_by(Client.id).offset(offset).limit(page_size(limit)))
+
+    @strawberry.field
+    async def topic(self, info: Info, id: int) -> Optional[TopicType]:
+        return await info.context.topic.load(id)
+
+    @strawberry.field
+    async def topics(self, info: Info, limit: int = DEFAULT_PAGE, offset: int = 0) -> List[TopicType]:
+        return await info.context.scalars(select(Topic).order_by(Topic.id).offset(offset).limit(page_size(limit)))
+
+    @strawberry.field
+    async def subscription(self, info: Info, id: int) -> Optional[SubscriptionType]:
+        return await info.context.subscription.load(id)
+
+    @strawberry.field
+    async def subscriptions(self, info: Info, limit: int = DEFAULT_PAGE, offset: int = 0,
+                            active_only: bool = False) -> List[SubscriptionType]:
+        query = select(Subscription).order_by(Subscription.id)
+        if active_only:
+            query = query.where(Subscription.active == True)
+        return await info.context.scalars(query.offset(offset).limit(page_size(limit)))
+
+    @strawberry.field
+    async def message(self, info: Info, id: int) -> Optional[MessageType]:
+        return await info.context.message.load(id)
+
+    @strawberry.field
+    async def messages(self, info: Info, first: int = DEFAULT_PAGE, after: Optional[str] = None,
+                       topic_id: Optional[int] = None, client_id: Optional[str] = None,
+                       start: Optional[datetime] = None, end: Optional[datetime] = None) -> Connection[MessageType]:
+        query = published_between(select(MessageLog), start, end)
+        if topic_id is not None:
+            query = query.where(MessageLog.topic_id == topic_id)
+        if client_id is not None:
+            query = query.where(MessageLog.publisher_client_id == client_id)
+        first = page_size(first)
+        query = paginate(query, MessageLog.published_at, MessageLog.id, 0, first + 1, checked_cursor(after))
+        return connection(await info.context.scalars(query), first, "published_at")
+
+    @strawberry.field
+    async def event(self, info: Info, id: int) -> Optional[EventType]:
+        return await info.context.event.load(id)
+
+    @strawberry.field
+    async def events(self, info: Info, first: int = DEFAULT_PAGE, after: Optional[str] = None,
+                     event_type: Optional[str] = None) -> Connection[EventType]:
+        query = select(ConnectionEvent)
+        if event_type is not None:
+            query = query.where(ConnectionEvent.event_type == event_type)
+        first = page_size(first)
+        query = paginate(query, ConnectionEvent.timestamp, ConnectionEvent.id, 0, first + 1, checked_cursor(after))
+        return connection(await info.context.scalars(query), first, "timestamp")
+
+    @strawberry.field
+    async def admin_requests(self, info: Info, limit: int = DEFAULT_PAGE, offset: int = 0,
+                             status: Optional[str] = None) -> List[AdminRequestType]:
+        query = select(AdminRequest).order_by(AdminRequest.id)
+        if status is not None:
+            query = query.where(AdminRequest.status == status)
+        return await info.context.scalars(query.offset(offset).limit(page_size(limit)))
+
+class CostLimit(ValidationRule):
+    """Reject operations estimated to resolve more than GRAPHQL_MAX_COST objects.
+
+    Every field counts once per parent object it is resolved on, and a
+    field with a ``first``/``limit`` argument multiplies everything selected
+    below it by that page size (the largest allowed when it is a variable).
+    """
+
+    def enter_operation_definition(self, node, *_):
+        root = self.context.schema.get_root_type(node.operation)
+        cost = self._cost(node.selection_set, root, 1, set())
+        if cost > settings.graphql_max_cost:
+            self.report_error(GraphQLError(
+                f"Query cost {cost} exceeds the limit of {settings.graphql_max_cost}; request smaller pages", node
+            ))
+
+    def _cost(self, selection_set, parent_type, multiplier: int, fragments: Set[str]) -> int:
+        cost = 0
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                field = getattr(parent_type, "fields", {}).get(selection.name.value)
+                if field is None:
+                    continue
+                cost += multiplier
+                if selection.selection_set is not None:
+                    cost += self._cost(selection.selection_set, get_named_type(field.type),
+                                       multiplier * self._page_size(selection, field), fragments)
+            elif isinstance(selection, InlineFragmentNode):
+                fragment_type = parent_type
+                if selection.type_condition is not None:
+                    fragment_type = self.context.schema.get_type(selection.type_condition.name.value) or parent_type
+                cost += self._cost(selection.selection_set, fragment_type, multiplier, fragments)
+            elif isinstance(selection, FragmentSpreadNode):
+                name = selection.name.value
+                fragment = self.context.get_fragment(name)
+                # Cycles are reported by the NoFragmentCycles rule
+                if fragment is None or name in fragments:
+                    continue
+                fragment_type = self.context.schema.get_type(fragment.type_condition.name.value) or parent_type
+                cost += self._cost(fragment.selection_set, fragment_type, multiplier, fragments | {name})
+        return cost
+
+    def _page_size(self, node: FieldNode, field) -> int:
+        for name in PAGE_ARGUMENTS:
+            if name in field.args:
+                argument = next((argument for argument in node.arguments if argument.name.value == name), None)
+                if argument is None:
+                    default = field.args[name].default_value
+                    return default if isinstance(default, int) else MAX_PAGE
+                if isinstance(argument.value, IntValueNode):
+                    return int(argument.value.value)
+                return MAX_PAGE
+        return 1
+
+schema = strawberry.Schema(
+    query=Query,
+    extensions=[
+        QueryDepthLimiter(max_depth=settings.graphql_max_depth),
+        AddValidationRules([CostLimit]),
+    ],
+)
+
+# No in-browser IDE: it could not send the bearer token the endpoint requires
+router = GraphQLRouter(schema, path="/graphql", graphql_ide=None, context_getter=get_context)
@@ -1,8 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import REAL, cast, func, null, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional, Dict, Any
 from ..models import get_db, MessageLog, User, Client, Topic
+from ..caching import conditional, immutable
+from ..changes import ChangeFeed, read_changes
+from ..batch import batch_ids, in_request_order
 from ..auth import get_current_active_user
+from ..listing import Field, ListQuery, ListSpec, EQUALITY_OPS, LOOKUP_OPS, RANGE_OPS, escape_like, list_query
+from ..pagination import NEXT_CURSOR_HEADER, decode_score_cursor, encode_score_cursor, paginate, set_next_cursor
+from ..serialization import columns_for, rows_response
+from ..export import export_response
 from pydantic import BaseModel
 from datetime import datetime
 
@@ -37,6 +45,9 @@ class MessageLogDetail(MessageLogResponse):
     class Config:
         from_attributes = True
 
+class MessageSearchHit(MessageLogDetail):
+    score: float
+
 class PublisherResponse(BaseModel):
     id: int
     client_id: str
@@ -57,54 +68,169 @@ class TopicResponse(BaseModel):
     class Config:
         from_attributes = True
 
+# payload_data is not stored in the database, so it is always null
+MESSAGE_COLUMNS = columns_for(MessageLogDetail, MessageLog, topic_name=Topic.name, payload_data=null())
+
+# Served by the (published_at, id) indexes of migration 2
+MESSAGE_LIST = ListSpec(
+    fields={
+        "id": Field(MessageLog.id, LOOKUP_OPS, sortable=True, unique=True),
+        "topic_id": Field(MessageLog.topic_id, EQUALITY_OPS),
+        "publisher_client_id": Field(MessageLog.publisher_client_id, EQUALITY_OPS),
+        "published_at": Field(MessageLog.published_at, RANGE_OPS, sortable=True),
+    },
+    indexes=[("published_at",), ("topic_id", "published_at"), ("publisher_client_id", "published_at")],
+    default_sort="-published_at",
+)
+
+def published_between(query, start: Optional[datetime], end: Optional[datetime]):
+    """Restrict to messages published in [start, end); partitioned message_logs only scans the partitions in range"""
+    if start is not None:
+        query = query.where(MessageLog.published_at >= start)
+    if end is not None:
+        query = query.where(MessageLog.published_at < end)
+    return query
+
+def like_pattern(fragment: str) -> str:
+    """ILIKE pattern matching ``fragment`` anywhere, with its own wildcards escaped"""
+    return f"%{escape_like(fragment)}%"
+
+# Set once pg_trgm is known to be installed; migration 10 skips it where the server lacks it
+search_available = False
+
+async def require_search(db: AsyncSession):
+    global search_available
+    if not search_available:
+        search_available = bool(await db.scalar(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")))
+        if not search_available:
+            raise HTTPException(status_code=503, detail="Message search needs the pg_trgm extension on the database server")
+
 # Routes
-@router.get("/", response_model=List[MessageLogDetail])
-def get_messages(
+@router.get("/", response_model=List[MessageLogDetail], dependencies=[Depends(conditional("messages", "topics"))])
+async def get_messages(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(10000, ge=1, le=1000), # Adjusted limit to 10000
-    db: Session = Depends(get_db),
+    start: Optional[datetime] = Query(None, description="Only messages published at or after this time"),
+    end: Optional[datetime] = Query(None, description="Only messages published before this time"),
+    listing: ListQuery = Depends(list_query(MESSAGE_LIST)),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    # Use explicit column selection to avoid columns that might not exist in the database
-    messages = db.query(
-        MessageLog.id,
-        MessageLog.publisher_client_id,
-        MessageLog.topic_id,
-        MessageLog.payload_size,
-        MessageLog.payload_preview,
-        MessageLog.published_at,
-        Topic.name.label('topic_name')
-    ).join(
+    """Messages, filtered on id, topic_id, publisher_client_id or a published_at range and sorted by published_at or id"""
+    query = select(*MESSAGE_COLUMNS).join(
         Topic, MessageLog.topic_id == Topic.id, isouter=True
-    ).order_by(
-        MessageLog.published_at.desc()
-    ).offset(skip).limit(limit).all()
-    
-    # Convert query results to dictionaries
-    result = []
-    for msg in messages:
-        msg_dict = {
-            "id": msg.id,
-            "publisher_client_id": msg.publisher_client_id,
-            "topic_id": msg.topic_id,
-            "payload_size": msg.payload_size,
-            "payload_preview": msg.payload_preview,
-            "payload_data": None,  # Set to None since it doesn't exist in DB
-            "published_at": msg.published_at,
-            "topic_name": msg.topic_name
-        }
-        result.append(msg_dict)
-    
-    return result
+    )
+    listing.filter("published_at", "gte", start).filter("published_at", "lt", end)
+    messages = (await db.execute(listing.apply(query, skip, limit))).all()
+    listing.set_next_cursor(response, messages, limit)
+    return rows_response(messages, response)
+
+@router.get("/changes", response_model=ChangeFeed[MessageLogDetail])
+async def get_message_changes(
+    since: Optional[str] = Query(None, description="Token from the previous response's next; omit to get a starting token"),
+    limit: int = Query(500, ge=1, le=5000),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    window = await read_changes(db, "message_logs", since, limit)
+    rows = {}
+    if window.upserted_ids:
+        messages = (await db.execute(select(*MESSAGE_COLUMNS).join(
+            Topic, MessageLog.topic_id == Topic.id, isouter=True
+        ).where(MessageLog.id.in_(window.upserted_ids)))).all()
+        rows = {msg.id: msg._asdict() for msg in messages}
+    return window.feed(rows)
+
+@router.get("/export")
+async def export_messages(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    start: Optional[datetime] = Query(None, description="Only messages published at or after this time"),
+    end: Optional[datetime] = Query(None, description="Only messages published before this time"),
+    topic_id: Optional[int] = Query(None),
+    client_id: Optional[str] = Query(None, description="Publisher client ID"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    query = select(*MESSAGE_COLUMNS).join(
+        Topic, MessageLog.topic_id == Topic.id, isouter=True
+    ).order_by(MessageLog.published_at, MessageLog.id)
+    query = published_between(query, start, end)
+    if topic_id is not None:
+        query = query.where(MessageLog.topic_id == topic_id)
+    if client_id is not None:
+        query = query.where(MessageLog.publisher_client_id == client_id)
+
+    # The export reads on a session of its own
+    await db.close()
+    return export_response(query, list(MessageLogDetail.model_fields), format, "messages")
+
+@router.get("/search", response_model=List[MessageSearchHit], dependencies=[Depends(conditional("messages", "topics"))])
+async def search_messages(
+    response: Response,
+    q: str = Query(..., min_length=3, description="Text the payload preview must contain, ignoring case"),
+    order: str = Query("relevance", pattern="^(relevance|newest)$"),
+    limit: int = Query(50, ge=1, le=1000),
+    after: Optional[str] = Query(None, description="Keyset cursor from X-Next-Cursor"),
+    topic_id: Optional[int] = Query(None),
+    client_id: Optional[str] = Query(None, description="Publisher client ID"),
+    start: Optional[datetime] = Query(None, description="Only messages published at or after this time"),
+    end: Optional[datetime] = Query(None, description="Only messages published before this time"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Messages whose payload preview contains ``q``.
+
+    The trigram index finds the matches, which come best first by
+    word_similarity() to ``q``, or newest first. Three characters is the
+    shortest text the index can look up.
+    """
+    await require_search(db)
+    score = func.word_similarity(q, MessageLog.payload_preview)
+    query = select(*MESSAGE_COLUMNS, score.label("score")).join(
+        Topic, MessageLog.topic_id == Topic.id, isouter=True
+    ).where(MessageLog.payload_preview.ilike(like_pattern(q)))
+    query = published_between(query, start, end)
+    if topic_id is not None:
+        query = query.where(MessageLog.topic_id == topic_id)
+    if client_id is not None:
+        query = query.where(MessageLog.publisher_client_id == client_id)
+
+    if order == "newest":
+        messages = (await db.execute(paginate(query, MessageLog.published_at, MessageLog.id, 0, limit, after))).all()
+        set_next_cursor(response, messages, limit, "published_at")
+        return rows_response(messages, response)
 
-@router.get("/{message_id}", response_model=MessageLogDetail)
-def get_message(
+    if after:
+        last_score, last_id = decode_score_cursor(after)
+        # Scores are single precision; compare at that precision so the page boundary is exact
+        query = query.where(tuple_(score, MessageLog.id) < tuple_(cast(last_score, REAL), last_id))
+    messages = (await db.execute(query.order_by(score.desc(), MessageLog.id.desc()).limit(limit))).all()
+    if len(messages) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_score_cursor(messages[-1].score, messages[-1].id)
+    return rows_response(messages, response)
+
+@router.get("/batch", response_model=List[MessageLogDetail], dependencies=[Depends(conditional("messages", "topics"))])
+async def get_messages_batch(
+    response: Response,
+    message_ids: List[int] = Depends(batch_ids),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Several messages by ID in one query, in the order asked for; unknown IDs are left out"""
+    messages = (await db.execute(select(*MESSAGE_COLUMNS).join(
+        Topic, MessageLog.topic_id == Topic.id, isouter=True
+    ).where(MessageLog.id.in_(message_ids)))).all()
+    return rows_response(in_request_order(messages, message_ids, "id"), response)
+
+@router.get("/{message_id}", response_model=MessageLogDetail, dependencies=[Depends(immutable)])
+async def get_message(
     message_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     # Use explicit column selection to avoid columns that might not exist in the database
-    message = db.query(
+    message = (await db.execute(select(
         MessageLog.id,
         MessageLog.publisher_client_id,
         MessageLog.topic_id,
@@ -114,9 +240,9 @@ def get_message(
         Topic.name.label('topic_name')
     ).join(
         Topic, MessageLog.topic_id == Topic.id, isouter=True
-    ).filter(
+    ).where(
         MessageLog.id == message_id
-    ).first()
+    ))).first()
     
     if message is None:
         raise HTTPException(status_code=404, detail="Message not found")
@@ -133,141 +259,103 @@ def get_message(
     }
 
 @router.delete("/{message_id}", status_code=204)
-def delete_message(
+async def delete_message(
     message_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    message = db.query(MessageLog).filter(MessageLog.id == message_id).first()
+    message = await db.scalar(select(MessageLog).where(MessageLog.id == message_id))
     if message is None:
         raise HTTPException(status_code=404, detail="Message not found")
     
-    db.delete(message)
-    db.commit()
+    await db.delete(message)
+    await db.commit()
     
     return None
 
-@router.get("/by-client/{client_id}", response_model=List[MessageLogDetail])
-def get_messages_by_client(
+@router.get("/by-client/{client_id}", response_model=List[MessageLogDetail], dependencies=[Depends(conditional("clients", "messages", "topics"))])
+async def get_messages_by_client(
     client_id: str,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db),
+    after: Optional[str] = Query(None, description="Keyset cursor from X-Next-Cursor; overrides skip"),
+    start: Optional[datetime] = Query(None, description="Only messages published at or after this time"),
+    end: Optional[datetime] = Query(None, description="Only messages published before this time"),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     # Check if client exists
-    client = db.query(Client).filter(Client.client_id == client_id).first()
+    client = await db.scalar(select(Client).where(Client.client_id == client_id))
     if client is None:
         raise HTTPException(status_code=404, detail="Client not found")
     
-    # Get messages published by client using explicit column selection
-    messages = db.query(
-        MessageLog.id,
-        MessageLog.publisher_client_id,
-        MessageLog.topic_id,
-        MessageLog.payload_size,
-        MessageLog.payload_preview,
-        MessageLog.published_at,
-        Topic.name.label('topic_name')
-    ).join(
+    # Get messages published by client
+    query = select(*MESSAGE_COLUMNS).join(
         Topic, MessageLog.topic_id == Topic.id, isouter=True
-    ).filter(
+    ).where(
         MessageLog.publisher_client_id == client_id
-    ).order_by(
-        MessageLog.published_at.desc()
-    ).offset(skip).limit(limit).all()
-    
-    # Convert query results to dictionaries
-    result = []
-    for msg in messages:
-        msg_dict = {
-            "id": msg.id,
-            "publisher_client_id": msg.publisher_client_id,
-            "topic_id": msg.topic_id,
-            "payload_size": msg.payload_size,
-            "payload_preview": msg.payload_preview,
-            "payload_data": None,  # Set to None since it doesn't exist in DB
-            "published_at": msg.published_at,
-            "topic_name": msg.topic_name
-        }
-        result.append(msg_dict)
-    
-    return result
+    )
+    query = published_between(query, start, end)
+    messages = (await db.execute(paginate(query, MessageLog.published_at, MessageLog.id, skip, limit, after))).all()
+    set_next_cursor(response, messages, limit, "published_at")
+    return rows_response(messages, response)
 
-@router.get("/by-topic/{topic_id}", response_model=List[MessageLogDetail])
-def get_messages_by_topic(
+@router.get("/by-topic/{topic_id}", response_model=List[MessageLogDetail], dependencies=[Depends(conditional("topics", "messages"))])
+async def get_messages_by_topic(
     topic_id: int,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db),
+    after: Optional[str] = Query(None, description="Keyset cursor from X-Next-Cursor; overrides skip"),
+    start: Optional[datetime] = Query(None, description="Only messages published at or after this time"),
+    end: Optional[datetime] = Query(None, description="Only messages published before this time"),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     # Check if topic exists
-    topic = db.query(Topic).filter(Topic.id == topic_id).first()
+    topic = await db.scalar(select(Topic).where(Topic.id == topic_id))
     if topic is None:
         raise HTTPException(status_code=404, detail="Topic not found")
     
-    # Get messages for topic using explicit column selection
-    messages = db.query(
-        MessageLog.id,
-        MessageLog.publisher_client_id,
-        MessageLog.topic_id,
-        MessageLog.payload_size,
-        MessageLog.payload_preview,
-        MessageLog.published_at,
-        Topic.name.label('topic_name')
-    ).join(
+    # Get messages for topic
+    query = select(*MESSAGE_COLUMNS).join(
         Topic, MessageLog.topic_id == Topic.id, isouter=True
-    ).filter(
+    ).where(
         MessageLog.topic_id == topic_id
-    ).order_by(
-        MessageLog.published_at.desc()
-    ).offset(skip).limit(limit).all()
-    
-    # Convert query results to dictionaries
-    result = []
-    for msg in messages:
-        msg_dict = {
-            "id": msg.id,
-            "publisher_client_id": msg.publisher_client_id,
-            "topic_id": msg.topic_id,
-            "payload_size": msg.payload_size,
-            "payload_preview": msg.payload_preview,
-            "payload_data": None,  # Set to None since it doesn't exist in DB
-            "published_at": msg.published_at,
-            "topic_name": msg.topic_name
-        }
-        result.append(msg_dict)
-    
-    return result
+    )
+    query = published_between(query, start, end)
+    messages = (await db.execute(paginate(query, MessageLog.published_at, MessageLog.id, skip, limit, after))).all()
+    set_next_cursor(response, messages, limit, "published_at")
+    return rows_response(messages, response)
 
-@router.get("/{message_id}/client", response_model=PublisherResponse)
-def get_publisher_by_message(
+@router.get("/{message_id}/client", response_model=PublisherResponse, dependencies=[Depends(conditional("messages", "clients"))])
+async def get_publisher_by_message(
     message_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    message = db.query(MessageLog).filter(MessageLog.id == message_id).first()
+    message = await db.scalar(select(MessageLog).where(MessageLog.id == message_id))
     if message is None:
         raise HTTPException(status_code=404, detail="Message not found")
     
-    publisher = db.query(Client).filter(Client.client_id == message.publisher_client_id).first()
+    publisher = await db.scalar(select(Client).where(Client.client_id == message.publisher_client_id))
     if publisher is None:
         raise HTTPException(status_code=404, detail="Publisher not found")
     
     return publisher
 
-@router.get("/{message_id}/topic", response_model=TopicResponse)
-def get_topic_by_message(
+@router.get("/{message_id}/topic", response_model=TopicResponse, dependencies=[Depends(conditional("messages", "topics"))])
+async def get_topic_by_message(
     message_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    message = db.query(MessageLog).filter(MessageLog.id == message_id).first()
+    message = await db.scalar(select(MessageLog).where(MessageLog.id == message_id))
     if message is None:
         raise HTTPException(status_code=404, detail="Message not found")
     
-    topic = db.query(Topic).filter(Topic.id == message.topic_id).first()
+    topic = await db.scalar(select(Topic).where(Topic.id == message.topic_id))
     if topic is None:
         raise HTTPException(status_code=404, detail="Topic not found")
     
@@ -0,0 +1,82 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from ..models import get_db, User
+from ..auth import get_current_active_user
+from ..rollups import WIDTH_STEPS, truncate
+from pydantic import BaseModel
+from datetime import datetime, timezone
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["metrics"],
+    dependencies=[Depends(get_current_active_user)],
+    responses={404: {"description": "Not found"}},
+)
+
+# Buckets covered when no range is given, and the most one request may span
+DEFAULT_BUCKETS = 240
+MAX_BUCKETS = 5000
+
+def naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """``value`` as a naive UTC datetime, the form the rollups store buckets in"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+# Pydantic models
+class TimeseriesPoint(BaseModel):
+    bucket: datetime
+    message_count: int
+    total_size: int
+    min_size: Optional[int] = None
+    max_size: Optional[int] = None
+    avg_size: Optional[float] = None
+
+# Routes
+@router.get("/timeseries", response_model=List[TimeseriesPoint])
+async def get_timeseries(
+    bucket: str = Query("1h", pattern="^(1m|1h|1d)$"),
+    topic_id: Optional[int] = Query(None),
+    client_id: Optional[str] = Query(None, description="Publisher client ID"),
+    start: Optional[datetime] = Query(None, alias="from", description="First bucket; defaults to 240 buckets before 'to'"),
+    end: Optional[datetime] = Query(None, alias="to", description="End of the range (exclusive); defaults to now"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Message traffic per bucket, read from the rollups.
+
+    Buckets without messages are left out. The rollups trail the message
+    log by up to ROLLUP_INTERVAL seconds, and minute buckets are only kept
+    as long as the messages themselves.
+    """
+    step = WIDTH_STEPS[bucket]
+    start, end = naive_utc(start), naive_utc(end)
+    if end is None:
+        end = truncate(datetime.utcnow(), bucket) + step
+    if start is None:
+        start = end - step * DEFAULT_BUCKETS
+    if start >= end:
+        raise HTTPException(status_code=400, detail="'from' must be before 'to'")
+    if (end - start) / step > MAX_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"Range spans more than {MAX_BUCKETS} buckets; use a wider bucket")
+
+    conditions = ["width = :width", "bucket >= :start", "bucket < :end"]
+    params = {"width": bucket, "start": truncate(start, bucket), "end": end}
+    if topic_id is not None:
+        conditions.append("topic_id = :topic_id")
+        params["topic_id"] = topic_id
+    if client_id is not None:
+        conditions.append("publisher_client_id = :client_id")
+        params["client_id"] = client_id
+    rows = (await db.execute(text(
+        "SELECT bucket, CAST(sum(message_count) AS bigint) AS message_count, "
+        "CAST(sum(total_size) AS bigint) AS total_size, min(min_size) AS min_size, max(max_size) AS max_size "
+        f"FROM message_rollups WHERE {' AND '.join(conditions)} "
+        "GROUP BY bucket ORDER BY bucket"
+    ), params)).all()
+    return [
+        dict(row._asdict(), avg_size=round(row.total_size / row.message_count, 2) if row.message_count else None)
+        for row in rows
+    ]
@@ -0,0 +1,137 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from ..models import get_db, get_request_engine, User, Client, Topic, Subscription, ConnectionEvent
+from ..pool import pool_status
+from ..stream import change_broker
+from ..compression import compression_stats, available_encodings
+from ..export import export_slots
+from ..retention import retention_job, table_sizes
+from ..rollups import rollup_job
+from ..caching import conditional
+from ..auth import get_current_active_user, password_executor, user_cache
+from pydantic import BaseModel
+from datetime import datetime
+
+router = APIRouter(
+    prefix="/stats",
+    tags=["stats"],
+    dependencies=[Depends(get_current_active_user)],
+    responses={404: {"description": "Not found"}},
+)
+
+# Pydantic models
+class ConnectionEventResponse(BaseModel):
+    id: int
+    client_id: str
+    event_type: str
+    ip_address: Optional[str] = None
+    port: Optional[int] = None
+    timestamp: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class StatsSummary(BaseModel):
+    clients_total: int
+    clients_connected: int
+    topics_total: int
+    subscriptions_active: int
+    messages_total: int
+    events_total: int
+    recent_events: List[ConnectionEventResponse] = []
+
+# Helpers
+async def get_row_count(db: AsyncSession, table_name: str) -> int:
+    """Row count of a large table without scanning it.
+
+    Sums the trigger-maintained counter slots, falling back to the planner's
+    reltuples estimate if the counter has not been created yet. Partition
+    expiry subtracts an estimate, so the sum is kept from going negative.
+    """
+    count = await db.scalar(
+        text("SELECT sum(row_count) FROM table_counters WHERE table_name = :table_name"),
+        {"table_name": table_name}
+    )
+    if count is None:
+        count = await db.scalar(
+            text("SELECT GREATEST(reltuples, 0) FROM pg_class WHERE relname = :table_name"),
+            {"table_name": table_name}
+        )
+    return max(int(count or 0), 0)
+
+# Routes
+@router.get("/summary", response_model=StatsSummary, dependencies=[Depends(conditional("clients", "topics", "subscriptions", "messages", "events"))])
+async def get_summary(
+    recent_events: int = Query(10, ge=0, le=100),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    # clients, topics and subscriptions are small, so exact filtered counts are cheap
+    clients_total, clients_connected = (await db.execute(select(
+        func.count(Client.id),
+        func.count(Client.id).filter(Client.active == True)
+    ))).one()
+    topics_total = await db.scalar(select(func.count(Topic.id)))
+    subscriptions_active = await db.scalar(select(func.count(Subscription.id)).where(Subscription.active == True))
+
+    events = []
+    if recent_events:
+        events = (await db.scalars(select(ConnectionEvent).order_by(
+            ConnectionEvent.timestamp.desc()
+        ).limit(recent_events))).all()
+
+    return {
+        "clients_total": clients_total,
+        "clients_connected": clients_connected,
+        "topics_total": topics_total,
+        "subscriptions_active": subscriptions_active,
+        "messages_total": await get_row_count(db, "message_logs"),
+        "events_total": await get_row_count(db, "connection_events"),
+        "recent_events": events
+    }
+
+@router.get("/pool")
+async def get_pool_status(current_user: User = Depends(get_current_active_user)):
+    return pool_status(get_request_engine())
+
+@router.get("/auth")
+async def get_auth_status(current_user: User = Depends(get_current_active_user)):
+    return {
+        "password_executor": password_executor.snapshot(),
+        "cached_users": len(user_cache)
+    }
+
+@router.get("/stream")
+async def get_stream_status(current_user: User = Depends(get_current_active_user)):
+    return change_broker.snapshot()
+
+@router.get("/compression")
+async def get_compression_status(current_user: User = Depends(get_current_active_user)):
+    return {
+        "encodings": list(available_encodings()),
+        "routes": compression_stats.snapshot()
+    }
+
+@router.get("/export")
+async def get_export_status(current_user: User = Depends(get_current_active_user)):
+    return export_slots.snapshot()
+
+@router.get("/retention")
+async def get_retention_status(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    status = retention_job.snapshot()
+    status["tables"] = await table_sizes(db, ["message_logs", "connection_events", "change_log"])
+    return status
+
+@router.get("/rollups")
+async def get_rollup_status(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    status = rollup_job.snapshot()
+    status["tables"] = await table_sizes(db, ["message_rollups"])
+    return status
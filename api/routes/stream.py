@@ -0,0 +1,86 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from ..models import get_db, User
+from ..auth import get_current_active_user
+from ..config import settings
+from ..stream import change_broker, ChangeFilter, Subscriber, STREAMED_TABLES, format_event
+
+router = APIRouter(
+    prefix="/stream",
+    tags=["stream"],
+    dependencies=[Depends(get_current_active_user)],
+    responses={404: {"description": "Not found"}},
+)
+
+# Milliseconds an EventSource waits before reconnecting
+RETRY_MS = 3000
+
+class StreamResponse(StreamingResponse):
+    """StreamingResponse that unsubscribes its subscriber however the response ends"""
+
+    def __init__(self, request: Request, subscriber: Subscriber, **kwargs):
+        super().__init__(event_source(request, subscriber), **kwargs)
+        self.subscriber = subscriber
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            # A client gone before the body started never runs event_source's finally
+            change_broker.unsubscribe(self.subscriber)
+
+async def event_source(request: Request, subscriber: Subscriber):
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        while True:
+            try:
+                change = await asyncio.wait_for(subscriber.queue.get(), timeout=settings.stream_heartbeat)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                # Comment line that keeps proxies and idle timeouts from closing the stream
+                yield ": keep-alive\n\n"
+                continue
+            yield format_event(change)
+    finally:
+        change_broker.unsubscribe(subscriber)
+
+@router.get("/")
+async def stream_changes(
+    request: Request,
+    resources: Optional[str] = Query(None, description="Comma separated: clients, topics, subscriptions, messages, events"),
+    topic_id: Optional[int] = Query(None),
+    client_id: Optional[str] = Query(None),
+    event_type: Optional[str] = Query(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    wanted = None
+    if resources:
+        wanted = {r.strip() for r in resources.split(",") if r.strip()}
+        unknown = wanted - set(STREAMED_TABLES.values())
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown resources: {', '.join(sorted(unknown))}")
+    if change_broker.full:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many stream subscribers",
+            headers={"Retry-After": "5"},
+        )
+
+    # The stream never touches the database, so give back the session that
+    # authentication used instead of holding it for the life of the connection
+    await db.close()
+
+    # Subscribed now rather than when the body starts, so the capacity check above holds for bursts
+    subscriber = change_broker.subscribe(ChangeFilter(wanted, topic_id, client_id, event_type))
+    return StreamResponse(
+        request,
+        subscriber,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,7 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
 from typing import List, Optional
 from ..models import get_db, Subscription, User, Client, Topic
+from ..caching import conditional
+from ..serialization import columns_for, rows_response
+from ..changes import ChangeFeed, read_changes
+from ..listing import Field, ListQuery, ListSpec, EQUALITY_OPS, LOOKUP_OPS, list_query
 from ..auth import get_current_active_user
 from pydantic import BaseModel
 from datetime import datetime
@@ -58,40 +64,65 @@ class TopicResponse(BaseModel):
 class SubscriptionStatusUpdate(BaseModel):
     active: bool
 
+SUBSCRIPTION_COLUMNS = columns_for(SubscriptionDetail, Subscription, topic_name=Topic.name)
+
+SUBSCRIPTION_LIST = ListSpec(
+    fields={
+        "id": Field(Subscription.id, LOOKUP_OPS, sortable=True, unique=True),
+        "client_id": Field(Subscription.client_id, EQUALITY_OPS),
+        "topic_id": Field(Subscription.topic_id, EQUALITY_OPS),
+        "active": Field(Subscription.active, EQUALITY_OPS),
+    },
+    indexes=[("client_id",), ("topic_id",), ("active",)],
+    default_sort="id",
+)
+
 # Routes
-@router.get("/", response_model=List[SubscriptionDetail])
-def get_subscriptions(
+@router.get("/", response_model=List[SubscriptionDetail], dependencies=[Depends(conditional("subscriptions", "topics"))])
+async def get_subscriptions(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     active_only: bool = Query(False),
-    db: Session = Depends(get_db),
+    listing: ListQuery = Depends(list_query(SUBSCRIPTION_LIST)),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    query = db.query(Subscription).options(joinedload(Subscription.topic))
+    """Subscriptions, filtered on id, client_id, topic_id or active and sorted by id"""
+    query = select(*SUBSCRIPTION_COLUMNS).join(Topic, Subscription.topic_id == Topic.id, isouter=True)
     
     if active_only:
-        query = query.filter(Subscription.active == True)
-    
-    subscriptions = query.offset(skip).limit(limit).all()
-    
-    # Manually add topic_name to response
-    result = []
-    for sub in subscriptions:
-        sub_dict = SubscriptionResponse.model_validate(sub).model_dump()
-        sub_dict["topic_name"] = sub.topic.name if sub.topic else None
-        result.append(sub_dict)
+        listing.filter("active", "eq", True)
     
-    return result
+    subscriptions = (await db.execute(listing.apply(query, skip, limit))).all()
+    listing.set_next_cursor(response, subscriptions, limit)
+    return rows_response(subscriptions, response)
 
-@router.get("/{subscription_id}", response_model=SubscriptionDetail)
-def get_subscription(
+@router.get("/changes", response_model=ChangeFeed[SubscriptionDetail])
+async def get_subscription_changes(
+    since: Optional[str] = Query(None, description="Token from the previous response's next; omit to get a starting token"),
+    limit: int = Query(500, ge=1, le=5000),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    window = await read_changes(db, "subscriptions", since, limit)
+    rows = {}
+    if window.upserted_ids:
+        subscriptions = (await db.execute(select(*SUBSCRIPTION_COLUMNS).join(
+            Topic, Subscription.topic_id == Topic.id, isouter=True
+        ).where(Subscription.id.in_(window.upserted_ids)))).all()
+        rows = {sub.id: sub._asdict() for sub in subscriptions}
+    return window.feed(rows)
+
+@router.get("/{subscription_id}", response_model=SubscriptionDetail, dependencies=[Depends(conditional("subscriptions", "topics"))])
+async def get_subscription(
     subscription_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    subscription = db.query(Subscription).options(
+    subscription = await db.scalar(select(Subscription).options(
         joinedload(Subscription.topic)
-    ).filter(Subscription.id == subscription_id).first()
+    ).where(Subscription.id == subscription_id))
     
     if subscription is None:
         raise HTTPException(status_code=404, detail="Subscription not found")
@@ -103,125 +134,111 @@ def get_subscription(
     return sub_dict
 
 @router.delete("/{subscription_id}", status_code=204)
-def delete_subscription(
+async def delete_subscription(
     subscription_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    subscription = db.query(Subscription).filter(Subscription.id == subscription_id).first()
+    subscription = await db.scalar(select(Subscription).where(Subscription.id == subscription_id))
     if subscription is None:
         raise HTTPException(status_code=404, detail="Subscription not found")
     
-    db.delete(subscription)
-    db.commit()
+    await db.delete(subscription)
+    await db.commit()
     
     return None
 
-@router.get("/by-client/{client_id}", response_model=List[SubscriptionDetail])
-def get_subscriptions_by_client(
+@router.get("/by-client/{client_id}", response_model=List[SubscriptionDetail], dependencies=[Depends(conditional("clients", "subscriptions", "topics"))])
+async def get_subscriptions_by_client(
     client_id: str,
+    response: Response,
     active_only: bool = Query(False),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     # Check if client exists
-    client = db.query(Client).filter(Client.client_id == client_id).first()
+    client = await db.scalar(select(Client).where(Client.client_id == client_id))
     if client is None:
         raise HTTPException(status_code=404, detail="Client not found")
     
     # Get subscriptions for client
-    query = db.query(Subscription).options(
-        joinedload(Subscription.topic)
-    ).filter(Subscription.client_id == client_id)
+    query = select(*SUBSCRIPTION_COLUMNS).join(
+        Topic, Subscription.topic_id == Topic.id, isouter=True
+    ).where(Subscription.client_id == client_id)
     
     if active_only:
-        query = query.filter(Subscription.active == True)
+        query = query.where(Subscription.active == True)
     
-    subscriptions = query.all()
-    
-    # Manually add topic_name to response
-    result = []
-    for sub in subscriptions:
-        sub_dict = SubscriptionResponse.model_validate(sub).model_dump()
-        sub_dict["topic_name"] = sub.topic.name if sub.topic else None
-        result.append(sub_dict)
-    
-    return result
+    subscriptions = (await db.execute(query)).all()
+    return rows_response(subscriptions, response)
 
-@router.get("/by-topic/{topic_id}", response_model=List[SubscriptionDetail])
-def get_subscriptions_by_topic(
+@router.get("/by-topic/{topic_id}", response_model=List[SubscriptionDetail], dependencies=[Depends(conditional("topics", "subscriptions"))])
+async def get_subscriptions_by_topic(
     topic_id: int,
+    response: Response,
     active_only: bool = Query(False),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     # Check if topic exists
-    topic = db.query(Topic).filter(Topic.id == topic_id).first()
+    topic = await db.scalar(select(Topic).where(Topic.id == topic_id))
     if topic is None:
         raise HTTPException(status_code=404, detail="Topic not found")
     
     # Get subscriptions for topic
-    query = db.query(Subscription).options(
-        joinedload(Subscription.topic)
-    ).filter(Subscription.topic_id == topic_id)
+    query = select(*SUBSCRIPTION_COLUMNS).join(
+        Topic, Subscription.topic_id == Topic.id, isouter=True
+    ).where(Subscription.topic_id == topic_id)
     
     if active_only:
-        query = query.filter(Subscription.active == True)
+        query = query.where(Subscription.active == True)
         
-    subscriptions = query.all()
-    
-    # Manually add topic_name to response
-    result = []
-    for sub in subscriptions:
-        sub_dict = SubscriptionResponse.model_validate(sub).model_dump()
-        sub_dict["topic_name"] = sub.topic.name if sub.topic else None
-        result.append(sub_dict)
-    
-    return result
+    subscriptions = (await db.execute(query)).all()
+    return rows_response(subscriptions, response)
 
-@router.get("/{subscription_id}/client", response_model=ClientResponse)
-def get_client_by_subscription(
+@router.get("/{subscription_id}/client", response_model=ClientResponse, dependencies=[Depends(conditional("subscriptions", "clients"))])
+async def get_client_by_subscription(
     subscription_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    subscription = db.query(Subscription).filter(Subscription.id == subscription_id).first()
+    subscription = await db.scalar(select(Subscription).where(Subscription.id == subscription_id))
     if subscription is None:
         raise HTTPException(status_code=404, detail="Subscription not found")
     
-    client = db.query(Client).filter(Client.client_id == subscription.client_id).first()
+    client = await db.scalar(select(Client).where(Client.client_id == subscription.client_id))
     if client is None:
         raise HTTPException(status_code=404, detail="Client not found")
     
     return client
 
-@router.get("/{subscription_id}/topic", response_model=TopicResponse)
-def get_topic_by_subscription(
+@router.get("/{subscription_id}/topic", response_model=TopicResponse, dependencies=[Depends(conditional("subscriptions", "topics"))])
+async def get_topic_by_subscription(
     subscription_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    subscription = db.query(Subscription).filter(Subscription.id == subscription_id).first()
+    subscription = await db.scalar(select(Subscription).where(Subscription.id == subscription_id))
     if subscription is None:
         raise HTTPException(status_code=404, detail="Subscription not found")
     
-    topic = db.query(Topic).filter(Topic.id == subscription.topic_id).first()
+    topic = await db.scalar(select(Topic).where(Topic.id == subscription.topic_id))
     if topic is None:
         raise HTTPException(status_code=404, detail="Topic not found")
     
     return topic
 
 @router.put("/{subscription_id}/status", status_code=200)
-def update_subscription_status(
+async def update_subscription_status(
     subscription_id: int,
     status_update: SubscriptionStatusUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    subscription = db.query(Subscription).filter(Subscription.id == subscription_id).first()
+    subscription = await db.scalar(select(Subscription).where(Subscription.id == subscription_id))
     if subscription is None:
         raise HTTPException(status_code=404, detail="Subscription not found")
     
     subscription.active = status_update.active
-    db.commit()
+    await db.commit()
     return {"message": "Subscription status updated successfully"}
\ No newline at end of file
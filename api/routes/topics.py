@@ -1,7 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from ..models import get_db, Topic, User, Client
+from ..caching import conditional
+from ..serialization import columns_for, rows_response
+from ..changes import ChangeFeed, read_changes
+from ..batch import batch_ids, in_request_order
+from ..listing import Field, ListQuery, ListSpec, EQUALITY_OPS, LOOKUP_OPS, TEXT_OPS, list_query
 from ..auth import get_current_active_user
 from pydantic import BaseModel
 from datetime import datetime
@@ -60,83 +66,122 @@ class ClientDetail(BaseModel):
     class Config:
         from_attributes = True
 
+TOPIC_COLUMNS = columns_for(TopicResponse, Topic)
+
+TOPIC_LIST = ListSpec(
+    fields={
+        "id": Field(Topic.id, LOOKUP_OPS, sortable=True, unique=True),
+        "name": Field(Topic.name, TEXT_OPS, sortable=True, unique=True),
+        "owner_client_id": Field(Topic.owner_client_id, EQUALITY_OPS),
+    },
+    indexes=[("name",), ("owner_client_id",)],
+    default_sort="id",
+)
+
 # Routes
-@router.get("/", response_model=List[TopicResponse])
-def get_topics(
+@router.get("/", response_model=List[TopicResponse], dependencies=[Depends(conditional("topics"))])
+async def get_topics(
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: Session = Depends(get_db),
+    listing: ListQuery = Depends(list_query(TOPIC_LIST)),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Topics, filtered on id, name (eq, in, prefix) or owner_client_id and sorted by id or name"""
+    topics = (await db.execute(listing.apply(select(*TOPIC_COLUMNS), skip, limit))).all()
+    listing.set_next_cursor(response, topics, limit)
+    return rows_response(topics, response)
+
+@router.get("/changes", response_model=ChangeFeed[TopicResponse])
+async def get_topic_changes(
+    since: Optional[str] = Query(None, description="Token from the previous response's next; omit to get a starting token"),
+    limit: int = Query(500, ge=1, le=5000),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    window = await read_changes(db, "topics", since, limit)
+    topics = (await db.scalars(select(Topic).where(Topic.id.in_(window.upserted_ids)))).all() if window.upserted_ids else []
+    return window.feed({topic.id: topic for topic in topics})
+
+@router.get("/batch", response_model=List[TopicResponse], dependencies=[Depends(conditional("topics"))])
+async def get_topics_batch(
+    response: Response,
+    topic_ids: List[int] = Depends(batch_ids),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    topics = db.query(Topic).offset(skip).limit(limit).all()
-    return topics
+    """Several topics by ID in one query, in the order asked for; unknown IDs are left out"""
+    topics = (await db.execute(select(*TOPIC_COLUMNS).where(Topic.id.in_(topic_ids)))).all()
+    return rows_response(in_request_order(topics, topic_ids, "id"), response)
 
-@router.get("/{topic_id}", response_model=TopicResponse)
-def get_topic(
+@router.get("/{topic_id}", response_model=TopicResponse, dependencies=[Depends(conditional("topics"))])
+async def get_topic(
     topic_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    topic = db.query(Topic).filter(Topic.id == topic_id).first()
+    topic = await db.scalar(select(Topic).where(Topic.id == topic_id))
     if topic is None:
         raise HTTPException(status_code=404, detail="Topic not found")
     return topic
 
 @router.delete("/{topic_id}", status_code=204)
-def delete_topic(
+async def delete_topic(
     topic_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    topic = db.query(Topic).filter(Topic.id == topic_id).first()
+    topic = await db.scalar(select(Topic).where(Topic.id == topic_id))
     if topic is None:
         raise HTTPException(status_code=404, detail="Topic not found")
     
     # Delete topic (this will cascade to related records due to FK constraints)
-    db.delete(topic)
-    db.commit()
+    await db.delete(topic)
+    await db.commit()
     
     return None
 
-@router.get("/by-name/{name}", response_model=TopicResponse)
-def get_topic_by_name(
+@router.get("/by-name/{name}", response_model=TopicResponse, dependencies=[Depends(conditional("topics"))])
+async def get_topic_by_name(
     name: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    topic = db.query(Topic).filter(Topic.name == name).first()
+    topic = await db.scalar(select(Topic).where(Topic.name == name))
     if topic is None:
         raise HTTPException(status_code=404, detail="Topic not found")
     return topic
 
-@router.get("/by-client/{client_id}", response_model=List[TopicResponse])
-def get_topics_by_client(
+@router.get("/by-client/{client_id}", response_model=List[TopicResponse], dependencies=[Depends(conditional("clients", "topics"))])
+async def get_topics_by_client(
     client_id: str,
-    db: Session = Depends(get_db),
+    response: Response,
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     # Check if client exists
-    client = db.query(Client).filter(Client.client_id == client_id).first()
+    client = await db.scalar(select(Client).where(Client.client_id == client_id))
     if client is None:
         raise HTTPException(status_code=404, detail="Client not found")
     
     # Get topics owned by client
-    topics = db.query(Topic).filter(Topic.owner_client_id == client_id).all()
-    return topics
+    topics = (await db.execute(select(*TOPIC_COLUMNS).where(Topic.owner_client_id == client_id))).all()
+    return rows_response(topics, response)
 
-@router.get("/{topic_id}/client", response_model=ClientDetail)
-def get_client_by_topic(
+@router.get("/{topic_id}/client", response_model=ClientDetail, dependencies=[Depends(conditional("topics", "clients"))])
+async def get_client_by_topic(
     topic_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     # Buscar el tema por ID
-    topic = db.query(Topic).filter(Topic.id == topic_id).first()
+    topic = await db.scalar(select(Topic).where(Topic.id == topic_id))
     if topic is None:
         raise HTTPException(status_code=404, detail="Topic not found")
     
     # Buscar el cliente propietario del tema
-    client = db.query(Client).filter(Client.client_id == topic.owner_client_id).first()
+    client = await db.scalar(select(Client).where(Client.client_id == topic.owner_client_id))
     if client is None:
         raise HTTPException(status_code=404, detail="Client not found")
     
@@ -0,0 +1,214 @@
+import asyncio
+import json
+import logging
+import secrets
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Set
+import asyncpg
+from .config import DATABASE_URL, settings
+from .migrations import CHANGE_CHANNEL
+
+logger = logging.getLogger(__name__)
+
+# Tables with change triggers and the resource name they are streamed under
+STREAMED_TABLES = {
+    "clients": "clients",
+    "topics": "topics",
+    "subscriptions": "subscriptions",
+    "message_logs": "messages",
+    "connection_events": "events",
+}
+
+# Columns that identify the client a row belongs to, per resource
+CLIENT_COLUMNS = {
+    "clients": "client_id",
+    "topics": "owner_client_id",
+    "subscriptions": "client_id",
+    "messages": "publisher_client_id",
+    "events": "client_id",
+}
+
+# Sent instead of individual changes when a subscriber may have missed some
+RESYNC = {"resource": "resync", "op": "resync", "row": {}}
+
+# Seconds between liveness checks of the LISTEN connection
+LISTEN_CHECK_INTERVAL = 30
+
+@dataclass
+class ChangeFilter:
+    """Which changes a subscriber wants.
+
+    Each filter only applies to resources that carry the field, so e.g. a
+    topic filter narrows messages and subscriptions but passes client rows;
+    combine it with ``resources`` to receive only the topic's own changes.
+    """
+    resources: Optional[Set[str]] = None
+    topic_id: Optional[int] = None
+    client_id: Optional[str] = None
+    event_type: Optional[str] = None
+
+    def matches(self, change: Dict) -> bool:
+        resource, row = change["resource"], change["row"]
+        if self.resources is not None and resource not in self.resources:
+            return False
+        if self.topic_id is not None:
+            topic_id = row.get("id") if resource == "topics" else row.get("topic_id")
+            if resource in ("topics", "subscriptions", "messages") and topic_id != self.topic_id:
+                return False
+        if self.client_id is not None and row.get(CLIENT_COLUMNS[resource]) != self.client_id:
+            return False
+        if self.event_type is not None and resource == "events" and row.get("event_type") != self.event_type:
+            return False
+        return True
+
+class Subscriber:
+    """A /stream connection with its filter and bounded change buffer"""
+
+    def __init__(self, change_filter: ChangeFilter, buffer_size: int):
+        self.filter = change_filter
+        self.queue = asyncio.Queue(maxsize=buffer_size)
+        self.dropped = 0
+
+    def offer(self, change: Dict) -> bool:
+        try:
+            self.queue.put_nowait(change)
+            return True
+        except asyncio.QueueFull:
+            # A subscriber a whole buffer behind gets one resync marker rather
+            # than a history with holes in it
+            while not self.queue.empty():
+                self.queue.get_nowait()
+                self.dropped += 1
+            self.dropped += 1
+            self.queue.put_nowait(RESYNC)
+            return False
+
+class ChangeBroker:
+    """Fans out row changes from one LISTEN connection to /stream subscribers"""
+
+    def __init__(self, dsn: str, buffer_size: int, max_subscribers: int):
+        self.dsn = dsn
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+        self.connected = False
+        self._subscribers: Set[Subscriber] = set()
+        self._task = None
+        self._notifications = 0
+        self._delivered = 0
+        self._dropped = 0
+        # Per-resource change counters behind the API's ETags; the epoch and
+        # generation change whenever counting (re)starts so old tags never match
+        self._epoch = secrets.token_hex(4)
+        self._generation = 0
+        self._versions = {resource: 0 for resource in STREAMED_TABLES.values()}
+
+    @property
+    def full(self) -> bool:
+        return len(self._subscribers) >= self.max_subscribers
+
+    def subscribe(self, change_filter: ChangeFilter) -> Subscriber:
+        subscriber = Subscriber(change_filter, self.buffer_size)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        """Remove ``subscriber``; safe to call more than once"""
+        if subscriber in self._subscribers:
+            self._subscribers.discard(subscriber)
+            self._dropped += subscriber.dropped
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._listen_forever())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def version_tag(self, resources: Iterable[str]) -> Optional[str]:
+        """Opaque tag that changes whenever any of ``resources`` changes.
+
+        Returns None while the LISTEN connection is down, since changes made
+        meanwhile would go unnoticed.
+        """
+        if not self.connected:
+            return None
+        versions = ".".join(str(self._versions[resource]) for resource in resources)
+        return f"{self._epoch}.{self._generation}.{versions}"
+
+    def publish(self, change: Dict):
+        for subscriber in list(self._subscribers):
+            if subscriber.filter.matches(change) and subscriber.offer(change):
+                self._delivered += 1
+
+    def publish_resync(self):
+        for subscriber in list(self._subscribers):
+            subscriber.offer(RESYNC)
+
+    def _on_notify(self, connection, pid, channel, payload):
+        self._notifications += 1
+        try:
+            data = json.loads(payload)
+            resource = STREAMED_TABLES[data["table"]]
+        except (ValueError, KeyError) as e:
+            logger.warning(f"Ignoring malformed change notification: {e}")
+            return
+        self._versions[resource] += 1
+        self.publish({"resource": resource, "op": data["op"], "row": data["row"]})
+
+    async def _listen_forever(self):
+        delay = 1
+        reconnecting = False
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(self.dsn)
+                lost = asyncio.Event()
+                connection.add_termination_listener(lambda _: lost.set())
+                await connection.add_listener(CHANGE_CHANNEL, self._on_notify)
+                self._generation += 1
+                self.connected = True
+                delay = 1
+                logger.info(f"Listening for changes on {CHANGE_CHANNEL}")
+                if reconnecting:
+                    # Notifications sent while we were away are gone for good
+                    self.publish_resync()
+                while not lost.is_set():
+                    try:
+                        await asyncio.wait_for(lost.wait(), timeout=LISTEN_CHECK_INTERVAL)
+                    except asyncio.TimeoutError:
+                        await connection.execute("SELECT 1")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Change listener disconnected: {e}")
+            finally:
+                self.connected = False
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            reconnecting = True
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30)
+
+    def snapshot(self) -> Dict:
+        return {
+            "connected": self.connected,
+            "subscribers": len(self._subscribers),
+            "max_subscribers": self.max_subscribers,
+            "buffer_size": self.buffer_size,
+            "notifications": self._notifications,
+            "delivered": self._delivered,
+            "dropped": self._dropped + sum(s.dropped for s in self._subscribers),
+        }
+
+change_broker = ChangeBroker(DATABASE_URL, settings.stream_buffer_size, settings.stream_max_subscribers)
+
+def format_event(change: Dict) -> str:
+    """Render a change as a Server-Sent Events message"""
+    data = json.dumps({"op": change["op"], "row": change["row"]}, separators=(",", ":"))
+    return f"event: {change['resource']}\ndata: {data}\n\n"
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+TinyMQ API database mode benchmark
+----------------------------------
+Starts the API once with DB_ASYNC=false (sync sessions in the threadpool)
+and once with DB_ASYNC=true (asyncpg + AsyncSession), then drives both with
+the same open-loop request rate and prints latency percentiles side by side.
+
+Requests are fired on a fixed schedule regardless of how fast the server
+answers, and latency is measured from the scheduled send time, so requests
+queued behind a saturated threadpool or pool show up in the numbers.
+
+Requires httpx on the machine running the benchmark:
+    pip install httpx
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Mix of the list and detail routes the GUI polls every second
+ENDPOINTS = [
+    "/clients/?limit=20",
+    "/topics/?limit=20",
+    "/messages/?limit=20",
+    "/subscriptions/?limit=20",
+    "/events/?limit=20",
+    "/stats/summary",
+]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Compare sync and async database modes')
+    parser.add_argument('--rate', type=float, default=200,
+                        help='Requests per second to offer (default: 200)')
+    parser.add_argument('--duration', type=float, default=20,
+                        help='Seconds of load per mode (default: 20)')
+    parser.add_argument('--port', type=int, default=8765,
+                        help='Port for the API under test (default: 8765)')
+    parser.add_argument('--username', type=str, default='admin')
+    parser.add_argument('--password', type=str, default='admin')
+    parser.add_argument('--modes', type=str, default='sync,async',
+                        help='Comma separated modes to run (default: sync,async)')
+    return parser.parse_args()
+
+def start_server(mode, port):
+    env = dict(os.environ, DB_ASYNC="true" if mode == "async" else "false")
+    return subprocess.Popen(
+        [sys.executable, "start_api.py", "--host", "127.0.0.1", "--port", str(port)],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+async def wait_until_ready(client, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("API did not become ready")
+
+async def run_load(client, rate, duration):
+    latencies = []
+    errors = 0
+    total = int(rate * duration)
+    start = time.perf_counter()
+
+    async def fire(index):
+        nonlocal errors
+        scheduled = start + index / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        try:
+            response = await client.get(ENDPOINTS[index % len(ENDPOINTS)])
+            if response.status_code != 200:
+                errors += 1
+        except httpx.HTTPError:
+            errors += 1
+        latencies.append((time.perf_counter() - scheduled) * 1000)
+
+    await asyncio.gather(*(fire(i) for i in range(total)))
+    elapsed = time.perf_counter() - start
+    return latencies, errors, elapsed
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+async def bench_mode(mode, args):
+    server = start_server(mode, args.port)
+    base_url = f"http://127.0.0.1:{args.port}"
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=100)
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+            await wait_until_ready(client)
+            token = (await client.post("/token", data={
+                "username": args.username, "password": args.password
+            })).json()["access_token"]
+            client.headers["Authorization"] = f"Bearer {token}"
+
+            # Short warm-up so both modes start with a filled pool
+            await run_load(client, args.rate, min(2, args.duration))
+            latencies, errors, elapsed = await run_load(client, args.rate, args.duration)
+    finally:
+        server.terminate()
+        server.wait()
+
+    return {
+        "mode": mode,
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput": len(latencies) / elapsed,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "max": max(latencies),
+        "mean": statistics.fmean(latencies),
+    }
+
+def main():
+    args = parse_args()
+    results = [asyncio.run(bench_mode(mode.strip(), args)) for mode in args.modes.split(",")]
+
+    print("=" * 78)
+    print(f"Offered load: {args.rate:.0f} req/s for {args.duration:.0f}s per mode")
+    print("=" * 78)
+    print(f"{'mode':<8}{'req/s':>9}{'errors':>8}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for r in results:
+        print(f"{r['mode']:<8}{r['throughput']:>9.1f}{r['errors']:>8}{r['mean']:>10.1f}"
+              f"{r['p50']:>10.1f}{r['p95']:>10.1f}{r['p99']:>10.1f}{r['max']:>10.1f}")
+
+if __name__ == "__main__":
+    main()
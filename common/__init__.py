@@ -1,3 +1,4 @@
 from .models import (
-    Client, Topic, Subscription, MessageLog, ConnectionEvent, ApiConfig
+    Client, Topic, Subscription, MessageLog, ConnectionEvent, ApiConfig, Page,
+    StatsSummary, ChangeEvent, RowChange, ChangeFeed
 ) 
\ No newline at end of file
@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 
@@ -39,6 +39,7 @@ class MessageLog:
     payload_preview: Optional[str] = None
     payload_data: Optional[Dict[str, Any]] = None
     published_at: Optional[datetime] = None
+    score: Optional[float] = None  # Relevance, on search results only
 
 @dataclass
 class ConnectionEvent:
@@ -73,6 +74,44 @@ class TopicAdmin:
     admin_client_id: str
     granted_at: Optional[datetime] = None
 
+@dataclass
+class StatsSummary:
+    clients_total: int = 0
+    clients_connected: int = 0
+    topics_total: int = 0
+    subscriptions_active: int = 0
+    messages_total: int = 0
+    events_total: int = 0
+    recent_events: List[ConnectionEvent] = field(default_factory=list)
+
+@dataclass
+class ChangeEvent:
+    """A row change pushed by the API's /stream endpoint"""
+    resource: str  # 'clients', 'topics', 'subscriptions', 'messages', 'events' or 'resync'
+    op: str  # 'insert', 'update', 'delete' or 'resync'
+    row: Dict[str, Any] = field(default_factory=dict)
+
+@dataclass
+class RowChange:
+    """One entry of a /changes feed; ``row`` is the current state for upserts"""
+    op: str  # 'upsert', 'delete', 'reset' when the whole table was emptied or 'expire'
+    id: Optional[int] = None
+    row: Optional[Any] = None
+    expired_before: Optional[datetime] = None  # For 'expire': every row published before it is gone
+
+@dataclass
+class ChangeFeed:
+    """Changes since a token, and the token to pass next time"""
+    changes: List[RowChange]
+    next: str
+    has_more: bool = False
+
+class Page(list):
+    """A list of results that also carries the keyset cursor of the next page"""
+    def __init__(self, items=(), next_cursor: Optional[str] = None):
+        super().__init__(items)
+        self.next_cursor = next_cursor
+
 @dataclass
 class ApiConfig:
     host: str
@@ -81,6 +120,11 @@ class ApiConfig:
     password: str
     token: Optional[str] = None
     token_expiry: Optional[datetime] = None
+    # Seconds to wait for the TCP connection and then for each read of the response
+    connect_timeout: float = 5.0
+    read_timeout: float = 30.0
+    # Keep-alive connections held open to the API; size it to the number of threads fetching at once
+    pool_size: int = 10
 
     @property
     def base_url(self) -> str:
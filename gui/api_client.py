@@ -1,25 +1,144 @@
 import requests
+from requests.adapters import HTTPAdapter
 import json
+import re
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Union
+from typing import Dict, Iterator, List, Optional, Any, Union
+from urllib.parse import urlsplit
 import sys
 import os
 
 # Add parent directory to path for import of common module
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from common import Client, Topic, Subscription, MessageLog, ConnectionEvent, ApiConfig
+from common import (
+    Client, Topic, Subscription, MessageLog, ConnectionEvent, ApiConfig, Page, StatsSummary,
+    ChangeEvent, RowChange, ChangeFeed
+)
+
+# Path segments followed by a client ID or topic name rather than a fixed path
+ID_PATH_PREFIXES = ("clients", "by-client", "by-name")
+
+# Collection routes of resources whose IDs are free-form strings sit under "-"
+COLLECTION_PATHS = {"clients": "/clients/-"}
 
 class ApiClient:
     """Client for communicating with the TinyMQ API"""
     
+    # Row type of each resource's /changes feed
+    CHANGE_ROW_TYPES = {
+        "clients": Client,
+        "topics": Topic,
+        "subscriptions": Subscription,
+        "messages": MessageLog,
+        "events": ConnectionEvent,
+    }
+    
+    # Most recent validated responses kept for conditional requests
+    MAX_CACHED_RESPONSES = 256
+    
+    # Seconds a response is reused without asking the API, by resource (first
+    # path segment). Topics rarely change; lists the views poll every second
+    # are kept just long enough to serve the views and subviews that show the
+    # same rows. A longer max-age from the API wins
+    CACHE_TTLS = {
+        "topics": 10.0,
+        "clients": 2.0,
+        "subscriptions": 2.0,
+        "messages": 1.0,
+        "events": 1.0,
+        "stats": 1.0,
+        "auth": 30.0,
+    }
+    
+    # Keys per /batch request; the API accepts at most 500
+    BATCH_SIZE = 500
+    
     def __init__(self, api_config: ApiConfig):
         self.api_config = api_config
+        self._cached_responses = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # Bumped on every invalidation, so a response fetched before one is not stored after it
+        self._cache_generation = 0
+        self._cache_hits = 0
+        self._cache_revalidations = 0
+        self._cache_misses = 0
+        
+        # One keep-alive session shared by every view and worker thread. The
+        # adapter's connection pool is thread-safe and, with pool_block off,
+        # opens extra connections beyond pool_size rather than waiting
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=api_config.pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        
+        # Per-endpoint [requests, failures, total seconds, slowest seconds]
+        self._latencies: Dict[str, List[float]] = {}
+        self._latency_lock = threading.Lock()
+    
+    def close(self):
+        """Close the pooled connections"""
+        self.session.close()
+    
+    @staticmethod
+    def _endpoint_key(method: str, url: str) -> str:
+        """``method`` and the path of ``url`` with its IDs replaced, so that one endpoint counts as one"""
+        parts = urlsplit(url).path.split("/")
+        for index in range(1, len(parts)):
+            part = parts[index]
+            if part.isdigit() or (
+                parts[index - 1] in ID_PATH_PREFIXES and part not in ("", "-")
+            ) or (index + 1 < len(parts) and parts[index + 1] == "all-events"):
+                parts[index] = "{id}"
+        return f"{method} {'/'.join(parts)}"
+    
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request on the pooled session, timing it against its endpoint"""
+        kwargs.setdefault("timeout", (self.api_config.connect_timeout, self.api_config.read_timeout))
+        key = self._endpoint_key(method, url)
+        started = time.perf_counter()
+        failed = True
+        try:
+            response = self.session.request(method, url, **kwargs)
+            failed = response.status_code >= 500
+            return response
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._latency_lock:
+                counters = self._latencies.setdefault(key, [0, 0, 0.0, 0.0])
+                counters[0] += 1
+                counters[1] += failed
+                counters[2] += elapsed
+                counters[3] = max(counters[3], elapsed)
+    
+    def latency_stats(self) -> Dict[str, Dict[str, float]]:
+        """Request count, failures and average/slowest latency in milliseconds per endpoint.
+        
+        Conditional GETs answered from the local cache never reach the network
+        and are not counted; a 304 is.
+        """
+        with self._latency_lock:
+            return {
+                key: {
+                    "requests": count,
+                    "failures": failures,
+                    "avg_ms": round(total / count * 1000, 1),
+                    "max_ms": round(slowest * 1000, 1),
+                }
+                for key, (count, failures, total, slowest) in sorted(self._latencies.items())
+            }
+    
+    def reset_latency_stats(self):
+        with self._latency_lock:
+            self._latencies.clear()
     
     def login(self) -> bool:
         """Authenticate with the API and get a token"""
         try:
-            response = requests.post(
-                f"{self.api_config.base_url}/token",
+            response = self._request(
+                "POST", f"{self.api_config.base_url}/token",
                 data={
                     "username": self.api_config.username,
                     "password": self.api_config.password
@@ -50,13 +169,101 @@ class ApiClient:
             return self.login()
         return True
     
+    def _conditional_get(self, url: str, headers: Optional[Dict[str, str]] = None,
+                         params: Optional[Dict[str, Any]] = None) -> requests.Response:
+        """GET that revalidates against the last 200 response for the same URL.
+        
+        Responses are reused without asking for the resource's CACHE_TTLS
+        entry, or the API's max-age if longer. After that, when the API
+        answers 304 Not Modified, the earlier response is returned instead, so
+        callers parse the body they already have.
+        """
+        key = (url, tuple(sorted((params or {}).items())))
+        with self._cache_lock:
+            generation = self._cache_generation
+            cached = self._cached_responses.get(key)
+            if cached is not None:
+                self._cached_responses.move_to_end(key)
+                if time.monotonic() < cached[1]:
+                    self._cache_hits += 1
+                    return cached[0]
+        
+        headers = dict(headers or {})
+        if cached is not None and "ETag" in cached[0].headers:
+            headers["If-None-Match"] = cached[0].headers["ETag"]
+        
+        response = self._request("GET", url, headers=headers, params=params)
+        ttl = self.CACHE_TTLS.get(self._resource(url), 0)
+        if response.status_code == 304 and cached is not None:
+            with self._cache_lock:
+                self._cache_revalidations += 1
+                if key in self._cached_responses and generation == self._cache_generation:
+                    self._cached_responses[key] = (cached[0], time.monotonic() + ttl)
+            return cached[0]
+        
+        with self._cache_lock:
+            self._cache_misses += 1
+        if response.status_code == 200:
+            max_age = re.search(r"max-age=(\d+)", response.headers.get("Cache-Control", ""))
+            if "ETag" in response.headers or max_age or ttl:
+                fresh_until = time.monotonic() + max(int(max_age.group(1)) if max_age else 0, ttl)
+                with self._cache_lock:
+                    if generation == self._cache_generation:
+                        self._cached_responses[key] = (response, fresh_until)
+                        self._cached_responses.move_to_end(key)
+                        while len(self._cached_responses) > self.MAX_CACHED_RESPONSES:
+                            self._cached_responses.popitem(last=False)
+        return response
+    
+    @staticmethod
+    def _resource(url: str) -> str:
+        """First path segment of ``url``: the resource CACHE_TTLS go by"""
+        return urlsplit(url).path.strip("/").split("/", 1)[0]
+    
+    def invalidate(self, *segments: str):
+        """Forget cached responses whose path has any of ``segments``, or every response if none are given.
+        
+        Matching any segment rather than the resource alone also drops
+        nested lookups such as /topics/{id}/client when "client" is named.
+        """
+        segments = set(segments)
+        with self._cache_lock:
+            self._cache_generation += 1
+            for key in list(self._cached_responses):
+                if not segments or segments.intersection(urlsplit(key[0]).path.split("/")):
+                    del self._cached_responses[key]
+    
+    def invalidate_changed(self, resource: str):
+        """Forget what a change to a row of ``resource`` makes stale: its lists and
+        lookups, lookups nested under other resources, and the stats"""
+        if resource == "resync":
+            self.invalidate()
+        else:
+            self.invalidate(resource, resource[:-1], "stats")
+    
+    def cache_stats(self) -> Dict[str, float]:
+        """How many GETs the response cache answered outright, revalidated or missed"""
+        with self._cache_lock:
+            total = self._cache_hits + self._cache_revalidations + self._cache_misses
+            return {
+                "hits": self._cache_hits,
+                "revalidations": self._cache_revalidations,
+                "misses": self._cache_misses,
+                "hit_rate": round(self._cache_hits / total * 100, 1) if total else 0.0,
+                "size": len(self._cached_responses),
+            }
+    
+    def reset_cache_stats(self):
+        with self._cache_lock:
+            self._cache_hits = self._cache_revalidations = self._cache_misses = 0
+    
     def _get(self, endpoint: str, params: Optional[Dict[str, Any]] = None) -> Any:
         """Generic GET request handler."""
         if not self.ensure_authenticated():
             return None
         
         try:
-            response = requests.get(
+            response = self._conditional_get(
                 f"{self.api_config.base_url}{endpoint}",
                 headers=self._get_headers(),
                 params=params
@@ -72,6 +279,22 @@ class ApiClient:
             print(f"Error during GET request to {endpoint}: {str(e)}")
             return None
 
+    def _get_batch(self, endpoint: str, keys: List[Any], row_type, key_field: str) -> Dict[Any, Any]:
+        """Resolve many keys through a /batch endpoint, BATCH_SIZE keys per request.
+        
+        Returns the rows found keyed by ``key_field``; keys the API does not
+        know are missing from the result.
+        """
+        keys = list(dict.fromkeys(keys))
+        rows = {}
+        for start in range(0, len(keys), self.BATCH_SIZE):
+            chunk = keys[start:start + self.BATCH_SIZE]
+            data = self._get(endpoint, params={"ids": ",".join(str(key) for key in chunk)})
+            for row_data in data or []:
+                row = row_type(**row_data)
+                rows[getattr(row, key_field)] = row
+        return rows
+
     # Client endpoints
     def get_clients(self, skip: int = 0, limit: int = 100) -> List[Client]:
         """Get a list of clients"""
@@ -79,7 +302,7 @@ class ApiClient:
             return []
         
         try:
-            response = requests.get(
+            response = self._conditional_get(
                 f"{self.api_config.base_url}/clients/",
                 headers=self._get_headers(),
                 params={"skip": skip, "limit": limit}
@@ -101,7 +324,7 @@ class ApiClient:
             return None
         
         try:
-            response = requests.get(
+            response = self._conditional_get(
                 f"{self.api_config.base_url}/clients/{client_id}",
                 headers=self._get_headers()
             )
@@ -116,16 +339,22 @@ class ApiClient:
             print(f"Error getting client: {str(e)}")
             return None
     
+    def get_clients_batch(self, client_ids: List[str]) -> Dict[str, Client]:
+        """Get many clients by ID in one round trip, keyed by client ID"""
+        return self._get_batch(f"{COLLECTION_PATHS['clients']}/batch", client_ids, Client, "client_id")
+    
     def delete_client(self, client_id: str) -> bool:
         """Delete a client"""
         if not self.ensure_authenticated():
             return False
         
         try:
-            response = requests.delete(
-                f"{self.api_config.base_url}/clients/{client_id}",
+            response = self._request(
+                "DELETE", f"{self.api_config.base_url}/clients/{client_id}",
                 headers=self._get_headers()
             )
+            # Deleting a client cascades to the rows that refer to it
+            self.invalidate()
             
             return response.status_code == 204
                 
@@ -139,11 +368,12 @@ class ApiClient:
             return False
         
         try:
-            response = requests.patch(
-                f"{self.api_config.base_url}/clients/{client_id}",
+            response = self._request(
+                "PATCH", f"{self.api_config.base_url}/clients/{client_id}",
                 headers=self._get_headers(),
                 json={"active": active}
             )
+            self.invalidate_changed("clients")
             
             return response.status_code == 200
                 
@@ -158,7 +388,7 @@ class ApiClient:
             return []
         
         try:
-            response = requests.get(
+            response = self._conditional_get(
                 f"{self.api_config.base_url}/topics/",
                 headers=self._get_headers(),
                 params={"skip": skip, "limit": limit}
@@ -180,7 +410,7 @@ class ApiClient:
             return None
         
         try:
-            response = requests.get(
+            response = self._conditional_get(
                 f"{self.api_config.base_url}/topics/{topic_id}",
                 headers=self._get_headers()
             )
@@ -195,13 +425,17 @@ class ApiClient:
             print(f"Error getting topic: {str(e)}")
             return None
     
+    def get_topics_batch(self, topic_ids: List[int]) -> Dict[int, Topic]:
+        """Get many topics by ID in one round trip, keyed by topic ID"""
+        return self._get_batch("/topics/batch", topic_ids, Topic, "id")
+    
     def get_topics_by_client(self, client_id: str, skip: int = 0, limit: int = 100) -> List[Topic]:
         """Get topics owned by a specific client"""
         if not self.ensure_authenticated():
             return []
         
         try:
-            response = requests.get(
+            response = self._conditional_get(
                 f"{self.api_config.base_url}/topics/by-client/{client_id}",
                 headers=self._get_headers(),
                 params={"skip": skip, "limit": limit}
@@ -223,10 +457,12 @@ class ApiClient:
             return False
         
         try:
-            response = requests.delete(
-                f"{self.api_config.base_url}/topics/{topic_id}",
+            response = self._request(
+                "DELETE", f"{self.api_config.base_url}/topics/{topic_id}",
                 headers=self._get_headers()
             )
+            # Deleting a topic cascades to the rows that refer to it
+            self.invalidate()
             
             return response.status_code == 204
                 
@@ -241,7 +477,7 @@ class ApiClient:
             return []
         
         try:
-            response = requests.get(
+            response = self._conditional_get(
                 f"{self.api_config.base_url}/subscriptions/",
                 headers=self._get_headers(),
                 params={"skip": skip, "limit": limit, "active_only": active_only}
@@ -263,7 +499,7 @@ class ApiClient:
             return None
         
         try:
-            response = requests.get(
+            response = self._conditional_get(
                 f"{self.api_config.base_url}/subscriptions/{subscription_id}",
                 headers=self._get_headers()
             )
@@ -284,7 +520,7 @@ class ApiClient:
             return []
         
         try:
-            response = requests.get(
+            response = self._conditional_get(
                 f"{self.api_config.base_url}/subscriptions/by-client/{client_id}",
                 headers=self._get_headers(),
                 params={"skip": skip, "limit": limit}
@@ -306,7 +542,7 @@ class ApiClient:
             return []
         
         try:
-            response = requests.get(
+            response = self._conditional_get(
                 f"{self.api_config.base_url}/subscriptions/by-topic/{topic_id}",
                 headers=self._get_headers(),
                 params={"skip": skip, "limit": limit}
@@ -328,10 +564,11 @@ class ApiClient:
             return False
         
         try:
-            response = requests.delete(
-                f"{self.api_config.base_url}/subscriptions/{subscription_id}",
+            response = self._request(
+                "DELETE", f"{self.api_config.base_url}/subscriptions/{subscription_id}",
                 headers=self._get_headers()
             )
+            self.invalidate_changed("subscriptions")
             
             return response.status_code == 204
                 
@@ -345,38 +582,56 @@ class ApiClient:
             return False
         
         try:
-            response = requests.put(
-                f"{self.api_config.base_url}/subscriptions/{subscription_id}/status",
+            response = self._request(
+                "PUT", f"{self.api_config.base_url}/subscriptions/{subscription_id}/status",
                 headers=self._get_headers(),
                 json={"active": active}
             )
+            self.invalidate_changed("subscriptions")
             return response.status_code == 200
         except Exception as e:
             print(f"Error updating subscription status: {str(e)}")
             return False
     
     # Message logs endpoints
-    def get_messages(self, skip: int = 0, limit: int = 100) -> List[MessageLog]:
-        """Get a list of message logs"""
+    def _message_page_params(self, skip: int, limit: int, after: Optional[str]) -> Dict[str, Any]:
+        """Build pagination params, preferring the keyset cursor over skip"""
+        if after:
+            return {"limit": limit, "after": after}
+        return {"skip": skip, "limit": limit}
+    
+    def _message_page(self, response) -> Page:
+        """Wrap a message list response together with its next-page cursor"""
+        return Page(
+            (MessageLog(**msg_data) for msg_data in response.json()),
+            next_cursor=response.headers.get("X-Next-Cursor")
+        )
+    
+    def get_messages(self, skip: int = 0, limit: int = 100, after: Optional[str] = None) -> Page:
+        """Get a page of message logs, newest first.
+        
+        Pass the previous page's ``next_cursor`` as ``after`` to page with a
+        keyset cursor instead of an offset.
+        """
         if not self.ensure_authenticated():
-            return []
+            return Page()
         
         try:
-            response = requests.get(
+            response = self._conditional_get(
                 f"{self.api_config.base_url}/messages/",
                 headers=self._get_headers(),
-                params={"skip": skip, "limit": limit}
+                params=self._message_page_params(skip, limit, after)
             )
             
             if response.status_code == 200:
-                return [MessageLog(**msg_data) for msg_data in response.json()]
+                return self._message_page(response)
             else:
                 print(f"Failed to get messages: {response.status_code} {response.text}")
-                return []
+                return Page()
                 
         except Exception as e:
             print(f"Error getting messages: {str(e)}")
-            return []
+            return Page()
         
     def get_message(self, message_id: int) -> Optional[MessageLog]:
         """Get a single message by its ID."""
@@ -384,7 +639,7 @@ class ApiClient:
             return None
         
         try:
-            response = requests.get(
+            response = self._conditional_get(
                 f"{self.api_config.base_url}/messages/{message_id}",
                 headers=self._get_headers()
             )
@@ -399,50 +654,83 @@ class ApiClient:
             print(f"Error getting message: {str(e)}")
             return None
     
+    def search_messages(self, query: str, limit: int = 50, after: Optional[str] = None,
+                        order: str = "relevance") -> Page:
+        """Get a page of messages whose payload preview contains ``query``.
+        
+        Matches come best first, or newest first with ``order="newest"``;
+        ``query`` must be at least 3 characters long.
+        """
+        if not self.ensure_authenticated():
+            return Page()
+        
+        try:
+            params = {"q": query, "limit": limit, "order": order}
+            if after:
+                params["after"] = after
+            response = self._conditional_get(
+                f"{self.api_config.base_url}/messages/search",
+                headers=self._get_headers(),
+                params=params
+            )
+            
+            if response.status_code == 200:
+                return self._message_page(response)
+            else:
+                print(f"Failed to search messages: {response.status_code} {response.text}")
+                return Page()
+                
+        except Exception as e:
+            print(f"Error searching messages: {str(e)}")
+            return Page()
+    
+    def get_messages_batch(self, message_ids: List[int]) -> Dict[int, MessageLog]:
+        """Get many messages by ID in one round trip, keyed by message ID"""
+        return self._get_batch("/messages/batch", message_ids, MessageLog, "id")
     
-    def get_messages_by_client(self, client_id: str, skip: int = 0, limit: int = 100) -> List[MessageLog]:
-        """Get message logs for a specific client"""
+    def get_messages_by_client(self, client_id: str, skip: int = 0, limit: int = 100, after: Optional[str] = None) -> Page:
+        """Get a page of message logs for a specific client"""
         if not self.ensure_authenticated():
-            return []
+            return Page()
         
         try:
-            response = requests.get(
+            response = self._conditional_get(
                 f"{self.api_config.base_url}/messages/by-client/{client_id}",
                 headers=self._get_headers(),
-                params={"skip": skip, "limit": limit}
+                params=self._message_page_params(skip, limit, after)
             )
             
             if response.status_code == 200:
-                return [MessageLog(**msg_data) for msg_data in response.json()]
+                return self._message_page(response)
             else:
                 print(f"Failed to get messages: {response.status_code} {response.text}")
-                return []
+                return Page()
                 
         except Exception as e:
             print(f"Error getting messages: {str(e)}")
-            return []
+            return Page()
     
-    def get_messages_by_topic(self, topic_id, skip=0, limit=20):
-        """Get message logs for a specific topic"""
+    def get_messages_by_topic(self, topic_id, skip=0, limit=20, after=None):
+        """Get a page of message logs for a specific topic"""
         if not self.ensure_authenticated():
-            return []
+            return Page()
         
         try:
-            response = requests.get(
+            response = self._conditional_get(
                 f"{self.api_config.base_url}/messages/by-topic/{topic_id}",
                 headers=self._get_headers(),
-                params={"skip": skip, "limit": limit}
+                params=self._message_page_params(skip, limit, after)
             )
             
             if response.status_code == 200:
-                return [MessageLog(**msg_data) for msg_data in response.json()]
+                return self._message_page(response)
             else:
                 print(f"Failed to get messages: {response.status_code} {response.text}")
-                return []
+                return Page()
                 
         except Exception as e:
             print(f"Error getting messages: {str(e)}")
-            return []
+            return Page()
     
     def delete_message(self, message_id: int) -> bool:
         """Delete a message log"""
@@ -450,10 +738,11 @@ class ApiClient:
             return False
         
         try:
-            response = requests.delete(
-                f"{self.api_config.base_url}/messages/{message_id}",
+            response = self._request(
+                "DELETE", f"{self.api_config.base_url}/messages/{message_id}",
                 headers=self._get_headers()
             )
+            self.invalidate_changed("messages")
             
             return response.status_code == 204
                 
@@ -472,7 +761,7 @@ class ApiClient:
             params["event_type"] = event_type
         
         try:
-            response = requests.get(
+            response = self._conditional_get(
                 f"{self.api_config.base_url}/events/",
                 headers=self._get_headers(),
                 params=params
@@ -494,7 +783,7 @@ class ApiClient:
             return []
         
         try:
-            response = requests.get(
+            response = self._conditional_get(
                 f"{self.api_config.base_url}/events/by-client/{client_id}",
                 headers=self._get_headers(),
                 params={"skip": skip, "limit": limit}
@@ -516,10 +805,11 @@ class ApiClient:
             return False
         
         try:
-            response = requests.delete(
-                f"{self.api_config.base_url}/events/{event_id}",
+            response = self._request(
+                "DELETE", f"{self.api_config.base_url}/events/{event_id}",
                 headers=self._get_headers()
             )
+            self.invalidate_changed("events")
             
             return response.status_code == 204
                 
@@ -527,6 +817,83 @@ class ApiClient:
             print(f"Error deleting event: {str(e)}")
             return False
     
+    # Stats endpoints
+    def get_stats_summary(self, recent_events: int = 10) -> Optional[StatsSummary]:
+        """Get all dashboard counters and the most recent events in one request"""
+        data = self._get("/stats/summary", params={"recent_events": recent_events})
+        if data:
+            data["recent_events"] = [ConnectionEvent(**event_data) for event_data in data.get("recent_events", [])]
+            return StatsSummary(**data)
+        return None
+
+    # Live changes
+    def open_change_stream(self, resources: Optional[List[str]] = None, topic_id: Optional[int] = None,
+                           client_id: Optional[str] = None, event_type: Optional[str] = None):
+        """Open the /stream Server-Sent Events connection; read it with iter_changes()"""
+        if not self.ensure_authenticated():
+            return None
+        
+        params = {"topic_id": topic_id, "client_id": client_id, "event_type": event_type}
+        if resources:
+            params["resources"] = ",".join(resources)
+        
+        try:
+            response = self._request(
+                "GET", f"{self.api_config.base_url}/stream/",
+                headers=self._get_headers(),
+                params={key: value for key, value in params.items() if value is not None},
+                stream=True,
+                # The server sends a keep-alive well within the read timeout
+                timeout=(self.api_config.connect_timeout, 60)
+            )
+            
+            if response.status_code == 200:
+                return response
+            else:
+                print(f"Failed to open change stream: {response.status_code} {response.text}")
+                response.close()
+                return None
+                
+        except Exception as e:
+            print(f"Error opening change stream: {str(e)}")
+            return None
+    
+    def iter_changes(self, response) -> Iterator[ChangeEvent]:
+        """Yield changes from an open change stream until it closes"""
+        event, data = None, []
+        for line in response.iter_lines(decode_unicode=True):
+            if line:
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    data.append(line[len("data:"):].strip())
+                continue
+            # A blank line ends an event; keep-alive comments and retry hints carry no data
+            if event and data:
+                payload = json.loads("\n".join(data))
+                yield ChangeEvent(event, payload.get("op", event), payload.get("row", {}))
+            event, data = None, []
+    
+    def get_changes(self, resource: str, since: Optional[str] = None, limit: int = 500) -> Optional[ChangeFeed]:
+        """Get the changes to a resource since a token from an earlier call.
+        
+        Without ``since`` no changes are returned, only a token marking the
+        present: take it, load the full list, then keep passing ``next``.
+        """
+        params = {"limit": limit}
+        if since is not None:
+            params["since"] = since
+        data = self._get(f"{COLLECTION_PATHS.get(resource, '/' + resource)}/changes", params=params)
+        if data is None:
+            return None
+        row_type = self.CHANGE_ROW_TYPES[resource]
+        changes = [
+            RowChange(change["op"], change.get("id"), row_type(**change["row"]) if change.get("row") else None,
+                      change.get("expired_before"))
+            for change in data["changes"]
+        ]
+        return ChangeFeed(changes, data["next"], data.get("has_more", False))
+    
     # User management
     def change_password(self, new_password: str) -> bool:
         """Change the admin user's password"""
@@ -534,11 +901,12 @@ class ApiClient:
             return False
         
         try:
-            response = requests.put(
-                f"{self.api_config.base_url}/auth/me",
+            response = self._request(
+                "PUT", f"{self.api_config.base_url}/auth/me",
                 headers=self._get_headers(),
                 json={"password": new_password}
             )
+            self.invalidate("auth")
             
             if response.status_code == 200:
                 # Update stored password
@@ -558,7 +926,7 @@ class ApiClient:
             return None
         
         try:
-            response = requests.get(
+            response = self._conditional_get(
                 f"{self.api_config.base_url}/auth/me",
                 headers=self._get_headers()
             )
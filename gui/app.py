@@ -8,6 +8,8 @@ from ttkthemes import ThemedTk
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 # Import views
+from gui.fetcher import Fetcher
+from gui.scheduler import RefreshScheduler
 from gui.views.login import LoginView
 from gui.views.dashboard import DashboardView
 from gui.views.client.clients import ClientsView
@@ -43,6 +45,13 @@ class TinyMQMonitorApp:
         # Configure styles
         self.setup_styles()
         
+        # Background loop running the views' API calls concurrently, and the
+        # scheduler that owns every periodic refresh and runs it on that loop
+        self.fetcher = Fetcher(self.root)
+        self.root.fetcher = self.fetcher
+        self.scheduler = RefreshScheduler(self.root, self.fetcher)
+        self.root.scheduler = self.scheduler
+        
         # Current view
         self.current_view = None
         self.api_client = None
@@ -98,6 +107,7 @@ class TinyMQMonitorApp:
             # Clean up resources if needed
             if hasattr(self.current_view, 'on_destroy'):
                 self.current_view.on_destroy()
+            self.scheduler.unregister(self.current_view)
             self.current_view.destroy()
         
         # Create the new view
@@ -169,6 +179,10 @@ class TinyMQMonitorApp:
     def run(self):
         """Start the application"""
         self.root.mainloop()
+        self.scheduler.stop()
+        self.fetcher.stop()
+        if self.api_client is not None:
+            self.api_client.close()
 
 if __name__ == "__main__":
     app = TinyMQMonitorApp()
@@ -0,0 +1,90 @@
+import threading
+import tkinter as tk
+
+class ChangeStream:
+    """Background reader of the API's change stream for a Tk view.
+
+    Changes arriving in a burst are batched and handed to ``on_changes`` on the
+    Tk thread at most once per ``coalesce_ms``. ``on_state`` is told whenever
+    the stream connects or drops, so the view can poll while it is down.
+    """
+
+    def __init__(self, widget, api_client, resources, on_changes, on_state=None, coalesce_ms=250, **filters):
+        self.widget = widget
+        self.api_client = api_client
+        self.resources = resources
+        self.filters = filters
+        self.on_changes = on_changes
+        self.on_state = on_state
+        self.coalesce_ms = coalesce_ms
+
+        self._pending = []
+        self._flush_scheduled = False
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._response = None
+
+    def start(self):
+        """Start reading in a daemon thread"""
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def stop(self):
+        """Stop reading and close the connection"""
+        self._stopped.set()
+        response = self._response
+        if response is not None:
+            response.close()
+
+    def _run(self):
+        """Background thread: read the stream, reconnecting with backoff"""
+        delay = 1
+        while not self._stopped.is_set():
+            response = self.api_client.open_change_stream(self.resources, **self.filters)
+            if response is not None:
+                self._response = response
+                delay = 1
+                self._call_in_ui(self.on_state, True)
+                try:
+                    for change in self.api_client.iter_changes(response):
+                        if self._stopped.is_set():
+                            break
+                        self._queue(change)
+                except Exception as e:
+                    if not self._stopped.is_set():
+                        print(f"Change stream interrupted: {e}")
+                finally:
+                    self._response = None
+                    response.close()
+                if self._stopped.is_set():
+                    break
+                self._call_in_ui(self.on_state, False)
+            self._stopped.wait(delay)
+            delay = min(delay * 2, 30)
+
+    def _queue(self, change):
+        """Collect a change and schedule a flush if none is pending"""
+        # Dropped right away, so the view's reload does not get the old response from the cache
+        self.api_client.invalidate_changed(change.resource)
+        with self._lock:
+            self._pending.append(change)
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+        self._call_in_ui(self._flush, delay=self.coalesce_ms)
+
+    def _flush(self):
+        """Runs on the Tk thread: deliver the collected batch"""
+        with self._lock:
+            changes, self._pending = self._pending, []
+            self._flush_scheduled = False
+        if changes and not self._stopped.is_set():
+            self.on_changes(changes)
+
+    def _call_in_ui(self, callback, *args, delay=0):
+        """Run a callback on the Tk thread unless the view is already gone"""
+        if callback is None or self._stopped.is_set():
+            return
+        try:
+            self.widget.after(delay, callback, *args)
+        except (RuntimeError, tk.TclError):
+            self._stopped.set()
@@ -0,0 +1,92 @@
+import asyncio
+import queue
+import threading
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+class Fetcher:
+    """Runs independent ApiClient calls side by side and hands results to Tk.
+
+    One background thread runs an asyncio event loop. gather() starts every
+    call of a batch at once on the loop's executor, so a batch takes as long
+    as its slowest call rather than the sum of them, and the blocking
+    ApiClient (with its pooled session and response cache) is reused as is.
+    Finished batches go onto a single queue that the Tk thread drains, so
+    callbacks always run on the Tk thread and never touch widgets from a
+    worker.
+    """
+
+    # How often the Tk thread checks the queue for finished batches
+    POLL_MS = 20
+
+    def __init__(self, root, max_workers: int = 8):
+        self.root = root
+        self.results = queue.Queue()
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix="fetch")
+        self.loop = asyncio.new_event_loop()
+        self.loop.set_default_executor(self.executor)
+        self.thread = threading.Thread(target=self._run_loop, name="fetch-loop", daemon=True)
+        self.thread.start()
+        self._pump_job = root.after(self.POLL_MS, self._pump)
+
+    @classmethod
+    def of(cls, widget) -> "Fetcher":
+        """The fetcher the app installed on ``widget``'s root window"""
+        return widget.winfo_toplevel().fetcher
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def gather(self, calls: Dict[str, Callable[[], Any]], callback: Callable[[Dict[str, Any]], None],
+               widget: Optional[tk.Misc] = None):
+        """Run every call in ``calls`` at once, then ``callback`` with their results by name.
+
+        A call that raises is reported and its result is None, like the
+        ApiClient methods themselves. If ``widget`` is given and has been
+        destroyed by the time the batch finishes, the callback is dropped.
+        """
+        asyncio.run_coroutine_threadsafe(self._gather(calls, callback, widget), self.loop)
+
+    async def _gather(self, calls, callback, widget):
+        names = list(calls)
+        outcomes = await asyncio.gather(
+            *(self.loop.run_in_executor(None, calls[name]) for name in names),
+            return_exceptions=True
+        )
+        results = {}
+        for name, outcome in zip(names, outcomes):
+            if isinstance(outcome, Exception):
+                print(f"Error fetching {name}: {outcome}")
+                outcome = None
+            results[name] = outcome
+        self.results.put((callback, results, widget))
+
+    def _pump(self):
+        """Runs on the Tk thread: deliver every finished batch"""
+        while True:
+            try:
+                callback, results, widget = self.results.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                if widget is not None and not widget.winfo_exists():
+                    continue
+                callback(results)
+            except tk.TclError:
+                # The view went away while the callback ran
+                pass
+            except Exception as e:
+                print(f"Error handling fetched data: {e}")
+        self._pump_job = self.root.after(self.POLL_MS, self._pump)
+
+    def stop(self):
+        """Stop the loop thread and its workers"""
+        try:
+            self.root.after_cancel(self._pump_job)
+        except tk.TclError:
+            pass
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=1)
+        self.executor.shutdown(wait=False, cancel_futures=True)
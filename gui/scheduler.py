@@ -0,0 +1,141 @@
+import time
+import tkinter as tk
+from typing import Any, Callable, Dict, Optional, Tuple
+from gui.fetcher import Fetcher
+
+# How often list views reload while they poll
+REFRESH_INTERVAL_MS = 1000
+
+class RefreshJob:
+    """One view's reload: a fetch run on the Fetcher's workers and a Tk-side handler.
+
+    ``params``, if given, runs on the Tk thread each time the fetch is sent
+    and returns the keyword arguments of ``fetch``, so a fetch never reads
+    Tk variables from a worker thread.
+
+    run() reloads now; start() and stop() turn periodic reloads on and off.
+    Only one fetch of a job is ever in flight. A run() asked for meanwhile
+    is coalesced into a single rerun once the current fetch lands, and a
+    periodic tick that finds the fetch still running is skipped.
+    """
+
+    def __init__(self, scheduler: "RefreshScheduler", owner, name: str, fetch: Callable[..., Any],
+                 on_result: Callable[[Any], None], params: Optional[Callable[[], Dict[str, Any]]] = None):
+        self.scheduler = scheduler
+        self.owner = owner
+        self.name = name
+        self.fetch = fetch
+        self.on_result = on_result
+        self.params = params
+        self.interval: Optional[float] = None
+        self.next_due = 0.0
+        self.in_flight = False
+        self.rerun = False
+        self.cancelled = False
+        self.runs = 0
+        self.skipped = 0
+        self.coalesced = 0
+
+    def start(self, interval_ms: int):
+        """Reload every ``interval_ms``, the first time one interval from now"""
+        self.interval = interval_ms / 1000
+        self.next_due = time.monotonic() + self.interval
+
+    def stop(self):
+        """Stop periodic reloads; run() still works"""
+        self.interval = None
+
+    def run(self):
+        """Reload now, or once more after the fetch in flight"""
+        if self.cancelled:
+            return
+        if self.in_flight:
+            self.coalesced += 1
+            self.rerun = True
+            return
+        kwargs = self.params() if self.params else {}
+        self.in_flight = True
+        self.runs += 1
+        self.scheduler.fetcher.gather({self.name: lambda: self.fetch(**kwargs)}, self._done, widget=self.owner)
+
+    def _tick(self, now: float):
+        if self.interval is None or now < self.next_due:
+            return
+        # Fixed rate: a tick that finds the previous fetch still running is dropped, not queued
+        self.next_due = now + self.interval
+        if self.in_flight:
+            self.skipped += 1
+        else:
+            self.run()
+
+    def _done(self, results: Dict[str, Any]):
+        self.in_flight = False
+        if self.cancelled:
+            return
+        try:
+            self.on_result(results[self.name])
+        finally:
+            if self.rerun:
+                self.rerun = False
+                self.run()
+
+class RefreshScheduler:
+    """The app's single owner of periodic view reloads.
+
+    Views register() a RefreshJob instead of keeping their own timers or
+    threads. One Tk timer drives every job, and every fetch runs on the
+    Fetcher's fixed worker pool, so a slow API delays reloads instead of
+    piling up threads. Jobs of a destroyed view are dropped, either when
+    the app calls unregister() on navigation or at the next tick.
+    """
+
+    TICK_MS = 100
+
+    def __init__(self, root, fetcher: Fetcher):
+        self.root = root
+        self.fetcher = fetcher
+        self.jobs: Dict[Tuple[int, str], RefreshJob] = {}
+        self._tick_job = root.after(self.TICK_MS, self._tick)
+
+    @classmethod
+    def of(cls, widget) -> "RefreshScheduler":
+        """The scheduler the app installed on ``widget``'s root window"""
+        return widget.winfo_toplevel().scheduler
+
+    def register(self, owner, name: str, fetch: Callable[..., Any], on_result: Callable[[Any], None],
+                 params: Optional[Callable[[], Dict[str, Any]]] = None) -> RefreshJob:
+        """Add ``owner``'s job ``name``; ``fetch`` runs on a worker, ``on_result`` on the Tk thread"""
+        job = RefreshJob(self, owner, name, fetch, on_result, params)
+        self.jobs[(id(owner), name)] = job
+        return job
+
+    def unregister(self, owner):
+        """Drop every job of ``owner``; results still in flight are discarded"""
+        for key in [key for key, job in self.jobs.items() if job.owner is owner]:
+            job = self.jobs.pop(key)
+            job.stop()
+            job.cancelled = True
+
+    def _tick(self):
+        now = time.monotonic()
+        for key, job in list(self.jobs.items()):
+            try:
+                alive = job.owner.winfo_exists()
+            except tk.TclError:
+                alive = False
+            if not alive:
+                self.jobs.pop(key, None)
+                job.cancelled = True
+                continue
+            try:
+                job._tick(now)
+            except Exception as e:
+                print(f"Error scheduling {job.name} refresh: {e}")
+        self._tick_job = self.root.after(self.TICK_MS, self._tick)
+
+    def stop(self):
+        try:
+            self.root.after_cancel(self._tick_job)
+        except tk.TclError:
+            pass
+        self.jobs.clear()
@@ -0,0 +1,58 @@
+from tkinter import ttk
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+class TableBinding:
+    """Keeps a Treeview in step with rows keyed by entity id.
+
+    Each item's iid is its row's key. sync() diffs the new rows against
+    the items on screen and only inserts, moves, rewrites or deletes the
+    ones that changed, so a refresh that finds nothing new touches no
+    item. Surviving items keep their selection and the tree keeps its
+    scroll position, instead of being reset by a clear and refill.
+    """
+
+    def __init__(self, tree: ttk.Treeview):
+        self.tree = tree
+        # What each item was last given, so unchanged rows are not rewritten
+        self.shown: Dict[str, Tuple[tuple, tuple]] = {}
+
+    def sync(self, rows: Iterable[Tuple[Any, Sequence, Sequence[str]]], select: Optional[Any] = None):
+        """Show ``rows``, each a (key, values, tags) triple, in the order given.
+
+        ``select`` is the key of a row to select when it is shown but not
+        selected, as when coming back to the page it is on.
+        """
+        tree = self.tree
+        top = tree.yview()[0]
+        wanted: List[Tuple[str, tuple, tuple]] = [(str(key), tuple(values), tuple(tags)) for key, values, tags in rows]
+        keys = {iid for iid, _, _ in wanted}
+        children = tree.get_children()
+        stale = [iid for iid in children if iid not in keys]
+        changed = bool(stale)
+        if stale:
+            tree.delete(*stale)
+        order = [iid for iid in children if iid in keys]
+        self.shown = {iid: row for iid, row in self.shown.items() if iid in keys}
+
+        for index, (iid, values, tags) in enumerate(wanted):
+            if iid not in self.shown and not tree.exists(iid):
+                tree.insert("", index, iid=iid, values=values, tags=tags)
+                order.insert(index, iid)
+                changed = True
+            else:
+                if order[index] != iid:
+                    tree.move(iid, "", index)
+                    order.remove(iid)
+                    order.insert(index, iid)
+                    changed = True
+                if self.shown.get(iid) != (values, tags):
+                    tree.item(iid, values=values, tags=tags)
+            self.shown[iid] = (values, tags)
+
+        if changed:
+            tree.yview_moveto(top)
+        if select is not None:
+            iid = str(select)
+            if tree.exists(iid) and iid not in tree.selection():
+                tree.selection_set(iid)
+                tree.focus(iid)
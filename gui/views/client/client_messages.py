@@ -12,9 +12,11 @@ class ClientMessagesView(ttk.Frame):
         self.client_id = client_id
         self.show_view_callback = show_view_callback
         
-        # Pagination variables
+        # Pagination variables; page_cursors[n] is the keyset cursor that opens page n
         self.page = 0
         self.page_size = 20
+        self.page_cursors = [None]
+        self.next_cursor = None
         
         # Setup UI components
         self.setup_ui()
@@ -103,13 +105,13 @@ class ClientMessagesView(ttk.Frame):
 
     def load_messages(self):
         """Loads messages data from API"""
-        skip = self.page * self.page_size
-        threading.Thread(target=self._fetch_messages, args=(skip,), daemon=True).start()
+        after = self.page_cursors[self.page]
+        threading.Thread(target=self._fetch_messages, args=(after,), daemon=True).start()
     
-    def _fetch_messages(self, skip):
+    def _fetch_messages(self, after):
         """Background thread to fetch messages from API"""
         try:
-            messages = self.api_client.get_messages_by_client(self.client_id, skip=skip, limit=self.page_size)
+            messages = self.api_client.get_messages_by_client(self.client_id, limit=self.page_size, after=after)
             self.after(0, lambda: self._update_messages_list(messages))
         except Exception as e:
             print(f"Error loading messages: {str(e)}")
@@ -117,6 +119,8 @@ class ClientMessagesView(ttk.Frame):
     
     def _update_messages_list(self, messages):
         """Updates the messages list treeview with fetched data"""
+        self.next_cursor = messages.next_cursor
+        
         # Clear existing items
         for item in self.messages_tree.get_children():
             self.messages_tree.delete(item)
@@ -140,16 +144,20 @@ class ClientMessagesView(ttk.Frame):
         """Updates pagination controls"""
         self.page_label.config(text=f"Page {self.page + 1}")
         self.prev_page_btn.state(["disabled"] if self.page == 0 else ["!disabled"])
-        self.next_page_btn.state(["disabled"] if item_count < self.page_size else ["!disabled"])
+        self.next_page_btn.state(["!disabled"] if self.next_cursor else ["disabled"])
     
     def prev_page(self):
         """Go to previous page of messages"""
         if self.page > 0:
             self.page -= 1
+            del self.page_cursors[self.page + 1:]
             self.load_messages()
     
     def next_page(self):
         """Go to next page of messages"""
+        if not self.next_cursor:
+            return
+        self.page_cursors.append(self.next_cursor)
         self.page += 1
         self.load_messages()
 
@@ -8,6 +8,9 @@ from dateutil.parser import parse
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 from gui.api_client import ApiClient
+from gui.change_stream import ChangeStream
+from gui.scheduler import REFRESH_INTERVAL_MS, RefreshScheduler
+from gui.table import TableBinding
 from common import Client
 
 class ClientsView(ttk.Frame):
@@ -25,9 +28,10 @@ class ClientsView(ttk.Frame):
         # Selected client for details
         self.selected_client = None
         
-        # Auto-refresh variables
-        self.auto_refresh_job = None
-        self.is_refreshing = False
+        # Reloads run through the app's scheduler, which also drives auto-refresh
+        self.refresh_job = RefreshScheduler.of(self).register(
+            self, "clients", self._fetch_clients, self._show_clients, params=lambda: {"skip": self.page * self.page_size}
+        )
         
         # Setup UI components
         self.setup_ui()
@@ -37,6 +41,10 @@ class ClientsView(ttk.Frame):
         
         # Start auto-refresh
         self.start_auto_refresh()
+        
+        # Live updates; polling only runs while the change stream is down
+        self.change_stream = ChangeStream(self, self.api_client, ["clients"], self._on_changes, self._on_stream_state)
+        self.change_stream.start()
     
     def setup_ui(self):
         # Configure the grid
@@ -96,6 +104,7 @@ class ClientsView(ttk.Frame):
         
         self.clients_tree.grid(row=0, column=0, sticky="nsew")
         self.clients_tree.bind("<<TreeviewSelect>>", self.on_client_selected)
+        self.clients_table = TableBinding(self.clients_tree)
         
         # Configure tags for connection status (not just active status)
         self.clients_tree.tag_configure("connected", foreground="black")
@@ -218,56 +227,32 @@ class ClientsView(ttk.Frame):
         self.status_var.set("Loading clients...")
         self.update_idletasks()
         
-        # Store currently selected client ID to restore after refresh
-        selected_client_id = None
-        if self.selected_client:
-            selected_client_id = self.selected_client.client_id
-        
-        # Calculate skip based on page and page size
-        skip = self.page * self.page_size
-        
-        # Start loading in background thread
-        threading.Thread(target=self._fetch_clients, args=(skip, selected_client_id), daemon=True).start()
+        self.refresh_job.run()
     
-    def _fetch_clients(self, skip, selected_client_id=None):
-        """Background thread to fetch clients from API"""
-        try:
-            clients = self.api_client.get_clients(skip=skip, limit=self.page_size)
-            
-            # Update UI on main thread only if widget still exists
-            if self.winfo_exists():
-                self.after(0, lambda: self._update_client_list(clients, selected_client_id))
-                self.after(0, lambda: self.status_var.set(f"Loaded {len(clients)} clients"))
-            
-            # Schedule next auto-refresh if enabled
-            if self.is_refreshing and self.winfo_exists():
-                self.auto_refresh_job = threading.Timer(1.0, self.load_clients)
-                self.auto_refresh_job.start()
-            
-        except Exception as e:
-            print(f"Error loading clients: {str(e)}")
-            if self.winfo_exists():
-                self.after(0, lambda: self.status_var.set(f"Error: {str(e)}"))
-                self.after(0, lambda: messagebox.showerror("Error", f"Failed to load clients: {str(e)}"))
-            
-            # Still schedule next refresh even on error
-            if self.is_refreshing and self.winfo_exists():
-                self.auto_refresh_job = threading.Timer(1.0, self.load_clients)
-                self.auto_refresh_job.start()
+    def _fetch_clients(self, skip):
+        """Runs on a worker thread: fetch one page of clients"""
+        return skip, self.api_client.get_clients(skip=skip, limit=self.page_size)
     
-    def _update_client_list(self, clients, selected_client_id=None):
+    def _show_clients(self, result):
+        """Show a fetched page, keeping the selected client selected"""
+        if result is None:
+            self.status_var.set("Error: failed to load clients")
+            return
+        skip, clients = result
+        # Drop a page the user has since left; the rerun for the new one follows
+        if skip != self.page * self.page_size:
+            return
+        selected_id = self.selected_client.id if self.selected_client else None
+        self._update_client_list(clients, selected_id)
+        self.status_var.set(f"Loaded {len(clients)} clients")
+    
+    def _update_client_list(self, clients, selected_id=None):
         """Updates the client list treeview with fetched data"""
         # Ensure the treeview widget still exists before trying to update it
         if not self.winfo_exists() or not hasattr(self, 'clients_tree') or not self.clients_tree.winfo_exists():
             return
 
-        # Clear existing items
-        for item in self.clients_tree.get_children():
-            self.clients_tree.delete(item)
-        
-        # Add clients to treeview and track the item to reselect
-        item_to_select = None
-        
+        rows = []
         for client in clients:
             # Check if last_connected is a string and convert to datetime if needed
             if isinstance(client.last_connected, str) and client.last_connected:
@@ -293,9 +278,9 @@ class ClientsView(ttk.Frame):
             # Determine row color based on connection status
             tag = "connected" if client.active else "disconnected"
 
-            item = self.clients_tree.insert(
-                "", "end", 
-                values=(
+            rows.append((
+                client.id,
+                (
                     client.id,
                     active_display,
                     client.client_id, 
@@ -304,17 +289,11 @@ class ClientsView(ttk.Frame):
                     last_connected,
                     client.connection_count
                 ),
-                tags=(tag,)
-            )
-            
-            # Check if this is the previously selected client
-            if selected_client_id and client.client_id == selected_client_id:
-                item_to_select = item
+                (tag,)
+            ))
         
-        # Restore selection if we found the previously selected client
-        if item_to_select and self.clients_tree.exists(item_to_select): # Check if item still exists
-            self.clients_tree.selection_set(item_to_select)
-            self.clients_tree.focus(item_to_select)
+        # Only changed rows are touched, so selection and scroll position survive the refresh
+        self.clients_table.sync(rows, select=selected_id)
         
         # Update pagination only if widgets exist
         if self.winfo_exists():
@@ -548,21 +527,29 @@ class ClientsView(ttk.Frame):
 
     def start_auto_refresh(self):
         """Starts auto-refresh job"""
-        if not self.is_refreshing:
-            self.is_refreshing = True
-            self.auto_refresh_job = threading.Timer(1.0, self.load_clients)
-            self.auto_refresh_job.start()
+        self.refresh_job.start(REFRESH_INTERVAL_MS)
 
     def stop_auto_refresh(self):
         """Stops auto-refresh job"""
-        self.is_refreshing = False
-        if self.auto_refresh_job:
-            self.auto_refresh_job.cancel()
-            self.auto_refresh_job = None
+        self.refresh_job.stop()
 
+    def _on_changes(self, changes):
+        """Reload the current page when the change stream reports client changes"""
+        self.load_clients()
+    
+    def _on_stream_state(self, connected):
+        """Poll only while the change stream is unavailable"""
+        if connected:
+            self.stop_auto_refresh()
+            # Catch up on anything that changed before the stream opened
+            self.load_clients()
+        else:
+            self.start_auto_refresh()
+    
     def on_destroy(self):
         """Called when the view is being destroyed"""
         self.stop_auto_refresh()
+        self.change_stream.stop()
 
     def disconnect_client(self):
         """Disconnects the selected client"""
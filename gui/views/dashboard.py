@@ -1,6 +1,5 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import threading
 import time
 import sys
 import os
@@ -10,6 +9,8 @@ from dateutil.parser import parse
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 from gui.api_client import ApiClient
+from gui.scheduler import REFRESH_INTERVAL_MS, RefreshScheduler
+from gui.table import TableBinding
 
 class DashboardView(ttk.Frame):
     def __init__(self, parent, api_client, show_view_callback):
@@ -28,11 +29,13 @@ class DashboardView(ttk.Frame):
         # Setup UI components
         self.setup_ui()
         
+        # All dashboard numbers and recent activity come from a single request
+        self.refresh_job = RefreshScheduler.of(self).register(
+            self, "summary", lambda: self.api_client.get_stats_summary(recent_events=10), self._load_data
+        )
+        
         # Start data refresh
         self.refresh_data()
-        
-        # Setup auto-refresh timer
-        self.refresh_timer = None
         self.start_auto_refresh()
     
     def setup_ui(self):
@@ -134,6 +137,7 @@ class DashboardView(ttk.Frame):
         self.activity_tree.column("event", width=200)
         
         self.activity_tree.grid(row=0, column=0, sticky="nsew")
+        self.activity_table = TableBinding(self.activity_tree)
         
         activity_scrollbar = ttk.Scrollbar(activity_frame, orient="vertical", command=self.activity_tree.yview)
         activity_scrollbar.grid(row=0, column=1, sticky="ns")
@@ -167,60 +171,26 @@ class DashboardView(ttk.Frame):
     
     def refresh_data(self):
         """Refreshes all dashboard data"""
-        try:
-            # Start data fetching in a separate thread to avoid UI freezing
-            threading.Thread(target=self._load_data, daemon=True).start()
-        except Exception as e:
-            print(f"Error starting refresh thread: {e}")
+        self.refresh_job.run()
     
-    def _load_data(self):
-        """Loads data from API in background thread"""
+    def _load_data(self, summary):
+        """Shows the fetched summary; runs on the Tk thread"""
         try:
-            # Get client count
-            clients = self.api_client.get_clients()
-            
-            # Make sure the view still exists before updating UI elements
-            if not self.winfo_exists():
-                return
-                
-            self.client_count.set(str(len(clients)))
-            
-            # Get topic count
-            topics = self.api_client.get_topics()
-            if not self.winfo_exists():
-                return
-            self.topic_count.set(str(len(topics)))
-            
-            # Get message count (get first 100 messages)
-            messages = self.api_client.get_messages()
-            if not self.winfo_exists():
+            if summary is None:
                 return
-            self.message_count.set(str(len(messages)))
             
-            # Get subscription count (just active ones)
-            subscriptions = self.api_client.get_subscriptions(active_only=True)
-            if not self.winfo_exists():
-                return
-            self.active_subscriptions.set(str(len(subscriptions)))
-            
-            # Get recent activity (last 10 connection events)
-            events = self.api_client.get_events(limit=10)
-            if not self.winfo_exists():
-                return
-            self._update_activity_list(events)
+            self.client_count.set(str(summary.clients_connected))
+            self.topic_count.set(str(summary.topics_total))
+            self.message_count.set(str(summary.messages_total))
+            self.active_subscriptions.set(str(summary.subscriptions_active))
+            self._update_activity_list(summary.recent_events)
             
             # Update last updated time
-            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            if not self.winfo_exists():
-                return
-            self.last_updated.set(now)
+            self.last_updated.set(datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
             
         except Exception as e:
-            error_message = str(e)
-            print(f"Error refreshing data: {error_message}")
-            # Store error message in a variable that can be accessed by the lambda
-            if self.winfo_exists():
-                self.after(0, lambda error=error_message: messagebox.showerror("Refresh Error", f"Error loading dashboard data: {error}"))
+            print(f"Error refreshing data: {e}")
+            messagebox.showerror("Refresh Error", f"Error loading dashboard data: {e}")
     
     def _update_activity_list(self, events):
         """Updates the activity tree with connection events"""
@@ -229,11 +199,7 @@ class DashboardView(ttk.Frame):
             if not self.winfo_exists() or not hasattr(self, 'activity_tree') or not self.activity_tree.winfo_exists():
                 return
                 
-            # Clear existing items
-            for item in self.activity_tree.get_children():
-                self.activity_tree.delete(item)
-            
-            # Add new events
+            rows = []
             for event in events:
                 # Handle timestamp consistently
                 if isinstance(event.timestamp, str) and event.timestamp:
@@ -250,32 +216,19 @@ class DashboardView(ttk.Frame):
                     # It's None or some other type
                     timestamp = "N/A"
                     
-                self.activity_tree.insert(
-                    "", "end", 
-                    values=(timestamp, event.client_id, event.event_type)
-                )
+                rows.append((event.id, (timestamp, event.client_id, event.event_type), ()))
+            
+            # New events are inserted above the ones already shown instead of refilling the list
+            self.activity_table.sync(rows)
         except tk.TclError as e:
             # Handle Tcl/Tk errors
             print(f"Tk error updating activity list: {e}")
         except Exception as e:
             print(f"Error updating activity list: {e}")
     
-    def start_auto_refresh(self, interval=1000):
+    def start_auto_refresh(self, interval=REFRESH_INTERVAL_MS):
         """Starts auto-refresh timer"""
-        if self.refresh_timer is not None:
-            self.after_cancel(self.refresh_timer)
-        
-        self.refresh_timer = self.after(interval, self._auto_refresh)
-    
-    def _auto_refresh(self):
-        """Auto refresh handler"""
-        # Only refresh if the view still exists
-        if self.winfo_exists():
-            self.refresh_data()
-            self.start_auto_refresh()
-        else:
-            # View was destroyed, don't schedule more refreshes
-            self.refresh_timer = None
+        self.refresh_job.start(interval)
     
     def show_settings(self):
         """Shows settings dialog"""
@@ -288,10 +241,4 @@ class DashboardView(ttk.Frame):
     
     def on_destroy(self):
         """Clean up when view is destroyed"""
-        try:
-            if self.refresh_timer is not None:
-                self.after_cancel(self.refresh_timer)
-                self.refresh_timer = None
-        except tk.TclError:
-            # Widget might already be destroyed
-            pass 
\ No newline at end of file
+        self.refresh_job.stop()
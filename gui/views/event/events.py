@@ -8,6 +8,9 @@ from datetime import datetime
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 from gui.api_client import ApiClient
+from gui.change_stream import ChangeStream
+from gui.scheduler import REFRESH_INTERVAL_MS, RefreshScheduler
+from gui.table import TableBinding
 from common import ConnectionEvent, Client
 
 class EventsView(ttk.Frame):
@@ -28,9 +31,10 @@ class EventsView(ttk.Frame):
         # Selected event for details
         self.selected_event = None
         
-        # Auto-refresh variables
-        self.auto_refresh_job = None
-        self.is_refreshing = False
+        # Reloads run through the app's scheduler, which also drives auto-refresh
+        self.refresh_job = RefreshScheduler.of(self).register(
+            self, "events", self._fetch_events, self._show_events, params=self._fetch_params
+        )
         
         # Setup UI components
         self.setup_ui()
@@ -40,6 +44,10 @@ class EventsView(ttk.Frame):
         
         # Start auto-refresh
         self.start_auto_refresh()
+        
+        # Live updates; polling only runs while the change stream is down
+        self.change_stream = ChangeStream(self, self.api_client, ["events"], self._on_changes, self._on_stream_state)
+        self.change_stream.start()
     
     def setup_ui(self):
         # Configure the grid
@@ -113,6 +121,7 @@ class EventsView(ttk.Frame):
         
         self.events_tree.grid(row=0, column=0, sticky="nsew")
         self.events_tree.bind("<<TreeviewSelect>>", self.on_event_selected)
+        self.events_table = TableBinding(self.events_tree)
         
         # Add scrollbar to treeview
         tree_scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self.events_tree.yview)
@@ -199,64 +208,37 @@ class EventsView(ttk.Frame):
         self.status_var.set("Loading connection events...")
         self.update_idletasks()
         
-        # Store currently selected event ID to restore after refresh
-        selected_event_id = None
-        if self.selected_event:
-            selected_event_id = self.selected_event.id
-        
-        # Calculate skip based on page and page size
-        skip = self.page * self.page_size
-        
-        # Get event type filter
+        self.refresh_job.run()
+    
+    def _fetch_params(self):
+        """The page and event type filter to fetch, read on the Tk thread"""
         event_type = None if self.event_type_var.get() == "ALL" else self.event_type_var.get()
-        
-        # Start loading in background thread
-        threading.Thread(
-            target=self._fetch_events, 
-            args=(skip, event_type, selected_event_id), 
-            daemon=True
-        ).start()
+        return {"skip": self.page * self.page_size, "event_type": event_type}
     
-    def _fetch_events(self, skip, event_type, selected_event_id):
-        """Background thread to fetch events from API"""
-        try:
-            events = self.api_client.get_events(
-                skip=skip, 
-                limit=self.page_size, 
-                event_type=event_type
-            )
-            
-            # Update UI in main thread only if widget still exists
-            if self.winfo_exists():
-                self.after(0, lambda: self._update_event_list(events, selected_event_id))
-                self.after(0, lambda: self.status_var.set(f"Loaded {len(events)} events"))
-            
-            # Schedule next auto-refresh if enabled
-            if self.is_refreshing and self.winfo_exists():
-                self.auto_refresh_job = threading.Timer(1.0, self.load_events)
-                self.auto_refresh_job.start()
-                
-        except Exception as e:
-            print(f"Error loading events: {str(e)}")
-            if self.winfo_exists():
-                self.after(0, lambda: self.status_var.set(f"Error: {str(e)}"))
-                self.after(0, lambda: messagebox.showerror("Error", f"Failed to load events: {str(e)}"))
-            
-            # Still schedule next refresh even on error
-            if self.is_refreshing and self.winfo_exists():
-                self.auto_refresh_job = threading.Timer(1.0, self.load_events)
-                self.auto_refresh_job.start()
+    def _fetch_events(self, skip, event_type):
+        """Runs on a worker thread: fetch one page of events"""
+        params = {"skip": skip, "event_type": event_type}
+        return params, self.api_client.get_events(skip=skip, limit=self.page_size, event_type=event_type)
+    
+    def _show_events(self, result):
+        """Show a fetched page, keeping the selected event selected"""
+        if result is None:
+            self.status_var.set("Error: failed to load events")
+            return
+        params, events = result
+        # Drop a page or filter the user has since left
+        if params != self._fetch_params():
+            return
+        selected_event_id = self.selected_event.id if self.selected_event else None
+        self._update_event_list(events, selected_event_id)
+        self.status_var.set(f"Loaded {len(events)} events")
     
     def _update_event_list(self, events, selected_event_id=None):
         """Updates the events treeview with data"""
         if not self.winfo_exists() or not hasattr(self, 'events_tree') or not self.events_tree.winfo_exists():
             return
 
-        # Clear existing entries
-        for row in self.events_tree.get_children():
-            self.events_tree.delete(row)
-    
-        item_to_select = None
+        rows = []
         for event in events:
             # Format the timestamp if it exists
             timestamp = event.timestamp
@@ -270,23 +252,20 @@ class EventsView(ttk.Frame):
                 if isinstance(timestamp, datetime):
                     timestamp = timestamp.strftime("%Y-%m-%d %H:%M:%S")
         
-            item = self.events_tree.insert(
-                "", "end", 
-                values=(
+            rows.append((
+                event.id,
+                (
                     event.id, 
                     event.client_id, 
                     event.event_type,
                     event.ip_address,
                     event.port,
                     timestamp
-                )
-            )
-            if selected_event_id and event.id == selected_event_id:
-                item_to_select = item
+                ),
+                ()
+            ))
     
-        if item_to_select and self.events_tree.exists(item_to_select):
-            self.events_tree.selection_set(item_to_select)
-            self.events_tree.focus(item_to_select)
+        self.events_table.sync(rows, select=selected_event_id)
     
         if self.winfo_exists(): # Check before updating status and pagination
             if events:
@@ -455,19 +434,26 @@ class EventsView(ttk.Frame):
 
     def start_auto_refresh(self):
         """Start auto-refresh job"""
-        if not self.is_refreshing:
-            self.is_refreshing = True
-            self._schedule_auto_refresh()
-
-    def _schedule_auto_refresh(self):
-        """Schedule the next auto-refresh"""
-        if self.is_refreshing and self.winfo_exists():
-            self.after(1000, self.load_events)  # Schedule load_events to run every 1 second
+        self.refresh_job.start(REFRESH_INTERVAL_MS)
 
     def stop_auto_refresh(self):
         """Stop auto-refresh job"""
-        self.is_refreshing = False
+        self.refresh_job.stop()
+    
+    def _on_changes(self, changes):
+        """Reload the current page when the change stream reports event changes"""
+        self.load_events()
+    
+    def _on_stream_state(self, connected):
+        """Poll only while the change stream is unavailable"""
+        if connected:
+            self.stop_auto_refresh()
+            # Catch up on anything that changed before the stream opened
+            self.load_events()
+        else:
+            self.start_auto_refresh()
     
     def on_destroy(self):
         """Called when the view is being destroyed"""
-        self.stop_auto_refresh()
\ No newline at end of file
+        self.stop_auto_refresh()
+        self.change_stream.stop()
\ No newline at end of file
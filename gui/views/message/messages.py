@@ -8,26 +8,40 @@ from datetime import datetime
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 from gui.api_client import ApiClient
+from gui.change_stream import ChangeStream
+from gui.scheduler import REFRESH_INTERVAL_MS, RefreshScheduler
 from common import MessageLog, Topic, Client
 
 class MessagesView(ttk.Frame):
+    # Milliseconds of typing pause before a search is sent, and the shortest
+    # text the API's trigram index can look up
+    SEARCH_DEBOUNCE_MS = 400
+    SEARCH_MIN_LENGTH = 3
+    
     def __init__(self, parent, api_client, show_view_callback):
         super().__init__(parent)
         self.parent = parent
         self.api_client = api_client
         self.show_view_callback = show_view_callback
         
-        # Pagination variables
+        # Pagination variables; page_cursors[n] is the keyset cursor that opens page n
         self.page = 0
         self.page_size = 20
         self.total_messages = 0
+        self.page_cursors = [None]
+        self.next_cursor = None
         
         # Selected message for details
         self.selected_message = None
         
-        # Auto-refresh variables
-        self.auto_refresh_job = None
-        self.is_refreshing = False
+        # Active payload search; None lists all messages
+        self.search_query = None
+        self.search_job = None
+        
+        # Reloads run through the app's scheduler, which also drives auto-refresh
+        self.refresh_job = RefreshScheduler.of(self).register(
+            self, "messages", self._fetch_messages, self._show_messages, params=self._fetch_params
+        )
         
         # Setup UI components
         self.setup_ui()
@@ -37,6 +51,10 @@ class MessagesView(ttk.Frame):
         
         # Start auto-refresh
         self.start_auto_refresh()
+        
+        # Live updates; polling only runs while the change stream is down
+        self.change_stream = ChangeStream(self, self.api_client, ["messages"], self._on_changes, self._on_stream_state)
+        self.change_stream.start()
     
     def setup_ui(self):
         # Configure the grid
@@ -54,8 +72,14 @@ class MessagesView(ttk.Frame):
         title_label = ttk.Label(header_frame, text="TinyMQ Message Logs", font=("Helvetica", 16, "bold"))
         title_label.grid(row=0, column=1, sticky="w", padx=5, pady=10)
         
+        ttk.Label(header_frame, text="Search:").grid(row=0, column=2, sticky="e", padx=5, pady=10)
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(header_frame, textvariable=self.search_var, width=30)
+        search_entry.grid(row=0, column=3, padx=5, pady=10)
+        self.search_var.trace_add("write", self._on_search_changed)
+        
         refresh_button = ttk.Button(header_frame, text="Refresh", command=self.load_messages)
-        refresh_button.grid(row=0, column=2, padx=5, pady=10)
+        refresh_button.grid(row=0, column=4, padx=5, pady=10)
         
         # Main content - split into top message list and bottom message details
         content_frame = ttk.Frame(self)
@@ -194,45 +218,40 @@ class MessagesView(ttk.Frame):
         self.status_var.set("Loading messages...")
         self.update_idletasks()
         
-        # Store currently selected message ID to restore after refresh
-        selected_message_id = None
-        if self.selected_message:
-            selected_message_id = self.selected_message.id
-        
-        # Calculate skip based on page and page size
-        skip = self.page * self.page_size
-        
-        # Start loading in background thread
-        threading.Thread(target=self._fetch_messages, args=(skip, selected_message_id), daemon=True).start()
+        self.refresh_job.run()
     
-    def _fetch_messages(self, skip, selected_message_id):
-        """Background thread to fetch messages from API"""
-        try:
-            messages = self.api_client.get_messages(skip=skip, limit=self.page_size)
-            
-            if self.winfo_exists(): # Check if view still exists
-                self.after(0, lambda: self._update_message_list(messages, selected_message_id))
-                self.after(0, lambda: self.status_var.set(f"Loaded {len(messages)} messages"))
-            
-            if self.is_refreshing and self.winfo_exists():
-                self.auto_refresh_job = threading.Timer(1.0, self.load_messages)
-                self.auto_refresh_job.start()
-                
-        except Exception as e:
-            print(f"Error loading messages: {str(e)}")
-            if self.winfo_exists(): # Check if view still exists
-                self.after(0, lambda: self.status_var.set(f"Error: {str(e)}"))
-                self.after(0, lambda: messagebox.showerror("Error", f"Failed to load messages: {str(e)}"))
-            
-            if self.is_refreshing and self.winfo_exists():
-                self.auto_refresh_job = threading.Timer(1.0, self.load_messages)
-                self.auto_refresh_job.start()
+    def _fetch_params(self):
+        """The search and page to fetch, read on the Tk thread"""
+        # Pages are addressed by keyset cursor rather than by offset
+        return {"search_query": self.search_query, "after": self.page_cursors[self.page]}
+    
+    def _fetch_messages(self, search_query, after):
+        """Runs on a worker thread: fetch one page of messages or search results"""
+        if search_query:
+            messages = self.api_client.search_messages(search_query, limit=self.page_size, after=after)
+        else:
+            messages = self.api_client.get_messages(limit=self.page_size, after=after)
+        return search_query, after, messages
+    
+    def _show_messages(self, result):
+        """Show a fetched page, keeping the selected message selected"""
+        if result is None:
+            self.status_var.set("Error: failed to load messages")
+            return
+        search_query, after, messages = result
+        # Drop results of a search or page the user has since left
+        if search_query != self.search_query or after != self.page_cursors[self.page]:
+            return
+        selected_message_id = self.selected_message.id if self.selected_message else None
+        self._update_message_list(messages, selected_message_id)
+        self.status_var.set(f"Loaded {len(messages)} messages")
     
     def _update_message_list(self, messages, selected_message_id=None):
         """Updates the messages treeview with data"""
         if not self.winfo_exists() or not hasattr(self, 'messages_tree') or not self.messages_tree.winfo_exists():
             return
         try:
+            self.next_cursor = messages.next_cursor
             for row in self.messages_tree.get_children():
                 self.messages_tree.delete(row)
         
@@ -271,6 +290,28 @@ class MessagesView(ttk.Frame):
         except Exception as e:
             print(f"Error updating message list: {e}")
     
+    def _on_search_changed(self, *args):
+        """Restart the debounce timer on every keystroke in the search box"""
+        if self.search_job is not None:
+            self.after_cancel(self.search_job)
+        self.search_job = self.after(self.SEARCH_DEBOUNCE_MS, self._apply_search)
+    
+    def _apply_search(self):
+        """Search for the text typed, or go back to the full list once it is cleared"""
+        self.search_job = None
+        text = self.search_var.get().strip()
+        if text and len(text) < self.SEARCH_MIN_LENGTH:
+            self.status_var.set(f"Type at least {self.SEARCH_MIN_LENGTH} characters to search")
+            return
+        query = text or None
+        if query == self.search_query:
+            return
+        self.search_query = query
+        self.page = 0
+        self.page_cursors = [None]
+        self.next_cursor = None
+        self.load_messages()
+    
     def update_pagination(self):
         """Update pagination controls based on current page"""
         if not self.winfo_exists():
@@ -283,12 +324,11 @@ class MessagesView(ttk.Frame):
                     self.prev_page_btn.state(["!disabled"])
                 else:
                     self.prev_page_btn.state(["disabled"])
-            if hasattr(self, 'next_page_btn') and self.next_page_btn.winfo_exists() and hasattr(self, 'messages_tree') and self.messages_tree.winfo_exists():
-                client_count = len(self.messages_tree.get_children())
-                if client_count < self.page_size:
-                    self.next_page_btn.state(["disabled"])
-                else:
+            if hasattr(self, 'next_page_btn') and self.next_page_btn.winfo_exists():
+                if self.next_cursor:
                     self.next_page_btn.state(["!disabled"])
+                else:
+                    self.next_page_btn.state(["disabled"])
         except tk.TclError as e:
             print(f"Tk error updating pagination: {e}")
         except Exception as e:
@@ -298,10 +338,14 @@ class MessagesView(ttk.Frame):
         """Go to previous page of messages"""
         if self.page > 0:
             self.page -= 1
+            del self.page_cursors[self.page + 1:]
             self.load_messages()
     
     def next_page(self):
         """Go to next page of messages"""
+        if not self.next_cursor:
+            return
+        self.page_cursors.append(self.next_cursor)
         self.page += 1
         self.load_messages()
     
@@ -445,19 +489,26 @@ class MessagesView(ttk.Frame):
 
     def start_auto_refresh(self):
         """Start auto-refresh job"""
-        if not self.is_refreshing:
-            self.is_refreshing = True
-            self._schedule_auto_refresh()
-
-    def _schedule_auto_refresh(self):
-        """Schedule the next auto-refresh"""
-        if self.is_refreshing and self.winfo_exists():
-            self.after(1000, self.load_messages)  # Schedule load_messages to run every 1 second
+        self.refresh_job.start(REFRESH_INTERVAL_MS)
 
     def stop_auto_refresh(self):
         """Stop auto-refresh job"""
-        self.is_refreshing = False
+        self.refresh_job.stop()
+    
+    def _on_changes(self, changes):
+        """Reload the current page when the change stream reports message changes"""
+        self.load_messages()
+    
+    def _on_stream_state(self, connected):
+        """Poll only while the change stream is unavailable"""
+        if connected:
+            self.stop_auto_refresh()
+            # Catch up on anything that changed before the stream opened
+            self.load_messages()
+        else:
+            self.start_auto_refresh()
     
     def on_destroy(self):
         """Called when the view is being destroyed"""
-        self.stop_auto_refresh()
\ No newline at end of file
+        self.stop_auto_refresh()
+        self.change_stream.stop()
\ No newline at end of file
@@ -17,6 +17,9 @@ class SettingsView(ttk.Frame):
         self.new_password = tk.StringVar()
         self.confirm_password = tk.StringVar()
         
+        # Response cache summary
+        self.cache_summary = tk.StringVar()
+        
         # Setup UI components
         self.setup_ui()
     
@@ -72,6 +75,47 @@ class SettingsView(ttk.Frame):
         )
         hint_label.grid(row=2, column=0, columnspan=2, sticky="w", padx=10, pady=5)
         
+        # Request latency section
+        self.rowconfigure(1, weight=1)
+        content_frame.rowconfigure(1, weight=1)
+        latency_frame = ttk.LabelFrame(content_frame, text="Request Latency")
+        latency_frame.grid(row=1, column=0, sticky="nsew", padx=5, pady=5)
+        latency_frame.columnconfigure(0, weight=1)
+        latency_frame.rowconfigure(0, weight=1)
+        
+        self.latency_tree = ttk.Treeview(
+            latency_frame,
+            columns=("endpoint", "requests", "failures", "avg_ms", "max_ms"),
+            show="headings",
+            height=8
+        )
+        self.latency_tree.heading("endpoint", text="Endpoint")
+        self.latency_tree.heading("requests", text="Requests")
+        self.latency_tree.heading("failures", text="Failures")
+        self.latency_tree.heading("avg_ms", text="Avg (ms)")
+        self.latency_tree.heading("max_ms", text="Max (ms)")
+        
+        self.latency_tree.column("endpoint", width=260)
+        self.latency_tree.column("requests", width=80, anchor="e")
+        self.latency_tree.column("failures", width=80, anchor="e")
+        self.latency_tree.column("avg_ms", width=80, anchor="e")
+        self.latency_tree.column("max_ms", width=80, anchor="e")
+        
+        self.latency_tree.grid(row=0, column=0, sticky="nsew")
+        
+        latency_scrollbar = ttk.Scrollbar(latency_frame, orient="vertical", command=self.latency_tree.yview)
+        latency_scrollbar.grid(row=0, column=1, sticky="ns")
+        self.latency_tree.configure(yscrollcommand=latency_scrollbar.set)
+        
+        cache_label = ttk.Label(latency_frame, textvariable=self.cache_summary, foreground="gray")
+        cache_label.grid(row=1, column=0, sticky="w", padx=5, pady=5)
+        
+        latency_buttons = ttk.Frame(latency_frame)
+        latency_buttons.grid(row=1, column=0, columnspan=2, sticky="e", pady=5)
+        ttk.Button(latency_buttons, text="Reset", command=self.reset_latency).grid(row=0, column=0, padx=5)
+        ttk.Button(latency_buttons, text="Refresh", command=self.refresh_latency).grid(row=0, column=1, padx=5)
+        self.refresh_latency()
+        
         # Button frame
         button_frame = ttk.Frame(self)
         button_frame.grid(row=2, column=0, sticky="e", padx=10, pady=10)
@@ -90,6 +134,24 @@ class SettingsView(ttk.Frame):
         )
         save_btn.grid(row=0, column=1, padx=5)
     
+    def refresh_latency(self):
+        """Show the API client's per-endpoint request timings and response cache hit rate"""
+        self.latency_tree.delete(*self.latency_tree.get_children())
+        for endpoint, stats in self.api_client.latency_stats().items():
+            self.latency_tree.insert("", "end", values=(
+                endpoint, stats["requests"], stats["failures"], stats["avg_ms"], stats["max_ms"]
+            ))
+        cache = self.api_client.cache_stats()
+        self.cache_summary.set(
+            f"Response cache: {cache['hit_rate']}% hits ({cache['hits']} hits, "
+            f"{cache['revalidations']} revalidated, {cache['misses']} fetched), {cache['size']} cached"
+        )
+    
+    def reset_latency(self):
+        self.api_client.reset_latency_stats()
+        self.api_client.reset_cache_stats()
+        self.refresh_latency()
+    
     def change_password(self):
         """Changes the admin password"""
         new_pwd = self.new_password.get()
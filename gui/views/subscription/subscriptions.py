@@ -8,6 +8,9 @@ from datetime import datetime
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 from gui.api_client import ApiClient
+from gui.change_stream import ChangeStream
+from gui.scheduler import REFRESH_INTERVAL_MS, RefreshScheduler
+from gui.table import TableBinding
 from common import Subscription, Topic, Client
 
 class SubscriptionsView(ttk.Frame):
@@ -28,9 +31,10 @@ class SubscriptionsView(ttk.Frame):
         # Selected subscription for details
         self.selected_subscription = None
         
-        # Auto-refresh variables
-        self.auto_refresh_job = None
-        self.is_refreshing = False
+        # Reloads run through the app's scheduler, which also drives auto-refresh
+        self.refresh_job = RefreshScheduler.of(self).register(
+            self, "subscriptions", self._fetch_subscriptions, self._show_subscriptions, params=self._fetch_params
+        )
         
         # Setup UI components
         self.setup_ui()
@@ -40,6 +44,10 @@ class SubscriptionsView(ttk.Frame):
         
         # Start auto-refresh
         self.start_auto_refresh()
+        
+        # Live updates; polling only runs while the change stream is down
+        self.change_stream = ChangeStream(self, self.api_client, ["subscriptions"], self._on_changes, self._on_stream_state)
+        self.change_stream.start()
     
     def setup_ui(self):
         # Configure the grid
@@ -104,6 +112,7 @@ class SubscriptionsView(ttk.Frame):
         
         self.subscriptions_tree.grid(row=0, column=0, sticky="nsew")
         self.subscriptions_tree.bind("<<TreeviewSelect>>", self.on_subscription_selected)
+        self.subscriptions_table = TableBinding(self.subscriptions_tree)
         
         # Add scrollbar to treeview
         tree_scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self.subscriptions_tree.yview)
@@ -204,60 +213,36 @@ class SubscriptionsView(ttk.Frame):
         self.status_var.set("Loading subscriptions...")
         self.update_idletasks()
         
-        # Store currently selected subscription ID to restore after refresh
-        selected_subscription_id = None
-        if self.selected_subscription:
-            selected_subscription_id = self.selected_subscription.id
-        
-        # Calculate skip based on page and page size
-        skip = self.page * self.page_size
-        
-        # Get active filter value
-        active_only = self.show_active_only.get()
-        
-        # Start loading in background thread
-        threading.Thread(
-            target=self._fetch_subscriptions, 
-            args=(skip, active_only, selected_subscription_id), 
-            daemon=True
-        ).start()
+        self.refresh_job.run()
     
-    def _fetch_subscriptions(self, skip, active_only, selected_subscription_id=None):
-        """Background thread to fetch subscriptions from API"""
-        try:
-            subscriptions = self.api_client.get_subscriptions(
-                skip=skip, 
-                limit=self.page_size, 
-                active_only=active_only
-            )
-            
-            if self.winfo_exists(): # Check if view still exists
-                self.after(0, lambda: self._update_subscription_list(subscriptions, selected_subscription_id))
-                self.after(0, lambda: self.status_var.set(f"Loaded {len(subscriptions)} subscriptions"))
-
-            if self.is_refreshing and self.winfo_exists():
-                self.auto_refresh_job = threading.Timer(1.0, self.load_subscriptions)
-                self.auto_refresh_job.start()
-                
-        except Exception as e:
-            print(f"Error loading subscriptions: {str(e)}")
-            if self.winfo_exists(): # Check if view still exists
-                self.after(0, lambda: self.status_var.set(f"Error: {str(e)}"))
-                self.after(0, lambda: messagebox.showerror("Error", f"Failed to load subscriptions: {str(e)}"))
-            
-            if self.is_refreshing and self.winfo_exists():
-                self.auto_refresh_job = threading.Timer(1.0, self.load_subscriptions)
-                self.auto_refresh_job.start()
+    def _fetch_params(self):
+        """The page and active filter to fetch, read on the Tk thread"""
+        return {"skip": self.page * self.page_size, "active_only": self.show_active_only.get()}
+    
+    def _fetch_subscriptions(self, skip, active_only):
+        """Runs on a worker thread: fetch one page of subscriptions"""
+        params = {"skip": skip, "active_only": active_only}
+        return params, self.api_client.get_subscriptions(skip=skip, limit=self.page_size, active_only=active_only)
+    
+    def _show_subscriptions(self, result):
+        """Show a fetched page, keeping the selected subscription selected"""
+        if result is None:
+            self.status_var.set("Error: failed to load subscriptions")
+            return
+        params, subscriptions = result
+        # Drop a page or filter the user has since left
+        if params != self._fetch_params():
+            return
+        selected_subscription_id = self.selected_subscription.id if self.selected_subscription else None
+        self._update_subscription_list(subscriptions, selected_subscription_id)
+        self.status_var.set(f"Loaded {len(subscriptions)} subscriptions")
     
     def _update_subscription_list(self, subscriptions, selected_subscription_id=None):
         """Updates the subscriptions treeview with data"""
         if not self.winfo_exists() or not hasattr(self, 'subscriptions_tree') or not self.subscriptions_tree.winfo_exists():
             return
 
-        for row in self.subscriptions_tree.get_children():
-            self.subscriptions_tree.delete(row)
-        
-        item_to_select = None
+        rows = []
         for sub in subscriptions:
             subscribed_at = sub.subscribed_at
             if subscribed_at:
@@ -269,16 +254,9 @@ class SubscriptionsView(ttk.Frame):
                 if isinstance(subscribed_at, datetime):
                     subscribed_at = subscribed_at.strftime("%Y-%m-%d %H:%M:%S")
             active_text = "Yes" if sub.active else "No"
-            item = self.subscriptions_tree.insert(
-                "", "end", 
-                values=(sub.id, sub.client_id, sub.topic_name, subscribed_at, active_text)
-            )
-            if selected_subscription_id and sub.id == selected_subscription_id:
-                item_to_select = item
-        
-        if item_to_select and self.subscriptions_tree.exists(item_to_select):
-            self.subscriptions_tree.selection_set(item_to_select)
-            self.subscriptions_tree.focus(item_to_select)
+            rows.append((sub.id, (sub.id, sub.client_id, sub.topic_name, subscribed_at, active_text), ()))
+        
+        self.subscriptions_table.sync(rows, select=selected_subscription_id)
             
         if self.winfo_exists(): # Check before updating status and pagination
             if subscriptions:
@@ -538,18 +516,26 @@ class SubscriptionsView(ttk.Frame):
 
     def start_auto_refresh(self):
         """Start the auto-refresh job"""
-        if not self.is_refreshing:
-            self.is_refreshing = True
-            self.auto_refresh_job = threading.Timer(1.0, self.load_subscriptions)
-            self.auto_refresh_job.start()
+        self.refresh_job.start(REFRESH_INTERVAL_MS)
     
     def stop_auto_refresh(self):
         """Stop the auto-refresh job"""
-        self.is_refreshing = False
-        if self.auto_refresh_job:
-            self.auto_refresh_job.cancel()
-            self.auto_refresh_job = None
+        self.refresh_job.stop()
+    
+    def _on_changes(self, changes):
+        """Reload the current page when the change stream reports subscription changes"""
+        self.load_subscriptions()
+    
+    def _on_stream_state(self, connected):
+        """Poll only while the change stream is unavailable"""
+        if connected:
+            self.stop_auto_refresh()
+            # Catch up on anything that changed before the stream opened
+            self.load_subscriptions()
+        else:
+            self.start_auto_refresh()
     
     def on_destroy(self):
         """Called when the view is being destroyed"""
-        self.stop_auto_refresh() 
\ No newline at end of file
+        self.stop_auto_refresh()
+        self.change_stream.stop()
\ No newline at end of file
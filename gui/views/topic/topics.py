@@ -8,6 +8,10 @@ from datetime import datetime
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 from gui.api_client import ApiClient
+from gui.change_stream import ChangeStream
+from gui.fetcher import Fetcher
+from gui.scheduler import REFRESH_INTERVAL_MS, RefreshScheduler
+from gui.table import TableBinding
 from common import Topic, Client
 
 class TopicsView(ttk.Frame):
@@ -25,9 +29,10 @@ class TopicsView(ttk.Frame):
         # Selected topic for details
         self.selected_topic = None
         
-        # Auto-refresh variables
-        self.auto_refresh_job = None
-        self.is_refreshing = False
+        # Reloads run through the app's scheduler, which also drives auto-refresh
+        self.refresh_job = RefreshScheduler.of(self).register(
+            self, "topics", self._fetch_topics, self._show_topics, params=lambda: {"skip": self.page * self.page_size}
+        )
         
         # Setup UI components
         self.setup_ui()
@@ -37,6 +42,10 @@ class TopicsView(ttk.Frame):
         
         # Start auto-refresh
         self.start_auto_refresh()
+        
+        # Live updates; polling only runs while the change stream is down
+        self.change_stream = ChangeStream(self, self.api_client, ["topics"], self._on_changes, self._on_stream_state)
+        self.change_stream.start()
     
     def setup_ui(self):
         # Configure the grid
@@ -90,6 +99,7 @@ class TopicsView(ttk.Frame):
         
         self.topics_tree.grid(row=0, column=0, sticky="nsew")
         self.topics_tree.bind("<<TreeviewSelect>>", self.on_topic_selected)
+        self.topics_table = TableBinding(self.topics_tree)
         
         # Add scrollbar to treeview
         tree_scrollbar = ttk.Scrollbar(list_frame, orient="vertical", command=self.topics_tree.yview)
@@ -187,49 +197,31 @@ class TopicsView(ttk.Frame):
         self.status_var.set("Loading topics...")
         self.update_idletasks()
         
-        # Store currently selected topic ID to restore after refresh
-        selected_topic_id = None
-        if self.selected_topic:
-            selected_topic_id = self.selected_topic.id
-        
-        # Calculate skip based on page and page size
-        skip = self.page * self.page_size
-        
-        # Start loading in background thread
-        threading.Thread(target=self._fetch_topics, args=(skip, selected_topic_id), daemon=True).start()
+        self.refresh_job.run()
     
-    def _fetch_topics(self, skip, selected_topic_id=None):
-        """Background thread to fetch topics from API"""
-        try:
-            topics = self.api_client.get_topics(skip=skip, limit=self.page_size)
-            
-            if self.winfo_exists(): # Check if view still exists
-                self.after(0, lambda: self._update_topic_list(topics, selected_topic_id))
-                self.after(0, lambda: self.status_var.set(f"Loaded {len(topics)} topics"))
-            
-            if self.is_refreshing and self.winfo_exists():
-                self.auto_refresh_job = threading.Timer(1.0, self.load_topics)
-                self.auto_refresh_job.start()
-                
-        except Exception as e:
-            print(f"Error loading topics: {str(e)}")
-            if self.winfo_exists(): # Check if view still exists
-                self.after(0, lambda: self.status_var.set(f"Error: {str(e)}"))
-                self.after(0, lambda: messagebox.showerror("Error", f"Failed to load topics: {str(e)}"))
-            
-            if self.is_refreshing and self.winfo_exists():
-                self.auto_refresh_job = threading.Timer(1.0, self.load_topics)
-                self.auto_refresh_job.start()
+    def _fetch_topics(self, skip):
+        """Runs on a worker thread: fetch one page of topics"""
+        return skip, self.api_client.get_topics(skip=skip, limit=self.page_size)
+    
+    def _show_topics(self, result):
+        """Show a fetched page, keeping the selected topic selected"""
+        if result is None:
+            self.status_var.set("Error: failed to load topics")
+            return
+        skip, topics = result
+        # Drop a page the user has since left
+        if skip != self.page * self.page_size:
+            return
+        selected_topic_id = self.selected_topic.id if self.selected_topic else None
+        self._update_topic_list(topics, selected_topic_id)
+        self.status_var.set(f"Loaded {len(topics)} topics")
     
     def _update_topic_list(self, topics, selected_topic_id=None):
         """Updates the topics treeview with data"""
         if not self.winfo_exists() or not hasattr(self, 'topics_tree') or not self.topics_tree.winfo_exists():
             return
 
-        for row in self.topics_tree.get_children():
-            self.topics_tree.delete(row)
-        
-        item_to_select = None
+        rows = []
         for topic in topics:
             created_at = topic.created_at
             if created_at:
@@ -241,16 +233,9 @@ class TopicsView(ttk.Frame):
                 if isinstance(created_at, datetime):
                     created_at = created_at.strftime("%Y-%m-%d %H:%M:%S")
             
-            item = self.topics_tree.insert(
-                "", "end", 
-                values=(topic.id, topic.name, topic.owner_client_id, created_at)
-            )
-            if selected_topic_id and topic.id == selected_topic_id:
-                item_to_select = item
+            rows.append((topic.id, (topic.id, topic.name, topic.owner_client_id, created_at), ()))
         
-        if item_to_select and self.topics_tree.exists(item_to_select):
-            self.topics_tree.selection_set(item_to_select)
-            self.topics_tree.focus(item_to_select)
+        self.topics_table.sync(rows, select=selected_topic_id)
             
         if self.winfo_exists(): # Check before updating status and pagination
             if topics:
@@ -298,28 +283,26 @@ class TopicsView(ttk.Frame):
             item_values = self.topics_tree.item(selected_items[0], "values")
             topic_id = int(item_values[0])
             
-            # Fetch topic details in background
+            # Fetch the topic and its subscriptions side by side
             self.status_var.set("Loading topic details...")
-            threading.Thread(target=self._fetch_topic_details, args=(topic_id,), daemon=True).start()
+            Fetcher.of(self).gather(
+                {
+                    "topic": lambda: self.api_client.get_topic(topic_id),
+                    "subscriptions": lambda: self.api_client.get_subscriptions_by_topic(topic_id),
+                },
+                self._show_topic_details,
+                widget=self
+            )
         else:
             self.clear_topic_details()
     
-    def _fetch_topic_details(self, topic_id):
-        """Background thread to fetch topic details"""
-        try:
-            topic = self.api_client.get_topic(topic_id)
-            
-            if self.winfo_exists(): # Check if view still exists
-                if topic:
-                    subscriptions = self.api_client.get_subscriptions_by_topic(topic_id)
-                    subscription_count = len(subscriptions)
-                    self.after(0, lambda: self.update_topic_details(topic, subscription_count))
-                else:
-                    self.after(0, lambda: self.status_var.set("Failed to load topic details"))
-        except Exception as e:
-            print(f"Error fetching topic details: {e}")
-            if self.winfo_exists():
-                 self.after(0, lambda: self.status_var.set(f"Error: {str(e)}"))
+    def _show_topic_details(self, results):
+        """Show fetched topic details; runs on the Tk thread"""
+        topic = results["topic"]
+        if topic:
+            self.update_topic_details(topic, len(results["subscriptions"] or []))
+        else:
+            self.status_var.set("Failed to load topic details")
     
     def update_topic_details(self, topic, subscription_count):
         """Update the topic details panel with topic data"""
@@ -456,19 +439,26 @@ class TopicsView(ttk.Frame):
 
     def start_auto_refresh(self):
         """Start auto-refresh job"""
-        if not self.is_refreshing:
-            self.is_refreshing = True
-            self._schedule_auto_refresh()
-
-    def _schedule_auto_refresh(self):
-        """Schedule the next auto-refresh"""
-        if self.is_refreshing and self.winfo_exists():
-            self.after(1000, self.load_topics)  # Schedule load_topics to run every 1 second
+        self.refresh_job.start(REFRESH_INTERVAL_MS)
 
     def stop_auto_refresh(self):
         """Stop auto-refresh job"""
-        self.is_refreshing = False
+        self.refresh_job.stop()
+    
+    def _on_changes(self, changes):
+        """Reload the current page when the change stream reports topic changes"""
+        self.load_topics()
+    
+    def _on_stream_state(self, connected):
+        """Poll only while the change stream is unavailable"""
+        if connected:
+            self.stop_auto_refresh()
+            # Catch up on anything that changed before the stream opened
+            self.load_topics()
+        else:
+            self.start_auto_refresh()
     
     def on_destroy(self):
         """Called when the view is being destroyed"""
-        self.stop_auto_refresh()
\ No newline at end of file
+        self.stop_auto_refresh()
+        self.change_stream.stop()
\ No newline at end of file
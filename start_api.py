@@ -65,7 +65,9 @@ def main():
             "api.app:app",
             host=args.host,
             port=args.port,
-            reload=args.reload
+            reload=args.reload,
+            # Open /stream connections never finish on their own
+            timeout_graceful_shutdown=5
         )
     except Exception as e:
         print(f"Error starting API server: {e}")